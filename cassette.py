@@ -0,0 +1,267 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Deque, Dict, List, Optional
+
+from section_cache import fingerprint
+
+
+class CassetteMiss(Exception):
+    """A replayed request that the cassette has no recording for."""
+
+
+class ReplayedError(Exception):
+    """A provider failure played back from a cassette.
+
+    Raised as a subclass named after the original exception and carrying
+    its status code and Retry-After header, so retry and fallback
+    decisions are the same as when it was recorded.
+    """
+
+
+class _ReplayedResponse:
+    def __init__(self, status_code: Optional[int], headers: Dict[str, str]) -> None:
+        self.status_code = status_code
+        self.headers = headers
+
+
+_error_classes: Dict[str, type] = {}
+
+
+def _replayed_error(record: Dict) -> ReplayedError:
+    name = record["error_type"]
+    cls = _error_classes.get(name)
+    if cls is None:
+        cls = _error_classes[name] = type(name, (ReplayedError,), {})
+    error = cls(record["error"])
+    error.status_code = record.get("status_code")
+    error.response = _ReplayedResponse(record.get("status_code"), record.get("headers") or {})
+    return error
+
+
+class Cassette:
+    """Provider requests and replies recorded to, or replayed from, a JSON-lines file.
+
+    In "record" mode every attempt a provider makes is appended with its
+    reply or error and how long it took. In "replay" mode attempts are
+    answered from the file instead of the network, after the recorded time
+    divided by `speed` (0 replies at once); retry backoff between replayed
+    attempts is scaled the same way through `sleep`. Recordings are matched on
+    provider, model, prompt and parameters; identical requests replay in
+    recorded order and the last one repeats once they run out.
+    """
+
+    MODES = ("record", "replay")
+
+    def __init__(self, path: str, mode: str = "replay", speed: float = 1.0) -> None:
+        if mode not in self.MODES:
+            raise ValueError(f"Cassette mode must be one of {self.MODES}, not {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.speed = speed
+        self.misses = 0
+        self.played = 0
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._recordings: Dict[str, Deque[Dict]] = defaultdict(deque)
+        self._providers = set()
+        if mode == "replay":
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self._recordings[record["key"]].append(record)
+                        self._providers.add((record["provider"], record["model"]))
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def knows(self, provider) -> bool:
+        """Whether the cassette holds any recording for `provider` (replay routes only to those)."""
+        return (provider.name, provider.model) in self._providers
+
+    async def play(self, provider, prompt: str, temperature: float, max_tokens: int) -> str:
+        """One attempt by `provider`: made and recorded, or answered from the recording."""
+        key = fingerprint(provider.name, provider.model, prompt, temperature, max_tokens)
+        if self.replaying:
+            return await self._replay(provider, key)
+        started = time.monotonic()
+        record = {
+            "key": key, "provider": provider.name, "model": provider.model,
+            "prompt": prompt, "temperature": temperature, "max_tokens": max_tokens,
+            "offset": round(started - self._started, 3),
+        }
+        try:
+            content = await provider._acreate(prompt, temperature, max_tokens)
+        except Exception as e:
+            response = getattr(e, "response", None)
+            headers = getattr(response, "headers", None)
+            status = getattr(e, "status_code", None) or getattr(response, "status_code", None)
+            record.update(
+                seconds=round(time.monotonic() - started, 3), error_type=type(e).__name__, error=str(e),
+                status_code=status if isinstance(status, int) else None,
+                headers={"retry-after": headers["retry-after"]} if headers and "retry-after" in headers else None,
+            )
+            self._append(record)
+            raise
+        record.update(seconds=round(time.monotonic() - started, 3), content=content)
+        self._append(record)
+        return content
+
+    async def sleep(self, seconds: float) -> None:
+        """A wait between attempts, scaled by `speed` when replaying."""
+        if not self.replaying:
+            await asyncio.sleep(seconds)
+        elif self.speed > 0:
+            await asyncio.sleep(seconds / self.speed)
+
+    async def _replay(self, provider, key: str) -> str:
+        with self._lock:
+            queue = self._recordings.get(key)
+            if not queue:
+                self.misses += 1
+                raise CassetteMiss(f"No recorded reply from {provider.name} ({provider.model}) for this prompt")
+            record = queue.popleft() if len(queue) > 1 else queue[0]
+            self.played += 1
+        if self.speed > 0:
+            await asyncio.sleep(record["seconds"] / self.speed)
+        if "error_type" in record:
+            raise _replayed_error(record)
+        return record["content"]
+
+    def _append(self, record: Dict) -> None:
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+_active: Optional[Cassette] = None
+_env_checked = False
+
+
+def active_cassette() -> Optional[Cassette]:
+    """The cassette provider calls go through, if any.
+
+    PROVIDER_CASSETTE names the file, PROVIDER_CASSETTE_MODE is "record"
+    or "replay" (the default) and PROVIDER_REPLAY_SPEED scales replayed
+    timings (default 1, recorded speed; 0 for no delay).
+    """
+    global _active, _env_checked
+    if not _env_checked:
+        _env_checked = True
+        path = os.getenv("PROVIDER_CASSETTE")
+        if path and _active is None:
+            _active = Cassette(
+                path, os.getenv("PROVIDER_CASSETTE_MODE", "replay"),
+                float(os.getenv("PROVIDER_REPLAY_SPEED", "1"))
+            )
+    return _active
+
+
+def use_cassette(cassette: Optional[Cassette]) -> None:
+    """Send provider calls through `cassette` from now on; None goes back to the network."""
+    global _active, _env_checked
+    _active = cassette
+    _env_checked = True
+
+
+def _fresh_generator(kind: str, workdir: str):
+    """A generator whose stores all start empty in `workdir`, so every run makes the same requests."""
+    from examgeneratorupdated import ExamQuestionGenerator
+    from formula_library import FormulaLibrary
+    from job_store import JobStore
+    from lessonnotegeneratorupdated import LessonNoteGenerator
+    from question_bank import QuestionBank
+    from session_history import SessionHistory
+    from shared_services import SharedServices
+    from visual_aids import VisualAidIndex
+
+    run = tempfile.mkdtemp(dir=workdir)
+    services = SharedServices(
+        JobStore(os.path.join(run, "jobs.db")),
+        history=SessionHistory(os.path.join(run, "history.db")),
+        question_bank=QuestionBank(os.path.join(run, "bank.db")),
+        visual_aids=VisualAidIndex(os.path.join(run, "visual_aids.db")),
+        formula_library=FormulaLibrary(os.path.join(run, "formulae.db")),
+    )
+    if kind == "exam":
+        return ExamQuestionGenerator(services=services)
+    return LessonNoteGenerator(services=services)
+
+
+async def run_generations(kind: str, inputs: List[Dict], runs: int, concurrency: int) -> Dict:
+    """Generate `runs` notes or papers, `concurrency` at a time; returns timings and failures.
+
+    Runs cycle through `inputs`. Identical inputs in flight together share
+    their requests, so use distinct inputs to measure real throughput.
+    """
+    slots = asyncio.Semaphore(concurrency)
+    failures: List[str] = []
+    durations: List[float] = []
+
+    with tempfile.TemporaryDirectory() as workdir:
+        async def one(i: int) -> None:
+            async with slots:
+                generator = _fresh_generator(kind, workdir)
+                started = time.monotonic()
+                try:
+                    if kind == "exam":
+                        await generator.run_pipeline_async(dict(inputs[i % len(inputs)]))
+                    else:
+                        await generator.compose_note_async(dict(inputs[i % len(inputs)]))
+                except Exception as e:
+                    failures.append(f"run {i + 1}: {e}")
+                durations.append(time.monotonic() - started)
+
+        started = time.monotonic()
+        await asyncio.gather(*(one(i) for i in range(runs)))
+        elapsed = time.monotonic() - started
+    return {
+        "runs": runs,
+        "seconds": round(elapsed, 3),
+        "per_minute": round(runs * 60 / elapsed, 2) if elapsed else None,
+        "mean_run_seconds": round(sum(durations) / len(durations), 3) if durations else None,
+        "failures": failures,
+    }
+
+
+def main(argv=None) -> None:
+    """Record a cassette from live providers, or replay one as an offline throughput test."""
+    parser = argparse.ArgumentParser(description="Record or replay provider calls for generate_note/generate_questions")
+    parser.add_argument("mode", choices=Cassette.MODES)
+    parser.add_argument("cassette", help="JSON-lines cassette file")
+    parser.add_argument("--kind", choices=("lesson", "exam"), default="lesson")
+    parser.add_argument("--inputs", required=True, help="JSON file with one form inputs object or a list of them")
+    parser.add_argument("--runs", type=int, default=None, help="generations to run (default: one per inputs)")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed-up; 0 replies without delay")
+    args = parser.parse_args(argv)
+
+    with open(args.inputs, encoding="utf-8") as f:
+        inputs = json.load(f)
+    if isinstance(inputs, dict):
+        inputs = [inputs]
+    if args.mode == "record" and os.path.exists(args.cassette):
+        os.remove(args.cassette)
+    cassette = Cassette(args.cassette, args.mode, args.speed)
+    use_cassette(cassette)
+
+    from providers import PROVIDER_LOOP
+    summary = PROVIDER_LOOP.run(run_generations(
+        args.kind, inputs, args.runs or len(inputs), max(1, args.concurrency)
+    ))
+    summary.update(mode=args.mode, replayed=cassette.played, misses=cassette.misses)
+    print(json.dumps(summary, indent=2))
+    if summary["failures"] or cassette.misses:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+import time
+import tkinter as tk
+from tkinter import ttk
+from typing import Dict, Optional
+
+import profiling
+from providers import PROVIDER_STATS, ProviderStats
+from stall_monitor import StallMonitor
+
+
+class ProviderStatsPanel:
+    """Live table of per-provider latency and error statistics.
+
+    Refreshes itself every REFRESH_MS while open; only one panel exists per
+    process, and opening it again brings the existing one to the front.
+    """
+
+    REFRESH_MS = 2000
+    COLUMNS = (
+        ("provider", "Provider", 90),
+        ("model", "Model", 150),
+        ("task", "Task", 110),
+        ("calls", "Calls", 60),
+        ("error_rate", "Error rate", 80),
+        ("ewma_seconds", "EWMA (s)", 80),
+        ("p50_seconds", "p50 (s)", 70),
+        ("p95_seconds", "p95 (s)", 70),
+    )
+
+    _instance: Optional["ProviderStatsPanel"] = None
+
+    @classmethod
+    def show(cls, parent: tk.Misc, stats: ProviderStats = PROVIDER_STATS) -> "ProviderStatsPanel":
+        if cls._instance is not None and cls._instance.window.winfo_exists():
+            cls._instance.window.deiconify()
+            cls._instance.window.lift()
+            return cls._instance
+        cls._instance = cls(parent, stats)
+        return cls._instance
+
+    def __init__(self, parent: tk.Misc, stats: ProviderStats = PROVIDER_STATS) -> None:
+        self.stats = stats
+        self.window = tk.Toplevel(parent)
+        self.window.title("Provider Statistics")
+        self.window.geometry("760x300")
+
+        frame = ttk.Frame(self.window, padding=10)
+        frame.pack(fill="both", expand=True)
+        self.tree = ttk.Treeview(frame, columns=[c[0] for c in self.COLUMNS], show="headings")
+        for key, heading, width in self.COLUMNS:
+            self.tree.heading(key, text=heading)
+            self.tree.column(key, width=width, anchor="w" if key in ("provider", "model", "task") else "e")
+        self.tree.pack(fill="both", expand=True)
+        self.empty_label = ttk.Label(frame, text="No provider calls yet.")
+
+        self._after_id = None
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        self.refresh()
+
+    def refresh(self) -> None:
+        rows = self.stats.snapshot()
+        self.tree.delete(*self.tree.get_children())
+        for row in rows:
+            values = []
+            for key, _, _ in self.COLUMNS:
+                value = row[key]
+                if key == "error_rate":
+                    value = f"{value:.0%}"
+                values.append("–" if value is None else value)
+            self.tree.insert("", tk.END, values=values)
+        if rows:
+            self.empty_label.pack_forget()
+        else:
+            self.empty_label.pack(pady=(10, 0))
+        self._after_id = self.window.after(self.REFRESH_MS, self.refresh)
+
+    def close(self) -> None:
+        if self._after_id is not None:
+            self.window.after_cancel(self._after_id)
+        self.window.destroy()
+        ProviderStatsPanel._instance = None
+
+
+class ProfileSummaryPanel:
+    """The latest profiled actions and the hottest functions of the selected one.
+
+    Only one panel exists per process; it picks up newly profiled actions
+    every REFRESH_MS while open. The full .prof and allocation reports are
+    in the profile directory.
+    """
+
+    REFRESH_MS = 2000
+    ACTION_COLUMNS = (
+        ("action", "Action", 200),
+        ("seconds", "Time (s)", 80),
+        ("peak_mb", "Peak MB", 80),
+    )
+    FUNCTION_COLUMNS = (
+        ("function", "Function", 420),
+        ("calls", "Calls", 70),
+        ("own_seconds", "Own (s)", 80),
+        ("total_seconds", "Total (s)", 80),
+    )
+
+    _instance: Optional["ProfileSummaryPanel"] = None
+
+    @classmethod
+    def show(cls, parent: tk.Misc) -> "ProfileSummaryPanel":
+        if cls._instance is not None and cls._instance.window.winfo_exists():
+            cls._instance.window.deiconify()
+            cls._instance.window.lift()
+            return cls._instance
+        cls._instance = cls(parent)
+        return cls._instance
+
+    def __init__(self, parent: tk.Misc) -> None:
+        self.window = tk.Toplevel(parent)
+        self.window.title("Profile Summary")
+        self.window.geometry("700x460")
+
+        frame = ttk.Frame(self.window, padding=10)
+        frame.pack(fill="both", expand=True)
+        self.actions = self._tree(frame, self.ACTION_COLUMNS, height=5)
+        self.actions.bind("<<TreeviewSelect>>", lambda e: self._show_functions())
+        self.functions = self._tree(frame, self.FUNCTION_COLUMNS, height=10)
+        self.path_label = ttk.Label(frame, text="No actions profiled yet.")
+        self.path_label.pack(anchor="w", pady=(8, 0))
+
+        self._latest: Optional[Dict] = None
+        self._after_id = None
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        self.refresh()
+
+    def _tree(self, parent: tk.Misc, columns, height: int) -> ttk.Treeview:
+        tree = ttk.Treeview(parent, columns=[c[0] for c in columns], show="headings", height=height)
+        for key, heading, width in columns:
+            tree.heading(key, text=heading)
+            tree.column(key, width=width, anchor="w" if key in ("action", "function") else "e")
+        tree.pack(fill="both", expand=True, pady=(0, 8))
+        return tree
+
+    def refresh(self) -> None:
+        summaries = list(profiling.RECENT)
+        latest = summaries[-1] if summaries else None
+        if latest is not self._latest:
+            self._latest = latest
+            self.actions.delete(*self.actions.get_children())
+            for i, summary in enumerate(summaries):
+                self.actions.insert("", 0, iid=str(i), values=[summary[key] for key, _, _ in self.ACTION_COLUMNS])
+            self.actions.selection_set(str(len(summaries) - 1))
+        self._after_id = self.window.after(self.REFRESH_MS, self.refresh)
+
+    def _show_functions(self) -> None:
+        selection = self.actions.selection()
+        summaries = list(profiling.RECENT)
+        if not selection or int(selection[0]) >= len(summaries):
+            return
+        summary = summaries[int(selection[0])]
+        self.functions.delete(*self.functions.get_children())
+        for row in summary["functions"]:
+            self.functions.insert("", tk.END, values=[row[key] for key, _, _ in self.FUNCTION_COLUMNS])
+        self.path_label.config(text=summary["profile"])
+
+    def close(self) -> None:
+        if self._after_id is not None:
+            self.window.after_cancel(self._after_id)
+        self.window.destroy()
+        ProfileSummaryPanel._instance = None
+
+
+class StallPanel:
+    """UI freezes caught by a StallMonitor, newest first, with the stack sampled during each.
+
+    Only one panel exists per process; it picks up new stalls every
+    REFRESH_MS while open.
+    """
+
+    REFRESH_MS = 2000
+    COLUMNS = (
+        ("time", "Time", 140),
+        ("duration_ms", "Stall (ms)", 80),
+        ("where", "Blocked in", 360),
+    )
+
+    _instance: Optional["StallPanel"] = None
+
+    @classmethod
+    def show(cls, parent: tk.Misc, monitor: StallMonitor) -> "StallPanel":
+        if cls._instance is not None and cls._instance.window.winfo_exists():
+            cls._instance.window.deiconify()
+            cls._instance.window.lift()
+            return cls._instance
+        cls._instance = cls(parent, monitor)
+        return cls._instance
+
+    def __init__(self, parent: tk.Misc, monitor: StallMonitor) -> None:
+        self.monitor = monitor
+        self.window = tk.Toplevel(parent)
+        self.window.title("UI Stalls")
+        self.window.geometry("720x480")
+
+        frame = ttk.Frame(self.window, padding=10)
+        frame.pack(fill="both", expand=True)
+        ttk.Label(
+            frame, text=f"Event-loop stalls over {monitor.threshold * 1000:.0f} ms (log: {monitor.log_path})"
+        ).pack(anchor="w", pady=(0, 8))
+        self.tree = ttk.Treeview(frame, columns=[c[0] for c in self.COLUMNS], show="headings", height=8)
+        for key, heading, width in self.COLUMNS:
+            self.tree.heading(key, text=heading)
+            self.tree.column(key, width=width, anchor="e" if key == "duration_ms" else "w")
+        self.tree.pack(fill="both", expand=True)
+        self.tree.bind("<<TreeviewSelect>>", lambda e: self._show_stack())
+        self.stack_text = tk.Text(frame, height=12, wrap="none", font=("Consolas", 9))
+        self.stack_text.pack(fill="both", expand=True, pady=(8, 0))
+
+        self._latest: Optional[Dict] = None
+        self._after_id = None
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        self.refresh()
+
+    def refresh(self) -> None:
+        stalls = list(self.monitor.stalls)
+        latest = stalls[-1] if stalls else None
+        if latest is not self._latest:
+            self._latest = latest
+            self.tree.delete(*self.tree.get_children())
+            for i, stall in enumerate(stalls):
+                when = time.strftime("%H:%M:%S", time.localtime(stall["time"]))
+                self.tree.insert("", 0, iid=str(i), values=[when, stall["duration_ms"], stall["where"]])
+        self._after_id = self.window.after(self.REFRESH_MS, self.refresh)
+
+    def _show_stack(self) -> None:
+        selection = self.tree.selection()
+        stalls = list(self.monitor.stalls)
+        if not selection or int(selection[0]) >= len(stalls):
+            return
+        stall = stalls[int(selection[0])]
+        self.stack_text.delete("1.0", tk.END)
+        self.stack_text.insert("1.0", stall["stack"] or "The stall ended before a stack sample was taken.")
+
+    def close(self) -> None:
+        if self._after_id is not None:
+            self.window.after_cancel(self._after_id)
+        self.window.destroy()
+        StallPanel._instance = None
@@ -0,0 +1,98 @@
+import string
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from question_parser import ParsedQuestion
+
+
+VERSION_LABELS = string.ascii_uppercase
+NO_ANSWER = "-"
+
+
+class ExamVariants:
+    """K shuffled versions of one multiple-choice paper.
+
+    `question_order[v]` lists the original question indices in the order
+    version v prints them; `option_order[v, q]` lists original option
+    indices for question q (padding indices, >= that question's option
+    count, sort last); `answer_keys[v]` is version v's answer letters in
+    printed order.
+    """
+
+    def __init__(self, questions: List[ParsedQuestion], question_order: np.ndarray,
+                 option_order: np.ndarray, answer_keys: np.ndarray) -> None:
+        self.questions = questions
+        self.question_order = question_order
+        self.option_order = option_order
+        self.answer_keys = answer_keys
+
+    def __len__(self) -> int:
+        return len(self.question_order)
+
+    def label(self, version: int) -> str:
+        return VERSION_LABELS[version]
+
+    def paper_text(self, version: int) -> str:
+        """Version `version` as numbered exam text without answers."""
+        lines = []
+        for number, q_index in enumerate(self.question_order[version], 1):
+            question = self.questions[q_index]
+            line = f"{number}. {question.text}"
+            if question.options:
+                order = self.option_order[version, q_index, :len(question.options)]
+                line += " " + " ".join(
+                    f"({label}) {question.options[o][1]}"
+                    for label, o in zip(string.ascii_lowercase, order)
+                )
+            lines.append(line)
+        return "\n\n".join(lines)
+
+    def answer_key_text(self) -> str:
+        """Answer keys for every version, one block per version."""
+        blocks = []
+        for version, key in enumerate(self.answer_keys):
+            answers = [f"{number}. {letter}" for number, letter in enumerate(key, 1)]
+            blocks.append(f"Version {self.label(version)}\n" + "\n".join(answers))
+        return "\n\n".join(blocks)
+
+
+def make_variants(questions: List[ParsedQuestion], versions: int,
+                  seed: Optional[int] = None) -> ExamVariants:
+    """Shuffle question order and option order for `versions` copies of a paper.
+
+    All permutations come from one batch of random keys argsorted along the
+    last axis, and the answer keys are found by a single vectorised lookup,
+    so the cost barely grows with the number of versions.
+    """
+    if not 1 <= versions <= len(VERSION_LABELS):
+        raise ValueError(f"versions must be between 1 and {len(VERSION_LABELS)}")
+    rng = np.random.default_rng(seed)
+    n = len(questions)
+    option_counts = np.array([len(q.options) for q in questions], dtype=int)
+    width = max(int(option_counts.max(initial=0)), 1)
+
+    question_order = np.argsort(rng.random((versions, n)), axis=1)
+
+    # Padding slots get +inf keys so real options always come first
+    keys = rng.random((versions, n, width))
+    keys[:, np.arange(width)[None, :] >= option_counts[:, None]] = np.inf
+    option_order = np.argsort(keys, axis=2)
+
+    # Original index of each correct option, -1 where the answer is unknown
+    original_answer = np.array([
+        next((i for i, (label, _) in enumerate(q.options) if label == q.answer), -1)
+        for q in questions
+    ], dtype=int)
+    new_position = np.argmax(option_order == original_answer[None, :, None], axis=2)
+    letters = np.array(list(string.ascii_lowercase[:width]) + [NO_ANSWER])
+    new_position[:, original_answer < 0] = width
+    answer_keys = letters[np.take_along_axis(new_position, question_order, axis=1)]
+
+    return ExamVariants(questions, question_order, option_order, answer_keys)
+
+
+def variant_filenames(base: str, versions: int) -> Tuple[List[str], str]:
+    """Paper file names for each version plus the answer-key file name."""
+    papers = [f"{base}_version_{VERSION_LABELS[v]}.docx" for v in range(versions)]
+    return papers, f"{base}_answer_keys.docx"
@@ -1,15 +1,41 @@
+import asyncio
 import os
+import queue
 import re
+import sqlite3
+import sys
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext, filedialog
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from tkinter import ttk, messagebox, scrolledtext, filedialog, simpledialog
 from tkinter import font as tkfont
-from typing import List, Optional, Tuple
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
 from PIL import Image, ImageTk
-import requests
+import numpy as np
 from docx import Document
 from docx.shared import Pt # Import Pt for font sizing
 from dotenv import load_dotenv
-from groq import Groq
+from diagnostics import ProfileSummaryPanel, ProviderStatsPanel
+from exam_variants import make_variants, variant_filenames
+from history_view import HistoryPanel
+from job_store import JobStore
+from lms_exporters import EXPORTERS
+from question_bank import KIND_LABELS, QuestionBank, assemble_paper, format_paper
+from output_view import ChunkedOutputView
+from objective_coverage import objective_coverage, similarity_matrix
+import profiling
+from profiling import ActionProfile, profiled_action
+from progress import ProgressSink, emit, reporting_to, section
+from progress_view import ProgressPanel
+from providers import (
+    PROVIDER_LOOP, GroqProvider, OpenAICompatibleProvider, ProviderError, ProviderRouter, get_local_provider
+)
+from question_parser import ANSWER_PATTERN, QUESTION_KINDS, ParsedQuestion, mc_defects, parse_block, parse_questions
+from request_scheduler import run_as
+from retry_policy import RetryPolicy, RetryStats, job_deadline
+from section_cache import fingerprint
+from session_history import SessionHistory
+from shared_services import SharedServices
 
 # Load environment variables
 load_dotenv()
@@ -77,6 +103,21 @@ class ExamQuestionGenerator:
     PAD_X = 15
     PAD_Y = 10
     CARD_PADDING = 20
+    MAX_QUESTIONS = 200
+
+    # Chunked generation: requests above CHUNK_SIZE are split per objective
+    # and sent concurrently, then topped up until the requested count is met
+    CHUNK_SIZE = 10
+    MAX_PARALLEL_REQUESTS = 4
+    MAX_TOP_UP_ROUNDS = 2
+
+    # Objectives whose best question similarity falls below this threshold
+    # get a small follow-up request of their own
+    COVERAGE_THRESHOLD = 0.15
+    COVERAGE_FOLLOW_UP_QUESTIONS = 1
+
+    # Malformed MC questions are sent back for repair in batches of this size
+    REPAIR_BATCH_SIZE = 5
 
     # STEM subjects list
     STEM_SUBJECTS = [
@@ -84,13 +125,63 @@ class ExamQuestionGenerator:
         "chemistry", "physics", "biology", 
         "agricultural science", "computer science", "geography"
     ]
+
+    # Retry behaviour per provider before falling back to the next one
+    RETRY_POLICIES = {
+        "groq": RetryPolicy(max_attempts=4, base_delay=1.0, max_delay=20.0, deadline=90.0),
+        "together": RetryPolicy(max_attempts=3, base_delay=1.0, max_delay=15.0, deadline=60.0),
+        "local": RetryPolicy(max_attempts=2, base_delay=0.5, max_delay=5.0, deadline=300.0),
+    }
+    
+    FAILED_TEXT = "[Failed to generate questions with both APIs]"
+
+    # Time budget in seconds for a whole paper from the window. When it runs
+    # out, outstanding requests are cancelled and the questions so far shown.
+    JOB_DEADLINE = 600
+    GENERATION_POLL_MS = 100
+
+    # Shuffled versions are labelled A-Z
+    MAX_VARIANTS = 26
     
-    def __init__(self, root: tk.Tk) -> None:
-        """Initialize the application with the main window."""
+    def __init__(self, root: Optional[tk.Tk] = None, job_store: Optional[JobStore] = None,
+                 question_bank: Optional[QuestionBank] = None, history: Optional[SessionHistory] = None,
+                 services: Optional[SharedServices] = None) -> None:
+        """Initialize the application with the main window.
+
+        Without a root window the generator runs headless (service mode):
+        only the pipeline methods are available. `services` are shared with
+        the other windows the launcher opened; without them the generator
+        gets its own stores and provider route.
+        """
         self.root = root
+        self.services = services or SharedServices(job_store)
+        # Requests from this window are scheduled fairly against other windows'
+        self.client_id = f"exam-{id(self):x}"
+        self.retry_stats = RetryStats()
+        self.providers = self.services.router("exam", lambda: ProviderRouter(
+            [
+                GroqProvider("llama3-70b-8192"),
+                # Smaller model over Together's REST API as the fallback
+                OpenAICompatibleProvider(
+                    "together", "https://api.together.ai/v1", "gpt-4o-mini",
+                    api_key_env="TOGETHER_AI_API_KEY"
+                ),
+            ],
+            get_local_provider()
+        ))
+        self.job_store = job_store or self.services.job_store
+        self.question_bank = question_bank or self.services.question_bank
+        self.history = history or self.services.history
+        self._generation = None
+        self._generation_profile: Optional[ActionProfile] = None
+        # Question number -> correct option of the paper on display, kept out of its text
+        self.answer_key: Dict[int, str] = {}
+        if root is None:
+            return
         self._setup_window()
         self._configure_styles()
         self._setup_ui()
+        self.root.after(500, self._offer_resume)
         
     def _setup_window(self) -> None:
         """Configure the main window properties."""
@@ -450,7 +541,7 @@ class ExamQuestionGenerator:
         self.num_questions_spin = ttk.Spinbox(
             form_frame,
             from_=1,
-            to=50,
+            to=self.MAX_QUESTIONS,
             textvariable=self.num_questions_var,
             width=self.INPUT_WIDTH - 10
         )
@@ -502,6 +593,24 @@ class ExamQuestionGenerator:
             command=self.generate_questions
         )
         self.generate_btn.pack(pady=5, ipadx=20)
+
+        self.cancel_btn = ModernButton(
+            btn_frame,
+            text="Cancel Generation",
+            command=self.cancel_generation,
+            state="disabled"
+        )
+        self.cancel_btn.pack(pady=5, ipadx=20)
+
+        self.progress_panel = ProgressPanel(btn_frame, rows=4)
+        self.progress_panel.frame.pack(fill="x", pady=(5, 10))
+
+        self.assemble_btn = ModernButton(
+            btn_frame,
+            text="Assemble from Question Bank",
+            command=self.assemble_from_bank
+        )
+        self.assemble_btn.pack(pady=5, ipadx=20)
     
     def _create_output_section(self) -> None:
         """Create the output display section."""
@@ -519,6 +628,15 @@ class ExamQuestionGenerator:
             style="SectionTitle.TLabel"
         )
         section_title.pack(anchor="w", pady=(0, 15))
+
+        # Objective coverage summary, filled in after generation
+        self.coverage_label = ttk.Label(
+            output_frame,
+            text="",
+            foreground=self.LIGHT_TEXT,
+            justify="left"
+        )
+        self.coverage_label.pack(anchor="w", pady=(0, 10))
         
         # Text area with scrollbars
         self.output_text = scrolledtext.ScrolledText(
@@ -539,6 +657,19 @@ class ExamQuestionGenerator:
             highlightthickness=1
         )
         self.output_text.pack(fill="both", expand=True)
+
+        # Large question banks are inserted incrementally and paged
+        nav_frame = ttk.Frame(output_frame, style="Card.TFrame")
+        nav_frame.pack(fill="x", pady=(10, 0))
+        self.output_view = ChunkedOutputView(self.output_text, nav_parent=nav_frame, read_only=True)
+        ttk.Button(
+            nav_frame, text="Provider Stats", command=lambda: ProviderStatsPanel.show(self.root)
+        ).pack(side="right", padx=(0, 10))
+        ttk.Button(nav_frame, text="History", command=self.show_history).pack(side="right", padx=(0, 10))
+        if profiling.enabled():
+            ttk.Button(
+                nav_frame, text="Profile Summary", command=lambda: ProfileSummaryPanel.show(self.root)
+            ).pack(side="right", padx=(0, 10))
         
         # Export button (centered with padding)
         btn_frame = ttk.Frame(self.content_frame)
@@ -551,62 +682,360 @@ class ExamQuestionGenerator:
         )
         self.export_btn.pack(pady=5, ipadx=20)
 
+        # LMS export (Moodle XML, GIFT, QTI)
+        lms_frame = ttk.Frame(btn_frame)
+        lms_frame.pack(pady=5)
+        self.lms_format_var = tk.StringVar()
+        self.lms_format_cb = ttk.Combobox(
+            lms_frame,
+            textvariable=self.lms_format_var,
+            state="readonly",
+            values=list(EXPORTERS),
+            width=12
+        )
+        self.lms_format_cb.pack(side="left", padx=(0, 10))
+        self.lms_format_cb.current(0)
+        self.lms_export_btn = ModernButton(
+            lms_frame,
+            text="Export for LMS",
+            command=self.export_to_lms
+        )
+        self.lms_export_btn.pack(side="left", ipadx=20)
+
+        self.variants_btn = ModernButton(
+            btn_frame,
+            text="Export Shuffled Versions",
+            command=self.export_variants
+        )
+        self.variants_btn.pack(pady=5, ipadx=20)
+
     def is_stem_subject(self, subject: str) -> bool:
         """Checks if the given subject is a STEM subject."""
         return subject.lower() in self.STEM_SUBJECTS
 
-    def generate_questions(self) -> None:
-        """Generate exam questions based on user input."""
-        try:
-            if not self._validate_inputs():
-                return
+    def generate_questions(self, job_id: Optional[str] = None) -> None:
+        """Start generating exam questions based on user input.
+
+        The pipeline runs on the provider loop so the window stays
+        responsive and Cancel can stop it. Each generation is recorded in
+        the job store with its finished requests checkpointed; pass `job_id`
+        to resume an interrupted one.
+        """
+        if self._generation is not None or not self._validate_inputs():
+            return
+        if job_id is not None and not self.services.claim_job(job_id):
+            messagebox.showinfo("Resume Generation", "This exam is already being generated in another window.")
+            return
+
+        self._display_generating_message()
+        self.retry_stats.reset()
+
+        inputs = self.get_form_inputs()
+        if job_id is None:
+            job_id = self.job_store.create_job("exam", inputs, origin="gui")
+            self.services.claim_job(job_id)
+        self.job_store.set_status(job_id, "running")
+        self._generation_profile = ActionProfile.start("generate_questions")
+        # Progress events arrive on the provider loop's thread; they are
+        # queued and drained into the panel from the Tk thread
+        events: queue.Queue = queue.Queue()
+        self.progress_panel.reset()
+        future = PROVIDER_LOOP.submit(run_as(self.client_id, self.run_pipeline_async(
+            inputs, progress=events.put, job_id=job_id, deadline=self.JOB_DEADLINE
+        )))
+        self._generation = (job_id, inputs, future, events)
+        self.generate_btn.config(state="disabled")
+        self.cancel_btn.config(state="normal")
+        self.root.after(self.GENERATION_POLL_MS, self._check_generation)
+
+    def cancel_generation(self) -> None:
+        """Stop the running generation; its outstanding requests are cancelled at once."""
+        if self._generation is not None:
+            self._generation[2].cancel()
+
+    def close(self) -> None:
+        """Stop this window's generation before the window is destroyed."""
+        if self._generation is not None:
+            job_id, _, future, _ = self._generation
+            self._generation = None
+            future.cancel()
+            self.job_store.set_status(job_id, "cancelled")
+            self.services.release_job(job_id)
+        if self._generation_profile is not None:
+            self._generation_profile.stop()
+            self._generation_profile = None
+
+    def _check_generation(self) -> None:
+        """Show progress, then the paper once generation has finished, failed or been cancelled."""
+        if self._generation is None:
+            # The window was closed
+            return
+        job_id, inputs, future, events = self._generation
+        self.progress_panel.drain(events)
+        if not future.done():
+            self.root.after(self.GENERATION_POLL_MS, self._check_generation)
+            return
+        self._generation = None
+        self.services.release_job(job_id)
+        self.generate_btn.config(state="normal")
+        self.cancel_btn.config(state="disabled")
+        if self._generation_profile is not None:
+            self._generation_profile.stop()
+            self._generation_profile = None
+
+        if future.cancelled():
+            self.job_store.set_status(job_id, "cancelled")
+            self._show_partial_paper(inputs, job_id)
+            return
+        error = future.exception()
+        if isinstance(error, TimeoutError):
+            # Left as failed so the paper is offered for resuming next time
+            self.job_store.set_status(job_id, "failed", error=f"Deadline of {self.JOB_DEADLINE}s reached")
+            self._show_partial_paper(inputs, job_id)
+            messagebox.showwarning(
+                "Generation Timed Out",
+                f"The paper was not finished within {self.JOB_DEADLINE} seconds. "
+                "The questions generated so far are shown."
+            )
+            return
+        if error is not None:
+            self.job_store.set_status(job_id, "failed", error=str(error))
+            self._show_paper("", {})
+            messagebox.showerror("Error", f"Error generating questions: {str(error)}")
+            return
+
+        clean_text, coverage, answers = future.result()
+        self.job_store.set_status(job_id, "done", result={"text": clean_text, "answers": answers})
+        self.history.add("exam", inputs, {"text": clean_text, "coverage": coverage, "answers": answers})
+        self._show_coverage(coverage)
+        print(f"API stats: {self.retry_stats.summary()}")
+        self._show_paper(clean_text, answers)
+
+    def _show_partial_paper(self, inputs: Dict, job_id: str) -> None:
+        """Show the questions a stopped generation had already received."""
+        self._show_coverage([])
+        self._show_paper(*self.partial_paper(inputs, job_id))
+
+    def _show_paper(self, text: str, answers: Dict[int, str]) -> None:
+        """Display a paper and keep its answer key for the exports."""
+        self.answer_key = answers
+        self.output_view.set_content(text)
+    
+    def _offer_resume(self) -> None:
+        """Offer to finish the most recent exam generation that was cut short."""
+        jobs = self.services.resumable(self.job_store.unfinished_jobs("gui", "exam"))
+        if not jobs:
+            return
+        job = jobs[-1]
+        inputs = job["inputs"]
+        done = len(self.job_store.load_sections(job["id"]))
+        if not messagebox.askyesno(
+            "Resume Generation",
+            f"An interrupted exam for {inputs['class']} {inputs['subject']} ('{inputs['topic']}') "
+            f"was found with {done} request(s) already completed.\n\nResume it now?"
+        ):
+            self.job_store.set_status(job["id"], "abandoned")
+            return
+        self._fill_form(inputs)
+        self.generate_questions(job["id"])
+
+    def show_history(self) -> None:
+        """Open the searchable list of earlier papers."""
+        HistoryPanel(self.root, self.history, "exam", self._open_history_entry, title="Exam History")
 
-            prompt = self._build_prompt()
-            self._display_generating_message()
+    def _open_history_entry(self, entry: Dict) -> None:
+        """Show an earlier paper exactly as it was generated, without calling a provider."""
+        self._fill_form(entry["inputs"])
+        self._show_coverage([tuple(row) for row in entry["result"]["coverage"]])
+        # JSON turned the question numbers into strings
+        answers = {int(number): answer for number, answer in entry["result"].get("answers", {}).items()}
+        self._show_paper(entry["result"]["text"], answers)
+
+    def _fill_form(self, inputs: Dict) -> None:
+        """Put a stored inputs dict back into the form."""
+        self.class_var.set(inputs["class"])
+        self.question_type_var.set(inputs["question_type"])
+        self.num_questions_var.set(inputs["num_questions"])
+        for entry, value in [(self.subject_entry, inputs["subject"]), (self.topic_entry, inputs["topic"])]:
+            entry.delete(0, tk.END)
+            entry.insert(0, value)
+        for i, entry in enumerate(self.objective_entries):
+            entry.delete(0, tk.END)
+            if i < len(inputs["objectives"]):
+                entry.insert(0, inputs["objectives"][i])
+
+    def get_form_inputs(self) -> Dict:
+        """Collect the form values into the inputs dict the pipeline works on."""
+        return {
+            "class": self.class_var.get().strip(),
+            "subject": self.subject_entry.get().strip(),
+            "topic": self.topic_entry.get().strip(),
+            "question_type": self.question_type_var.get().strip(),
+            "num_questions": self.num_questions_var.get(),
+            "objectives": [
+                e.get().strip() for e in self.objective_entries if e.get().strip()
+            ],
+        }
+
+    def validate_inputs(self, inputs: Dict) -> Optional[str]:
+        """Return an error message if the inputs cannot be used, otherwise None."""
+        if len(inputs["objectives"]) < 3:
+            return "Please enter at least 3 behavioral objectives."
             
-            questions_text = self._try_generate_with_fallback(prompt)
-            clean_text = self._process_ai_response(questions_text)
+        if not all([inputs["class"], inputs["subject"], inputs["topic"], inputs["question_type"]]):
+            return "Please fill in all required fields."
+
+        if not 1 <= inputs["num_questions"] <= self.MAX_QUESTIONS:
+            return f"Number of questions must be between 1 and {self.MAX_QUESTIONS}."
             
-            self.output_text.config(state="normal")
-            self.output_text.delete(1.0, tk.END)
-            self.output_text.insert(tk.END, clean_text)
-            self.output_text.config(state="disabled")
+        return None
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Error generating questions: {str(e)}")
-    
     def _validate_inputs(self) -> bool:
         """Validate user inputs before generating questions."""
-        cls = self.class_var.get().strip()
-        subject = self.subject_entry.get().strip()
-        topic = self.topic_entry.get().strip()
-        question_type = self.question_type_var.get().strip()
-        
-        behavioral_objectives = [
-            e.get().strip() for e in self.objective_entries if e.get().strip()
-        ]
-        
-        if len(behavioral_objectives) < 3:
-            messagebox.showerror("Error", "Please enter at least 3 behavioral objectives.")
+        error = self.validate_inputs(self.get_form_inputs())
+        if error:
+            messagebox.showerror("Error", error)
             return False
-            
-        if not all([cls, subject, topic, question_type]):
-            messagebox.showerror("Error", "Please fill in all required fields.")
-            return False
-            
         return True
-    
-    def _build_prompt(self) -> str:
-        """Build the prompt for the AI based on user inputs."""
-        cls = self.class_var.get().strip()
-        subject = self.subject_entry.get().strip()
-        topic = self.topic_entry.get().strip()
-        question_type = self.question_type_var.get().strip()
-        num_questions = self.num_questions_var.get()
-        
-        behavioral_objectives = [
-            e.get().strip() for e in self.objective_entries if e.get().strip()
-        ]
+
+    def run_pipeline(
+        self,
+        inputs: Dict,
+        progress: Optional[ProgressSink] = None,
+        job_id: Optional[str] = None,
+        deadline: Optional[float] = None
+    ) -> Tuple[str, List[Tuple[str, float, int]], Dict[int, str]]:
+        """Blocking run_pipeline_async; `progress` is called from the provider loop's thread."""
+        return PROVIDER_LOOP.run(self.run_pipeline_async(inputs, progress, job_id, deadline))
+
+    async def run_pipeline_async(
+        self,
+        inputs: Dict,
+        progress: Optional[ProgressSink] = None,
+        job_id: Optional[str] = None,
+        deadline: Optional[float] = None
+    ) -> Tuple[str, List[Tuple[str, float, int]], Dict[int, str]]:
+        """Generate a processed exam paper from an inputs dict, without the UI.
+
+        Returns the question text, the per-objective coverage as
+        (objective, best similarity, questions assigned) and the answer key
+        (question number -> correct option) of the MC questions the
+        provider marked, which is left out of the text. `progress`, if
+        given, receives a ProgressEvent for every request and stage.
+        With a `job_id`, every completed request is checkpointed and reused
+        when the job is resumed. `deadline` (seconds) bounds the whole
+        paper: when it passes, outstanding requests are cancelled and
+        TimeoutError is raised, leaving the checkpoints for partial_paper.
+        """
+        with reporting_to(progress):
+            async with job_deadline(deadline):
+                return await self._run_stages(inputs, job_id)
+
+    async def _run_stages(
+        self, inputs: Dict, job_id: Optional[str]
+    ) -> Tuple[str, List[Tuple[str, float, int]], Dict[int, str]]:
+        generate = partial(self._generate_checkpointed, job_id=job_id)
+        num_questions = inputs["num_questions"]
+        if num_questions <= self.CHUNK_SIZE:
+            questions_text = (await self._generate_all([self._build_prompt(inputs)], generate, ["Questions"]))[0]
+        else:
+            questions_text = await self._generate_chunked(inputs, generate)
+        questions_text, coverage = await self._ensure_objective_coverage(questions_text, inputs, generate)
+        emit("message", message="Cleaning and formatting questions...")
+        clean_text = self._process_ai_response(questions_text, inputs)
+        if inputs["question_type"] == "Multiple Choice":
+            clean_text = await self._repair_mc_questions(clean_text, inputs, generate)
+        try:
+            # Stored with its answer lines, so bank papers keep their answers
+            added = self.question_bank.add_paper(inputs, clean_text)
+            print(f"Question bank: {added} new questions stored")
+        except sqlite3.Error as e:
+            print(f"Could not store questions in the bank: {e}")
+        clean_text, answers = self._split_answers(clean_text)
+        return clean_text, coverage, answers
+
+    def partial_paper(self, inputs: Dict, job_id: str) -> Tuple[str, Dict[int, str]]:
+        """The questions a stopped job had received, cleaned and numbered, and their answer key.
+
+        Coverage top-ups and MC repairs are skipped; the paper may be short.
+        """
+        blocks: List[str] = []
+        for content in self.job_store.load_sections(job_id).values():
+            blocks.extend(self._split_questions(self._clean_ai_response(content, keep_answers=True)))
+        if not blocks:
+            return "[No questions were generated before the generation stopped]", {}
+        return self._split_answers(self._process_ai_response("\n\n".join(blocks[:inputs["num_questions"]]), inputs))
+
+    def build_paper_from_bank(self, inputs: Dict, type_mix: Optional[Dict[str, int]] = None) -> Tuple[str, Dict[str, int]]:
+        """Build a paper from the question bank alone, without any provider calls.
+
+        `type_mix` maps question kinds ("mc", "theory", "essay") to counts and
+        defaults to all `num_questions` of the form's question type. Returns
+        the paper text (empty if nothing matched) and the shortfall per kind.
+        """
+        if type_mix is None:
+            type_mix = {QUESTION_KINDS[inputs["question_type"]]: inputs["num_questions"]}
+        candidates = self.question_bank.candidates(inputs["class"], inputs["subject"], list(type_mix))
+        questions, shortfall = assemble_paper(
+            candidates, inputs["objectives"], type_mix, min_relevance=self.COVERAGE_THRESHOLD
+        )
+        text = format_paper(questions)
+        if text and self.is_stem_subject(inputs["subject"]):
+            text = self._format_stem_content(text, inputs["subject"])
+        return text, shortfall
+
+    @profiled_action("assemble_from_bank")
+    def assemble_from_bank(self) -> None:
+        """Fill the output with a paper assembled from previously generated questions."""
+        if not self._validate_inputs():
+            return
+        inputs = self.get_form_inputs()
+        text, shortfall = self.build_paper_from_bank(inputs)
+        if not text:
+            messagebox.showinfo(
+                "Question Bank",
+                f"No stored questions match {inputs['class']} {inputs['subject']} and these objectives yet.\n"
+                "Generate a paper first to start the bank."
+            )
+            return
+
+        # Bank papers carry their answers as "Answer:" lines; keep them out of the paper
+        text, answers = self._split_answers(text)
+        self._show_paper(text, answers)
+        self._show_coverage([
+            (objective, float(score), int(count))
+            for objective, score, count in zip(inputs["objectives"], *objective_coverage(
+                self._split_questions(text), inputs["objectives"]
+            ))
+        ])
+        if shortfall:
+            missing = ", ".join(f"{count} {KIND_LABELS[kind]}" for kind, count in shortfall.items())
+            messagebox.showwarning(
+                "Question Bank",
+                f"The bank did not have enough distinct matching questions; the paper is short by {missing}."
+            )
+
+    def _build_prompt(
+        self,
+        inputs: Dict,
+        num_questions: Optional[int] = None,
+        objectives: Optional[List[str]] = None,
+        avoid_questions: Optional[List[str]] = None
+    ) -> str:
+        """Build the prompt for the AI based on user inputs.
+
+        `num_questions` and `objectives` default to the values in `inputs`;
+        chunked generation overrides them to request a slice of the paper.
+        `avoid_questions` lists already generated questions not to repeat.
+        """
+        cls = inputs["class"]
+        subject = inputs["subject"]
+        topic = inputs["topic"]
+        question_type = inputs["question_type"]
+        if num_questions is None:
+            num_questions = inputs["num_questions"]
+        
+        behavioral_objectives = objectives if objectives is not None else inputs["objectives"]
         objectives_str = "; ".join(behavioral_objectives)
         
         question_type_lower = question_type.lower()
@@ -649,99 +1078,372 @@ class ExamQuestionGenerator:
                 "- Represent fractions clearly, e.g., 1/2 as ½ or using a fraction slash (e.g., 1⁄2).\n"
                 "- Ensure formulas are correctly written with appropriate symbols and subscripts/superscripts.\n"
             )
+
+        if avoid_questions:
+            base_instructions += "\nDo NOT repeat or rephrase any of these existing questions:\n"
+            base_instructions += "\n".join(f"- {q}" for q in avoid_questions) + "\n"
             
         return base_instructions
+
+    def _plan_chunks(self, num_questions: int, objectives: List[str]) -> List[Tuple[int, List[str]]]:
+        """Split a large request into (count, objectives) chunks.
+
+        Questions are shared out evenly across objectives, and each
+        objective's share is further split into chunks of at most CHUNK_SIZE.
+        """
+        if num_questions <= self.CHUNK_SIZE or not objectives:
+            return [(num_questions, objectives)]
+
+        chunks = []
+        base, extra = divmod(num_questions, len(objectives))
+        for i, objective in enumerate(objectives):
+            share = base + (1 if i < extra else 0)
+            while share > 0:
+                count = min(share, self.CHUNK_SIZE)
+                chunks.append((count, [objective]))
+                share -= count
+        return chunks
+
+    def _split_questions(self, text: str) -> List[str]:
+        """Split cleaned AI output into question blocks, one per numbered question."""
+        blocks = []
+        current = []
+        for line in text.splitlines():
+            if re.match(r"^\s*\d+\.", line):
+                if current:
+                    blocks.append("\n".join(current).strip())
+                current = [line]
+            elif current and line.strip():
+                current.append(line)
+        if current:
+            blocks.append("\n".join(current).strip())
+        return blocks
+
+    def _question_key(self, block: str) -> str:
+        """Normalise a question block to its stem for duplicate detection."""
+        stem = re.sub(r"^\s*\d+\.\s*", "", block.splitlines()[0])
+        stem = re.sub(r"\s*\([a-d]\).*", "", stem, flags=re.IGNORECASE)
+        stem = re.sub(r"[^\w\s]", "", stem.lower())
+        return " ".join(stem.split())
+
+    async def _generate_checkpointed(self, prompt: str, job_id: Optional[str] = None) -> str:
+        """Generate for one prompt, reusing the job's checkpoint for it if one exists."""
+        if job_id is None:
+            return await self._try_generate_with_fallback(prompt)
+        name = fingerprint("prompt", prompt)
+        content = self.job_store.load_section(job_id, name)
+        if content is None:
+            content = await self._try_generate_with_fallback(prompt)
+            if content != self.FAILED_TEXT:
+                self.job_store.save_section(job_id, name, content)
+        return content
+
+    async def _generate_all(
+        self,
+        prompts: List[str],
+        generate: Optional[Callable[[str], Awaitable[str]]] = None,
+        labels: Optional[List[str]] = None
+    ) -> List[str]:
+        """Generate for every prompt concurrently, MAX_PARALLEL_REQUESTS at a time, in order.
+
+        Each prompt is reported as a progress section named by `labels`.
+        """
+        generate = generate or self._try_generate_with_fallback
+        labels = labels or [f"Request {i}" for i in range(1, len(prompts) + 1)]
+        slots = asyncio.Semaphore(self.MAX_PARALLEL_REQUESTS)
+        emit("plan", total=len(prompts))
+
+        async def generate_one(prompt: str, label: str) -> str:
+            async with slots:
+                with section(label):
+                    result = await generate(prompt)
+                    if result == self.FAILED_TEXT:
+                        emit("section_failed", message="no provider answered")
+                    return result
+
+        return list(await asyncio.gather(*(generate_one(p, label) for p, label in zip(prompts, labels))))
+
+    async def _generate_chunked(
+        self,
+        inputs: Dict,
+        generate: Optional[Callable[[str], Awaitable[str]]] = None
+    ) -> str:
+        """Generate a large paper as concurrent chunks, merged and topped up."""
+        num_questions = inputs["num_questions"]
+        objectives = inputs["objectives"]
+        prompts = [
+            self._build_prompt(inputs, count, chunk_objectives)
+            for count, chunk_objectives in self._plan_chunks(num_questions, objectives)
+        ]
+
+        questions: List[str] = []
+        seen = set()
+        for round_number in range(self.MAX_TOP_UP_ROUNDS + 1):
+            label = "Chunk" if round_number == 0 else f"Top-up {round_number}, chunk"
+            results = await self._generate_all(
+                prompts, generate, [f"{label} {i}" for i in range(1, len(prompts) + 1)]
+            )
+
+            for result in results:
+                for block in self._split_questions(self._clean_ai_response(result, keep_answers=True)):
+                    key = self._question_key(block)
+                    if key and key not in seen:
+                        seen.add(key)
+                        questions.append(block)
+
+            missing = num_questions - len(questions)
+            if missing <= 0 or round_number == self.MAX_TOP_UP_ROUNDS:
+                break
+
+            print(f"Chunked generation short by {missing} questions; requesting more")
+            emit("message", message=f"Generated {len(questions)} of {num_questions} questions; requesting more...")
+            existing = [q.splitlines()[0] for q in questions]
+            prompts = [
+                self._build_prompt(inputs, count, chunk_objectives, existing)
+                for count, chunk_objectives in self._plan_chunks(missing, objectives)
+            ]
+
+        return "\n\n".join(questions[:num_questions])
     
-    def _display_generating_message(self) -> None:
+    async def _ensure_objective_coverage(
+        self,
+        questions_text: str,
+        inputs: Dict,
+        generate: Optional[Callable[[str], Awaitable[str]]] = None
+    ) -> Tuple[str, List[Tuple[str, float, int]]]:
+        """Re-request questions for objectives the paper does not cover.
+
+        Coverage is the best TF-IDF similarity between any question and the
+        objective. Each objective below COVERAGE_THRESHOLD gets a small
+        follow-up prompt; surplus questions are then trimmed from the most
+        heavily covered objectives so the paper keeps its requested length.
+        Returns the paper and its final (objective, score, count) coverage.
+        """
+        objectives = inputs["objectives"]
+        questions = self._split_questions(self._clean_ai_response(questions_text, keep_answers=True))
+        if not questions:
+            return questions_text, []
+
+        scores, _ = objective_coverage(questions, objectives)
+        uncovered = [obj for obj, score in zip(objectives, scores) if score < self.COVERAGE_THRESHOLD]
+        if uncovered:
+            print(f"Requesting follow-up questions for {len(uncovered)} uncovered objectives")
+            existing = [q.splitlines()[0] for q in questions]
+            prompts = [
+                self._build_prompt(inputs, self.COVERAGE_FOLLOW_UP_QUESTIONS, [obj], existing)
+                for obj in uncovered
+            ]
+            results = await self._generate_all(prompts, generate, [f"Coverage: {obj}" for obj in uncovered])
+
+            seen = {self._question_key(q) for q in questions}
+            for result in results:
+                for block in self._split_questions(self._clean_ai_response(result, keep_answers=True)):
+                    key = self._question_key(block)
+                    if key and key not in seen:
+                        seen.add(key)
+                        questions.append(block)
+
+            questions = self._trim_to_count(questions, objectives, inputs["num_questions"])
+
+        scores, counts = objective_coverage(questions, objectives)
+        coverage = [
+            (objective, float(score), int(count))
+            for objective, score, count in zip(objectives, scores, counts)
+        ]
+        return "\n\n".join(questions), coverage
+
+    def _trim_to_count(self, questions: List[str], objectives: List[str], num_questions: int) -> List[str]:
+        """Drop surplus questions, taking them from the most-covered objective first.
+
+        Questions that share no terms with any objective are unassigned and
+        are dropped before any objective loses a question.
+        """
+        surplus = len(questions) - num_questions
+        if surplus <= 0:
+            return questions
+
+        similarity = similarity_matrix(questions, objectives)
+        assigned = similarity.argmax(axis=1)
+        unassigned = np.flatnonzero(similarity.max(axis=1) <= 0)
+        assigned[unassigned] = -1
+        counts = np.bincount(assigned[assigned >= 0], minlength=len(objectives))
+        keep = np.ones(len(questions), dtype=bool)
+        for index in unassigned[::-1][:surplus]:
+            keep[index] = False
+            surplus -= 1
+        for _ in range(surplus):
+            busiest = counts.argmax()
+            # Remove the last remaining question assigned to the busiest objective
+            index = np.flatnonzero(keep & (assigned == busiest))[-1]
+            keep[index] = False
+            counts[busiest] -= 1
+        return [q for q, kept in zip(questions, keep) if kept]
+
+    def _question_spans(self, lines: List[str]) -> List[Tuple[int, int]]:
+        """(start, end) line ranges of each numbered question, trailing blank lines excluded."""
+        starts = [i for i, line in enumerate(lines) if re.match(r"^\s*\d+\.", line)]
+        spans = []
+        for start, next_start in zip(starts, starts[1:] + [len(lines)]):
+            end = next_start
+            while end > start + 1 and not lines[end - 1].strip():
+                end -= 1
+            spans.append((start, end))
+        return spans
+
+    async def _repair_mc_questions(
+        self,
+        questions_text: str,
+        inputs: Dict,
+        generate: Optional[Callable[[str], Awaitable[str]]] = None
+    ) -> str:
+        """Re-request only the MC questions that fail validation and splice fixes in place.
+
+        Each defective question (wrong number of options, bad labels, empty
+        or identical options) goes into a small repair prompt with its
+        defects listed, REPAIR_BATCH_SIZE questions per prompt, so the cost
+        is proportional to the number of defects. A repair that still fails
+        validation is discarded and the original kept. The paper is then
+        renumbered.
+        """
+        lines = questions_text.splitlines()
+        spans = self._question_spans(lines)
+        defective = []
+        for start, end in spans:
+            question = parse_block(lines[start:end], "mc")
+            defects = mc_defects(question)
+            if defects:
+                defective.append(((start, end), question, defects))
+        if not defective:
+            return self._fix_numbering(questions_text)
+
+        batches = [
+            defective[i:i + self.REPAIR_BATCH_SIZE]
+            for i in range(0, len(defective), self.REPAIR_BATCH_SIZE)
+        ]
+        print(f"Repairing {len(defective)} malformed questions in {len(batches)} request(s)")
+        prompts = [self._build_repair_prompt(inputs, batch) for batch in batches]
+        results = await self._generate_all(
+            prompts, generate, [f"Repair batch {i}" for i in range(1, len(prompts) + 1)]
+        )
+
+        replacements = {}
+        for batch, result in zip(batches, results):
+            if result == self.FAILED_TEXT:
+                continue
+            repaired = self._split_questions(
+                self._consolidate_mc_options(self._clean_ai_response(result, keep_answers=True))
+            )
+            if not repaired:
+                continue
+            if len(repaired) == len(batch):
+                matches = list(range(len(batch)))
+            else:
+                # Some questions were dropped or merged; pair each original with its closest rewrite
+                similarity = similarity_matrix([q.text for _, q, _ in batch], repaired)
+                matches = [
+                    int(j) if similarity[i, j] >= self.COVERAGE_THRESHOLD else None
+                    for i, j in enumerate(similarity.argmax(axis=1))
+                ]
+            for ((start, end), _, _), match in zip(batch, matches):
+                if match is None:
+                    continue
+                block = repaired[match]
+                if not mc_defects(parse_block(block.splitlines(), "mc")):
+                    replacements[start] = (end, block.splitlines())
+
+        if self.is_stem_subject(inputs["subject"]):
+            replacements = {
+                start: (end, self._format_stem_content("\n".join(block), inputs["subject"]).splitlines())
+                for start, (end, block) in replacements.items()
+            }
+        print(f"Repaired {len(replacements)} of {len(defective)} malformed questions")
+
+        # Splice from the bottom up so earlier line numbers stay valid
+        for start in sorted(replacements, reverse=True):
+            end, block = replacements[start]
+            lines[start:end] = block
+        return self._fix_numbering("\n".join(lines))
+
+    def _build_repair_prompt(self, inputs: Dict, batch: List[Tuple[Tuple[int, int], ParsedQuestion, List[str]]]) -> str:
+        """Prompt asking for corrected versions of a few malformed MC questions."""
+        listed = []
+        for number, (_, question, defects) in enumerate(batch, 1):
+            options = " ".join(f"({label}) {text}" for label, text in question.options)
+            listed.append(f"{number}. {question.text} {options}".rstrip() + f"\n   Problems: {'; '.join(defects)}")
+        return (
+            f"These multiple choice questions for {inputs['class']} {inputs['subject']} on the topic "
+            f"'{inputs['topic']}' are malformed. Rewrite each one, keeping its meaning.\n"
+            "Format requirements:\n"
+            f"- Return exactly {len(batch)} questions, numbered 1 to {len(batch)} in the same order\n"
+            "- Include exactly 4 distinct choices labeled (a), (b), (c), (d)\n"
+            "- All options for a single question MUST be on the same line as the question.\n"
+            "- Give the correct option on the line after each question, as 'Answer: (b)'\n"
+            "- Do not add any other text or markdown formatting.\n\n"
+            + "\n".join(listed)
+        )
+
+    def _show_coverage(self, coverage: List[Tuple[str, float, int]]) -> None:
+        """Display per-objective coverage below the output heading."""
+        if not coverage:
+            self.coverage_label.config(text="")
+            return
+        lines = ["Objective coverage:"]
+        for i, (objective, score, count) in enumerate(coverage, 1):
+            marker = "✓" if score >= self.COVERAGE_THRESHOLD else "✗"
+            lines.append(f"{marker} {i}. {objective} — {count} question(s), similarity {score:.2f}")
+        self.coverage_label.config(text="\n".join(lines))
+
+    def _display_generating_message(self, message: str = "Generating questions... Please wait.") -> None:
         """Display a message while questions are being generated."""
-        self.output_text.config(state="normal")
-        self.output_text.delete(1.0, tk.END)
-        self.output_text.insert(tk.END, "Generating questions... Please wait.\n")
-        self.output_text.config(state="disabled")
+        self.output_view.set_content(message + "\n")
         self.root.update()
     
-    def _process_ai_response(self, text: str) -> str:
-        """Process and clean the AI response."""
+    def _process_ai_response(self, text: str, inputs: Dict) -> str:
+        """Process and clean the AI response, keeping its answer lines for _split_answers."""
         if not text.strip():
             return "[No questions generated]"
             
-        clean_text = self._clean_ai_response(text)
+        clean_text = self._clean_ai_response(text, keep_answers=True)
         clean_text = self._fix_numbering(clean_text)
         clean_text = self._remove_duplicate_questions(clean_text)
 
         # Process multiple choice options to be on one line
-        if self.question_type_var.get() == "Multiple Choice":
+        if inputs["question_type"] == "Multiple Choice":
             clean_text = self._consolidate_mc_options(clean_text)
 
         # Apply STEM formatting if applicable
-        if self.is_stem_subject(self.subject_entry.get().strip()):
-            clean_text = self._format_stem_content(clean_text, self.subject_entry.get().strip())
+        if self.is_stem_subject(inputs["subject"]):
+            clean_text = self._format_stem_content(clean_text, inputs["subject"])
         
         return clean_text if clean_text.strip() else "[No valid questions generated]"
     
-    def _call_groq_api(self, prompt: str) -> Optional[str]:
-        """Call the Groq API to generate questions."""
+    async def _try_generate_with_fallback(self, prompt: str) -> str:
+        """Generate with the first provider that succeeds, in routing order.
+
+        Concurrent calls with the same prompt share one request.
+        """
         try:
-            client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-            response = client.chat.completions.create(
-                model="llama3-70b-8192",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.7,
-                max_tokens=4000
+            return await self.providers.acomplete(
+                prompt, "questions", lambda provider: self.RETRY_POLICIES[provider.name], self.retry_stats
             )
-            return response.choices[0].message.content
-        except Exception as e:
-            print(f"Groq API error: {e}")
-            return None
-    
-    def _call_together_api(self, prompt: str) -> Optional[str]:
-        """Call the Together.ai API to generate questions."""
-        try:
-            api_key = os.getenv("TOGETHER_AI_API_KEY")
-            if not api_key:
-                print("Together.ai API key not found.")
-                return None
-
-            url = "https://api.together.ai/v1/chat/completions"
-            headers = {
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json",
-            }
-            json_data = {
-                "model": "gpt-4o-mini", # Using a smaller model for Together.ai as a fallback
-                "messages": [{"role": "user", "content": prompt}],
-                "temperature": 0.7,
-                "max_tokens": 4000
-            }
-            response = requests.post(url, headers=headers, json=json_data, timeout=30)
-            response.raise_for_status()
-            result = response.json()
-            return result["choices"][0]["message"]["content"]
-        except Exception as e:
-            print(f"Together.ai API error: {e}")
-            return None
-    
-    def _try_generate_with_fallback(self, prompt: str) -> str:
-        """Try generating questions with primary API, fallback to secondary."""
-        content = self._call_groq_api(prompt)
-        if content:
-            return content
-            
-        print("Falling back to Together.ai API")
-        content = self._call_together_api(prompt)
-        if content:
-            return content
-            
-        return "[Failed to generate questions with both APIs]"
+        except ProviderError as e:
+            print(f"Question generation failed: {e}")
+            return self.FAILED_TEXT
     
-    def _clean_ai_response(self, text: str) -> str:
-        """Remove unwanted phrases and formatting from the AI response."""
+    def _clean_ai_response(self, text: str, keep_answers: bool = False) -> str:
+        """Remove unwanted phrases and formatting from the AI response.
+
+        With `keep_answers`, "Answer:" lines stay with their question so the
+        pipeline can carry them to _split_answers.
+        """
         lines = text.splitlines()
         filter_phrases = [
             "Here are", "based on", "Let me know", "Step", 
             "Here is", "meets your requirements", "Finally", 
-            "In summary", "The questions are", "Answers:", "Answer:"
+            "In summary", "The questions are", "Answers:"
         ]
+        if not keep_answers:
+            filter_phrases.append("Answer:")
         filtered_lines = []
         for line in lines:
             # Remove markdown bolding asterisks
@@ -750,6 +1452,23 @@ class ExamQuestionGenerator:
                 filtered_lines.append(cleaned_line)
         return "\n".join(filtered_lines).strip()
     
+    def _split_answers(self, text: str) -> Tuple[str, Dict[int, str]]:
+        """Take the answer lines out of a numbered paper; returns it and the MC answer key."""
+        answers = {
+            q.number: q.answer
+            for q in parse_questions(text.splitlines(), "Multiple Choice")
+            if q.kind == "mc" and q.answer
+        }
+        lines = []
+        for line in text.splitlines():
+            if "answer:" not in line.lower():
+                lines.append(line)
+            elif re.match(r"^\s*\d+\.", line):
+                # An answer given at the end of the question line itself
+                found = ANSWER_PATTERN.search(line)
+                lines.append(line[:found.start()].rstrip(" .;-") if found else line)
+        return "\n".join(lines), answers
+
     def _fix_numbering(self, text: str) -> str:
         """Ensure consistent question numbering in the generated text."""
         lines = text.splitlines()
@@ -765,7 +1484,7 @@ class ExamQuestionGenerator:
             if line.strip().startswith(str(q_num) + "."):
                 result_lines.append(line)
                 q_num += 1
-            elif line.strip().startswith(tuple(str(n) + "." for n in range(1, 51))):
+            elif re.match(question_number_pattern, line):
                 new_line = re.sub(question_number_pattern, f"{q_num}.", line, count=1)
                 result_lines.append(new_line)
                 q_num += 1
@@ -926,9 +1645,31 @@ class ExamQuestionGenerator:
             
         return text
     
+    def build_docx_document(self, questions_text: str, inputs: Dict, heading: Optional[str] = None) -> Document:
+        """Create the Word document for a paper; `inputs` needs class, subject and topic."""
+        cls, subject, topic = inputs["class"], inputs["subject"], inputs["topic"]
+        doc = Document()
+        
+        # Set default font for the document
+        style = doc.styles['Normal']
+        font = style.font
+        font.name = 'Arial Unicode MS' # A font that supports many Unicode characters
+        font.size = Pt(11)
+
+        doc.add_heading(heading or f'Exam Questions for {topic}', level=1)
+        doc.add_paragraph(f"Class: {cls}\nSubject: {subject}\nTopic: {topic}\n")
+
+        questions = questions_text.splitlines()
+        for question in questions:
+            if question.strip():  # Skip empty lines
+                p = doc.add_paragraph()
+                p.add_run(question)
+        return doc
+
+    @profiled_action("export_to_word")
     def export_to_word(self) -> None:
         """Export the generated questions to a Word document."""
-        questions_raw = self.output_text.get("1.0", tk.END).strip()
+        questions_raw = self.output_view.get_content().strip()
         if not questions_raw:
             messagebox.showerror("Error", "No questions to export.")
             return
@@ -955,23 +1696,7 @@ class ExamQuestionGenerator:
         if not filepath:  # User cancelled
             return
 
-        # Create and save document
-        doc = Document()
-        
-        # Set default font for the document
-        style = doc.styles['Normal']
-        font = style.font
-        font.name = 'Arial Unicode MS' # A font that supports many Unicode characters
-        font.size = Pt(11)
-
-        doc.add_heading(f'Exam Questions for {topic}', level=1)
-        doc.add_paragraph(f"Class: {cls}\nSubject: {subject}\nTopic: {topic}\n")
-
-        questions = questions_raw.splitlines()
-        for question in questions:
-            if question.strip():  # Skip empty lines
-                p = doc.add_paragraph()
-                p.add_run(question)
+        doc = self.build_docx_document(questions_raw, {"class": cls, "subject": subject, "topic": topic})
 
         try:
             doc.save(filepath)
@@ -985,9 +1710,107 @@ class ExamQuestionGenerator:
                 f"Failed to save document:\n{str(e)}"
             )
 
+    def _parse_paper(self, text: str, question_type: str) -> List[ParsedQuestion]:
+        """Parse the displayed paper, taking MC answers from the answer key kept beside it."""
+        questions = list(parse_questions(text.splitlines(), question_type))
+        for q in questions:
+            if q.kind == "mc" and q.answer is None:
+                q.answer = self.answer_key.get(q.number)
+        return questions
+
+    @profiled_action("export_to_lms")
+    def export_to_lms(self) -> None:
+        """Export the generated questions in the selected LMS import format."""
+        questions_raw = self.output_view.get_content().strip()
+        if not questions_raw:
+            messagebox.showerror("Error", "No questions to export.")
+            return
+
+        inputs = self.get_form_inputs()
+        exporter_cls = EXPORTERS[self.lms_format_var.get()]
+        initial_filename = f"{inputs['class']}_{inputs['subject']}_{inputs['topic']}_questions{exporter_cls.extension}"
+        filepath = filedialog.asksaveasfilename(
+            defaultextension=exporter_cls.extension,
+            initialfile=initial_filename,
+            filetypes=exporter_cls.filetypes + [("All Files", "*.*")]
+        )
+        if not filepath:  # User cancelled
+            return
+
+        exporter = exporter_cls(
+            title=f"{inputs['subject']} - {inputs['topic']}",
+            category=f"{inputs['class']}/{inputs['subject']}"
+        )
+        try:
+            questions = self._parse_paper(questions_raw, inputs["question_type"])
+            count = exporter.export(questions, filepath)
+        except Exception as e:
+            messagebox.showerror("Export Error", f"Failed to export questions:\n{str(e)}")
+            return
+
+        if not count:
+            messagebox.showwarning("Export", "No numbered questions were found to export.")
+            return
+        message = f"{count} questions exported to:\n{filepath}"
+        if exporter.unanswered:
+            message += (
+                f"\n\n{exporter.unanswered} multiple choice questions had no marked answer "
+                "and were exported without a correct option."
+            )
+        messagebox.showinfo("Success", message)
+
+    @profiled_action("export_variants")
+    def export_variants(self) -> None:
+        """Export several shuffled versions of a multiple-choice paper plus their answer keys."""
+        questions_raw = self.output_view.get_content().strip()
+        inputs = self.get_form_inputs()
+        questions = self._parse_paper(questions_raw, "Multiple Choice")
+        if not any(q.kind == "mc" for q in questions):
+            messagebox.showerror("Error", "Shuffled versions need generated multiple choice questions.")
+            return
+
+        versions = simpledialog.askinteger(
+            "Shuffled Versions", "How many versions?",
+            initialvalue=4, minvalue=2, maxvalue=self.MAX_VARIANTS, parent=self.root
+        )
+        if not versions:
+            return
+        folder = filedialog.askdirectory(title="Choose a folder for the versions")
+        if not folder:  # User cancelled
+            return
+
+        variants = make_variants(questions, versions)
+        base = os.path.join(folder, f"{inputs['class']}_{inputs['subject']}_{inputs['topic']}")
+        paper_paths, key_path = variant_filenames(base, versions)
+
+        def save_version(version: int) -> None:
+            heading = f"Exam Questions for {inputs['topic']} (Version {variants.label(version)})"
+            self.build_docx_document(variants.paper_text(version), inputs, heading).save(paper_paths[version])
+
+        def save_answer_keys() -> None:
+            heading = f"Answer Keys for {inputs['topic']}"
+            self.build_docx_document(variants.answer_key_text(), inputs, heading).save(key_path)
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.MAX_PARALLEL_REQUESTS) as executor:
+                futures = [executor.submit(save_version, v) for v in range(versions)]
+                futures.append(executor.submit(save_answer_keys))
+                for future in futures:
+                    future.result()
+        except Exception as e:
+            messagebox.showerror("Export Error", f"Failed to save versions:\n{str(e)}")
+            return
+
+        unanswered = sum(1 for q in questions if q.kind == "mc" and q.answer is None)
+        message = f"{versions} versions and their answer keys were saved to:\n{folder}"
+        if unanswered:
+            message += f"\n\n{unanswered} questions had no marked answer and show '-' in the keys."
+        messagebox.showinfo("Success", message)
+
 
 def main() -> None:
-    """Entry point for the application."""
+    """Entry point for the application; --profile[=DIR] profiles generate and export actions."""
+    profiling.configure_from_args(sys.argv[1:])
     root = tk.Tk()
     
     # Set Windows 10/11 theme if available
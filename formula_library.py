@@ -0,0 +1,199 @@
+import os
+from typing import List, Optional, Tuple
+
+from local_index import TopicAnswerIndex
+
+
+DEFAULT_LIBRARY_PATH = os.getenv(
+    "FORMULA_LIBRARY_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "formula_library.db")
+)
+
+# Starting library: (subject, topic keywords, formulae in the STEM Unicode
+# notation the notes use). Formulae the AI supplies for other topics are
+# added as they are generated.
+SEED_FORMULAE = [
+    ("mathematics", "quadratic equation roots factorisation completing square discriminant", [
+        "Quadratic formula: x = (−b ± √(b² − 4ac)) ⁄ 2a",
+        "Discriminant: D = b² − 4ac",
+        "Sum of roots: α + β = −b⁄a",
+        "Product of roots: αβ = c⁄a",
+    ]),
+    ("mathematics", "indices index law laws exponent power", [
+        "aᵐ × aⁿ = aᵐ⁺ⁿ",
+        "aᵐ ÷ aⁿ = aᵐ⁻ⁿ",
+        "(aᵐ)ⁿ = aᵐⁿ",
+        "a⁰ = 1",
+        "a⁻ⁿ = 1⁄aⁿ",
+    ]),
+    ("mathematics", "logarithm logarithms log laws", [
+        "logₐ(xy) = logₐx + logₐy",
+        "logₐ(x⁄y) = logₐx − logₐy",
+        "logₐ(xⁿ) = n logₐx",
+        "logₐa = 1",
+    ]),
+    ("mathematics", "trigonometry trigonometric ratio sine cosine tangent right angled triangle", [
+        "sin θ = opposite⁄hypotenuse",
+        "cos θ = adjacent⁄hypotenuse",
+        "tan θ = opposite⁄adjacent",
+        "sin²θ + cos²θ = 1",
+    ]),
+    ("mathematics", "pythagoras theorem right angled triangle hypotenuse", [
+        "Pythagoras' theorem: c² = a² + b²",
+        "Hypotenuse: c = √(a² + b²)",
+        "Missing side: a = √(c² − b²)",
+    ]),
+    ("mathematics", "mensuration area perimeter circle rectangle triangle plane shape", [
+        "Area of a circle: A = πr²",
+        "Circumference of a circle: C = 2πr",
+        "Area of a triangle: A = ½bh",
+        "Area of a trapezium: A = ½(a + b)h",
+    ]),
+    ("mathematics", "mensuration volume surface area solid cylinder cone sphere prism", [
+        "Volume of a cylinder: V = πr²h",
+        "Volume of a cone: V = ⅓πr²h",
+        "Volume of a sphere: V = ⁴⁄₃πr³",
+        "Curved surface area of a cylinder: A = 2πrh",
+    ]),
+    ("mathematics", "arithmetic progression sequence series nth term sum", [
+        "nth term: Tₙ = a + (n − 1)d",
+        "Sum of n terms: Sₙ = n⁄2 [2a + (n − 1)d]",
+    ]),
+    ("mathematics", "geometric progression sequence series ratio sum infinity", [
+        "nth term: Tₙ = arⁿ⁻¹",
+        "Sum of n terms: Sₙ = a(rⁿ − 1) ⁄ (r − 1)",
+        "Sum to infinity: S∞ = a ⁄ (1 − r), |r| < 1",
+    ]),
+    ("mathematics", "coordinate geometry straight line gradient midpoint distance", [
+        "Gradient: m = (y₂ − y₁) ⁄ (x₂ − x₁)",
+        "Equation of a line: y = mx + c",
+        "Midpoint: ((x₁ + x₂)⁄2, (y₁ + y₂)⁄2)",
+        "Distance: d = √((x₂ − x₁)² + (y₂ − y₁)²)",
+    ]),
+    ("mathematics", "statistics mean median mode variance standard deviation", [
+        "Mean: x̄ = Σx ⁄ n",
+        "Mean of grouped data: x̄ = Σfx ⁄ Σf",
+        "Variance: σ² = Σ(x − x̄)² ⁄ n",
+        "Standard deviation: σ = √(Σ(x − x̄)² ⁄ n)",
+    ]),
+    ("mathematics", "probability event outcome independent mutually exclusive", [
+        "P(E) = number of favourable outcomes ⁄ total number of outcomes",
+        "P(E′) = 1 − P(E)",
+        "P(A or B) = P(A) + P(B) for mutually exclusive events",
+        "P(A and B) = P(A) × P(B) for independent events",
+    ]),
+    ("mathematics", "simple compound interest principal rate time", [
+        "Simple interest: I = PRT ⁄ 100",
+        "Compound amount: A = P(1 + r⁄100)ⁿ",
+    ]),
+    ("physics", "motion speed velocity acceleration equations kinematics linear", [
+        "v = u + at",
+        "s = ut + ½at²",
+        "v² = u² + 2as",
+        "Average speed = total distance ⁄ total time",
+    ]),
+    ("physics", "force newton law motion momentum impulse", [
+        "F = ma",
+        "Momentum: p = mv",
+        "Impulse: Ft = mv − mu",
+        "Weight: W = mg",
+    ]),
+    ("physics", "work energy power kinetic potential", [
+        "Work: W = Fd",
+        "Kinetic energy: Eₖ = ½mv²",
+        "Potential energy: Eₚ = mgh",
+        "Power: P = W ⁄ t",
+    ]),
+    ("physics", "pressure liquid fluid density", [
+        "Density: ρ = m ⁄ V",
+        "Pressure: P = F ⁄ A",
+        "Pressure in a liquid: P = ρgh",
+    ]),
+    ("physics", "electricity current voltage resistance ohm law power circuit", [
+        "Ohm's law: V = IR",
+        "Electrical power: P = IV = I²R",
+        "Resistors in series: R = R₁ + R₂ + R₃",
+        "Resistors in parallel: 1⁄R = 1⁄R₁ + 1⁄R₂ + 1⁄R₃",
+        "Charge: Q = It",
+    ]),
+    ("physics", "wave frequency wavelength period sound", [
+        "Wave speed: v = fλ",
+        "Period: T = 1 ⁄ f",
+    ]),
+    ("physics", "light refraction reflection lens mirror refractive index", [
+        "Snell's law: n = sin i ⁄ sin r",
+        "Lens formula: 1⁄f = 1⁄u + 1⁄v",
+        "Magnification: m = v ⁄ u",
+    ]),
+    ("physics", "heat temperature specific heat capacity latent expansion", [
+        "Heat energy: Q = mcΔθ",
+        "Latent heat: Q = mL",
+        "Linear expansivity: α = ΔL ⁄ (L₀Δθ)",
+    ]),
+    ("physics", "gas laws boyle charles pressure volume temperature", [
+        "Boyle's law: P₁V₁ = P₂V₂",
+        "Charles' law: V₁⁄T₁ = V₂⁄T₂",
+        "General gas law: P₁V₁⁄T₁ = P₂V₂⁄T₂",
+    ]),
+    ("chemistry", "mole concept molar mass avogadro number amount substance", [
+        "Number of moles: n = m ⁄ M",
+        "Number of particles: N = n × 6.02 × 10²³",
+        "Molar volume at s.t.p.: V = n × 22.4 dm³",
+    ]),
+    ("chemistry", "concentration solution molarity titration volumetric analysis", [
+        "Concentration: C = n ⁄ V",
+        "Mass concentration (g/dm³) = molar concentration × molar mass",
+        "Titration: CₐVₐ ⁄ C_bV_b = nₐ ⁄ n_b",
+    ]),
+    ("chemistry", "gas laws pressure volume temperature ideal gas", [
+        "Boyle's law: P₁V₁ = P₂V₂",
+        "Charles' law: V₁⁄T₁ = V₂⁄T₂",
+        "Ideal gas equation: PV = nRT",
+    ]),
+    ("chemistry", "acid base ph neutralisation salt", [
+        "pH = −log₁₀[H⁺]",
+        "pH + pOH = 14",
+        "Acid + base → salt + water, e.g. HCl + NaOH → NaCl + H₂O",
+    ]),
+    ("chemistry", "electrolysis faraday law charge deposit", [
+        "Quantity of electricity: Q = It",
+        "Faraday's first law: m = ZIt",
+        "1 faraday = 96 500 C mol⁻¹",
+    ]),
+    ("chemistry", "energy enthalpy heat reaction thermochemistry", [
+        "Heat change: ΔH = −mcΔT ⁄ n",
+        "ΔH(reaction) = ΣΔH(products) − ΣΔH(reactants)",
+    ]),
+    ("chemistry", "rate reaction kinetics", [
+        "Rate of reaction = change in concentration ⁄ time taken",
+        "Average rate = Δ[product] ⁄ Δt",
+    ]),
+]
+
+
+def format_formulae(formulae: List[str]) -> str:
+    """A numbered list, as the notes show key formulae."""
+    return "\n".join(f"{i}. {formula}" for i, formula in enumerate(formulae, 1))
+
+
+class FormulaLibrary(TopicAnswerIndex):
+    """Key formulae per subject, looked up by topic keywords.
+
+    Stable textbook formulae for common topics are answered without a
+    network call; topics the library cannot match confidently go to the AI
+    and its answer is added to the library.
+    """
+
+    TABLE = "formulae"
+
+    def __init__(self, path: str = DEFAULT_LIBRARY_PATH) -> None:
+        super().__init__(path)
+
+    def seed_rows(self) -> List[Tuple[str, str, str]]:
+        return [(subject, keywords, format_formulae(formulae)) for subject, keywords, formulae in SEED_FORMULAE]
+
+    def lookup(self, subject: str, topic: str) -> Optional[str]:
+        return self.match(subject, topic)
+
+    def add(self, subject: str, topic: str, formulae: str, source: str = "ai") -> None:
+        self.store(subject, topic, formulae, source)
@@ -0,0 +1,98 @@
+import time
+import tkinter as tk
+from tkinter import messagebox, ttk
+from typing import Callable, Dict, Optional
+
+from session_history import SessionHistory
+
+
+class HistoryPanel:
+    """Searchable list of earlier results; opening one hands it back to the window.
+
+    Searching only reads the plain input columns, and a result is
+    decompressed only when it is opened, so both are instant however long
+    the history grows.
+    """
+
+    SEARCH_DELAY_MS = 200
+    COLUMNS = (
+        ("created", "Generated", 130),
+        ("class", "Class", 70),
+        ("subject", "Subject", 130),
+        ("topic", "Topic", 220),
+        ("size", "Size", 80),
+    )
+
+    def __init__(self, parent: tk.Misc, history: SessionHistory, kind: str,
+                 on_open: Callable[[Dict], None], title: str = "History") -> None:
+        self.history = history
+        self.kind = kind
+        self.on_open = on_open
+        self.window = tk.Toplevel(parent)
+        self.window.title(title)
+        self.window.geometry("700x400")
+
+        frame = ttk.Frame(self.window, padding=10)
+        frame.pack(fill="both", expand=True)
+        search_frame = ttk.Frame(frame)
+        search_frame.pack(fill="x", pady=(0, 8))
+        ttk.Label(search_frame, text="Search:").pack(side="left")
+        self.search_var = tk.StringVar()
+        search_entry = ttk.Entry(search_frame, textvariable=self.search_var)
+        search_entry.pack(side="left", fill="x", expand=True, padx=(8, 0))
+        search_entry.bind("<KeyRelease>", lambda e: self._schedule_refresh())
+        search_entry.focus_set()
+
+        self.tree = ttk.Treeview(frame, columns=[c[0] for c in self.COLUMNS], show="headings")
+        for key, heading, width in self.COLUMNS:
+            self.tree.heading(key, text=heading)
+            self.tree.column(key, width=width, anchor="e" if key == "size" else "w")
+        self.tree.pack(fill="both", expand=True)
+        self.tree.bind("<Double-1>", lambda e: self.open_selected())
+        self.tree.bind("<Return>", lambda e: self.open_selected())
+
+        btn_frame = ttk.Frame(frame)
+        btn_frame.pack(fill="x", pady=(8, 0))
+        self.footprint_label = ttk.Label(btn_frame, text="")
+        self.footprint_label.pack(side="left")
+        ttk.Button(btn_frame, text="Open", command=self.open_selected).pack(side="right")
+        ttk.Button(btn_frame, text="Delete", command=self.delete_selected).pack(side="right", padx=(0, 8))
+
+        self._after_id: Optional[str] = None
+        self.refresh()
+
+    def _schedule_refresh(self) -> None:
+        if self._after_id is not None:
+            self.window.after_cancel(self._after_id)
+        self._after_id = self.window.after(self.SEARCH_DELAY_MS, self.refresh)
+
+    def refresh(self) -> None:
+        self._after_id = None
+        self.tree.delete(*self.tree.get_children())
+        for row in self.history.search(self.search_var.get(), kind=self.kind):
+            created = time.strftime("%Y-%m-%d %H:%M", time.localtime(row["created"]))
+            self.tree.insert("", tk.END, iid=str(row["id"]), values=[
+                created, row["class"], row["subject"], row["topic"], f"{row['stored'] / 1024:.1f} KB",
+            ])
+        usage = self.history.footprint()
+        ratio = usage["size"] / usage["stored"] if usage["stored"] else 0
+        self.footprint_label.config(
+            text=f"{usage['entries']} result(s), {usage['stored'] / 1048576:.1f} of "
+                 f"{usage['max_bytes'] / 1048576:.0f} MB used ({ratio:.1f}x compression)"
+        )
+
+    def open_selected(self) -> None:
+        selection = self.tree.selection()
+        if not selection:
+            return
+        entry = self.history.load(int(selection[0]))
+        if entry is None:
+            messagebox.showinfo("History", "That result is no longer stored.", parent=self.window)
+            self.refresh()
+            return
+        self.on_open(entry)
+
+    def delete_selected(self) -> None:
+        for iid in self.tree.selection():
+            self.history.delete(int(iid))
+        self.refresh()
@@ -0,0 +1,149 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+
+DEFAULT_DB_PATH = os.getenv(
+    "JOB_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "generation_jobs.db")
+)
+
+# Jobs in these states were cut short and can be resumed from their checkpoints
+UNFINISHED_STATUSES = ("queued", "running", "failed")
+
+
+class JobStore:
+    """Durable record of generation jobs and each section completed so far.
+
+    Backed by SQLite in WAL mode so the GUI and the service can share one
+    file, and every checkpoint is committed as soon as its section is done.
+    """
+
+    def __init__(self, path: str = DEFAULT_DB_PATH, max_age_days: float = 30) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    origin TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    priority INTEGER NOT NULL DEFAULT 5,
+                    inputs TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    created REAL NOT NULL,
+                    updated REAL NOT NULL,
+                    deadline REAL
+                )"""
+            )
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            if "deadline" not in columns:
+                # Stores created before jobs recorded their time budget
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN deadline REAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS sections (
+                    job_id TEXT NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+                    name TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    PRIMARY KEY (job_id, name)
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status, origin, kind)")
+        self.prune(max_age_days)
+
+    def create_job(self, kind: str, inputs: Dict, origin: str, priority: int = 5,
+                   job_id: Optional[str] = None, deadline: Optional[float] = None) -> str:
+        """Record a new queued job; `deadline` is its time budget in seconds, kept for retries."""
+        job_id = job_id or uuid.uuid4().hex
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, origin, status, priority, inputs, created, updated, deadline)"
+                " VALUES (?, ?, ?, 'queued', ?, ?, ?, ?, ?)",
+                (job_id, kind, origin, priority, json.dumps(inputs, ensure_ascii=False), now, now, deadline)
+            )
+        return job_id
+
+    def set_status(self, job_id: str, status: str, result: Optional[Dict] = None,
+                   error: Optional[str] = None) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, updated = ? WHERE id = ?",
+                (status, json.dumps(result, ensure_ascii=False) if result is not None else None,
+                 error, time.time(), job_id)
+            )
+
+    def save_section(self, job_id: str, name: str, content: str) -> None:
+        """Checkpoint one finished section of a job."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sections (job_id, name, content) VALUES (?, ?, ?)",
+                (job_id, name, content)
+            )
+            self._conn.execute("UPDATE jobs SET updated = ? WHERE id = ?", (time.time(), job_id))
+
+    def load_section(self, job_id: str, name: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content FROM sections WHERE job_id = ? AND name = ?", (job_id, name)
+            ).fetchone()
+        return row["content"] if row else None
+
+    def load_sections(self, job_id: str) -> Dict[str, str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name, content FROM sections WHERE job_id = ?", (job_id,)
+            ).fetchall()
+        return {row["name"]: row["content"] for row in rows}
+
+    def sections_named(self, name: str, kind: Optional[str] = None) -> List[Tuple[Dict, str]]:
+        """(job inputs, content) for every checkpointed section called `name`."""
+        query = "SELECT jobs.inputs, sections.content FROM sections JOIN jobs ON jobs.id = sections.job_id WHERE sections.name = ?"
+        params = [name]
+        if kind:
+            query += " AND jobs.kind = ?"
+            params.append(kind)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [(json.loads(row["inputs"]), row["content"]) for row in rows]
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def unfinished_jobs(self, origin: str, kind: Optional[str] = None) -> List[Dict]:
+        """Jobs from `origin` that never completed, oldest first."""
+        query = f"SELECT * FROM jobs WHERE origin = ? AND status IN ({','.join('?' * len(UNFINISHED_STATUSES))})"
+        params = [origin, *UNFINISHED_STATUSES]
+        if kind:
+            query += " AND kind = ?"
+            params.append(kind)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY priority, created", params).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def prune(self, max_age_days: float) -> None:
+        """Delete jobs (and their checkpoints) not touched for `max_age_days`."""
+        cutoff = time.time() - max_age_days * 86400
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM sections WHERE job_id IN (SELECT id FROM jobs WHERE updated < ?)", (cutoff,)
+            )
+            self._conn.execute("DELETE FROM jobs WHERE updated < ?", (cutoff,))
+
+    def _row_to_job(self, row: sqlite3.Row) -> Dict:
+        job = dict(row)
+        job["inputs"] = json.loads(job["inputs"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
@@ -1,25 +1,101 @@
-import os
+import asyncio
+import queue
+import sys
+import threading
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext, filedialog
 from docx import Document
 from docx.shared import Inches, Pt
+from diagnostics import ProfileSummaryPanel, ProviderStatsPanel
+from history_view import HistoryPanel
 from dotenv import load_dotenv
-from groq import Groq
-from together import Together
 import re
+from output_view import ChunkedOutputView
+import profiling
+from profiling import ActionProfile, profiled_action
+from progress import emit, reporting_to, section
+from progress_view import ProgressPanel
+from providers import PROVIDER_LOOP, GroqProvider, ProviderError, ProviderRouter, TogetherProvider, get_local_provider
+from request_scheduler import run_as
+from retry_policy import RetryPolicy, RetryStats, job_deadline
+from section_cache import fingerprint
+from shared_services import SharedServices
 
 load_dotenv()
 
 class LessonNoteGenerator:
-    def __init__(self, root):
+    # Retry behaviour per generation task. Step content is the bulk of the note,
+    # so it gets the most patience; the visual-aid check is optional and should
+    # give up quickly.
+    RETRY_POLICIES = {
+        'step': RetryPolicy(max_attempts=4, base_delay=1.0, max_delay=20.0, deadline=90.0),
+        'evaluation': RetryPolicy(max_attempts=3, base_delay=1.0, max_delay=15.0, deadline=60.0),
+        'assignment': RetryPolicy(max_attempts=3, base_delay=1.0, max_delay=15.0, deadline=60.0),
+        'formulae': RetryPolicy(max_attempts=3, base_delay=1.0, max_delay=15.0, deadline=60.0),
+        'image_check': RetryPolicy(max_attempts=2, base_delay=0.5, max_delay=5.0, deadline=20.0),
+    }
+
+    STEP_ERROR_TEXT = "[Error generating lesson step]"
+    # Shown for sections a cancelled or timed-out generation did not reach
+    INCOMPLETE_TEXT = "[Not generated - use Regenerate Section]"
+
+    # Time budget in seconds for a whole note from the window. When it runs
+    # out, outstanding requests are cancelled and the finished sections shown.
+    JOB_DEADLINE = 300
+    # Time budget in seconds for regenerating one section
+    SECTION_DEADLINE = 120
+    GENERATION_POLL_MS = 100
+
+    # Short tasks where network latency dominates go to the local model
+    # first when one is configured
+    LOCAL_FIRST_TASKS = ('image_check',)
+
+    # Speculative prefetch: once the form has been idle this long, step
+    # content for each entered objective is generated in the background
+    PREFETCH_DEBOUNCE_MS = 1500
+    PREFETCH_WORKERS = 2
+
+    # Regenerable sections of a note: the field holding their content and
+    # the label shown in the "regenerate section" picker. Steps are step_1..n.
+    SECTION_FIELDS = {
+        'formulae': ('key_formulae', "Key Formulae"),
+        'evaluation': ('evaluation_questions', "Evaluation"),
+        'assignment': ('assignment_questions', "Assignment"),
+        'image_check': ('image_notice', "Image Notice"),
+    }
+
+    def __init__(self, root=None, job_store=None, history=None, services=None):
+        """Set up the generator; without a root window it runs headless.
+
+        `services` are shared with the other windows the launcher opened;
+        without them this generator gets its own stores and provider route.
+        """
         self.root = root
-        self.root.title("Avalon STEM Lesson Note Generator")
-        self.root.geometry("900x700")
-        self.root.configure(bg="#ffffff") # Keep root background white or primary_bg
-
-        # Initialize the container
-        self.container = ttk.Frame(self.root, padding=20)
-        self.container.pack(fill='both', expand=True)
+        self.services = services or SharedServices(job_store)
+        # Requests from this window are scheduled fairly against other windows'
+        self.client_id = f"lesson-{id(self):x}"
+        self.retry_stats = RetryStats()
+        self.providers = self.services.router('lesson', lambda: ProviderRouter(
+            [GroqProvider("llama3-70b-8192"), TogetherProvider("together-model")],
+            get_local_provider(),
+            local_first_tasks=self.LOCAL_FIRST_TASKS
+        ))
+        self.job_store = job_store or self.services.job_store
+        self.history = history or self.services.history
+        self.section_cache = self.services.section_cache
+        self.visual_aids = self.services.visual_aids
+        self.formula_library = self.services.formula_library
+        threading.Thread(target=self.visual_aids.train_from_jobs, args=(self.job_store,), daemon=True).start()
+        self.note_inputs = None
+        # Prefetch coroutines run on the shared provider loop
+        self._prefetch_slots = asyncio.Semaphore(self.PREFETCH_WORKERS)
+        self._prefetch_futures = {}
+        self._prefetch_lock = threading.Lock()
+        self._prefetch_after_id = None
+        self._generation = None
+        self._generation_profile = None
+        # (section name, note inputs, future, profile) of a running regeneration
+        self._regeneration = None
 
         # STEM subjects list
         self.stem_subjects = [
@@ -28,6 +104,18 @@ class LessonNoteGenerator:
             "agricultural science", "computer science", "geography"
         ]
 
+        # Without a root window the generator runs headless (service mode)
+        if root is None:
+            return
+
+        self.root.title("Avalon STEM Lesson Note Generator")
+        self.root.geometry("900x700")
+        self.root.configure(bg="#ffffff") # Keep root background white or primary_bg
+
+        # Initialize the container
+        self.container = ttk.Frame(self.root, padding=20)
+        self.container.pack(fill='both', expand=True)
+
         # Configure style
         self.style = ttk.Style(self.root)
         self.style.theme_use('clam') # 'clam' is a good base for customization
@@ -60,6 +148,7 @@ class LessonNoteGenerator:
         # TLabelframe styling
         self.style.configure('TLabelframe', background=self.secondary_bg, foreground=self.primary_text_color, font=self.label_font, borderwidth=1, relief='solid', bordercolor=self.border_color)
         self.style.configure('TLabelframe.Label', background=self.secondary_bg, foreground=self.primary_text_color, font=self.label_font) # For the label of the labelframe
+        self.style.configure('TCheckbutton', background=self.secondary_bg, foreground=self.primary_text_color, font=self.label_font)
 
         # Primary Button Styling
         self.style.configure('Primary.TButton',
@@ -75,6 +164,7 @@ class LessonNoteGenerator:
 
         # Setup UI
         self.setup_ui()
+        self.root.after(500, self._offer_resume)
 
     def setup_ui(self):
         outer_frame = ttk.Frame(self.container, padding=20) # Increased padding
@@ -150,10 +240,26 @@ class LessonNoteGenerator:
             entry.grid(row=i, column=1, sticky='ew', padx=6, pady=6)
             self.objective_entries.append(entry)
 
-        # Generate Button
-        self.generate_btn = ttk.Button(self.scrollable_frame, text="Generate Lesson Note",
+        # Opt-in speculative generation of step content while the form is filled
+        self.prefetch_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(obj_frame, text="Prepare step content while I type",
+                        variable=self.prefetch_var, command=self._schedule_prefetch,
+                        style='TCheckbutton').grid(row=5, column=0, columnspan=2, sticky='w', padx=6, pady=(10, 0))
+        for entry in [self.subject_entry, self.topic_entry, *self.objective_entries]:
+            entry.bind("<KeyRelease>", lambda e: self._schedule_prefetch(), add="+")
+
+        # Generate and Cancel Buttons
+        generate_frame = ttk.Frame(self.scrollable_frame, style='Card.TFrame')
+        generate_frame.grid(row=5, column=0, columnspan=2, pady=(0, 26), sticky='ew', padx=20)
+        generate_frame.columnconfigure(0, weight=1)
+        self.generate_btn = ttk.Button(generate_frame, text="Generate Lesson Note",
                                       command=self.generate_note, style='Primary.TButton')
-        self.generate_btn.grid(row=5, column=0, columnspan=2, pady=(0, 26), sticky='ew', padx=20) # Added padx
+        self.generate_btn.grid(row=0, column=0, sticky='ew')
+        self.cancel_btn = ttk.Button(generate_frame, text="Cancel", command=self.cancel_generation,
+                                     state='disabled', style='Primary.TButton')
+        self.cancel_btn.grid(row=0, column=1, sticky='e', padx=(12, 0))
+        self.progress_panel = ProgressPanel(generate_frame, rows=4)
+        self.progress_panel.frame.grid(row=1, column=0, columnspan=2, sticky='ew', pady=(12, 0))
 
         # Output Preview
         output_label = ttk.Label(self.scrollable_frame, text="Lesson Note Preview:",
@@ -171,12 +277,35 @@ class LessonNoteGenerator:
                                                    highlightbackground=self.border_color, # Border color when not focused
                                                    highlightcolor=self.accent_color, # Accent color when focused
                                                    highlightthickness=1) # 1 pixel highlight
-        self.output_text.grid(row=7, column=0, columnspan=2, sticky='nsew', padx=20, pady=(0, 20))
+        self.output_text.grid(row=7, column=0, columnspan=2, sticky='nsew', padx=20, pady=(0, 12))
+
+        # Page controls; long notes are inserted incrementally and paged
+        nav_frame = ttk.Frame(self.scrollable_frame, style='Card.TFrame')
+        nav_frame.grid(row=8, column=0, columnspan=2, sticky='ew', padx=20, pady=(0, 12))
+        self.output_view = ChunkedOutputView(self.output_text, nav_parent=nav_frame)
+        ttk.Button(nav_frame, text="Provider Stats",
+                   command=lambda: ProviderStatsPanel.show(self.root)).pack(side="right", padx=(0, 10))
+        ttk.Button(nav_frame, text="History", command=self.show_history).pack(side="right", padx=(0, 10))
+        if profiling.enabled():
+            ttk.Button(nav_frame, text="Profile Summary",
+                       command=lambda: ProfileSummaryPanel.show(self.root)).pack(side="right", padx=(0, 10))
+
+        # Regenerate a single section of the current note
+        regen_frame = ttk.Frame(self.scrollable_frame, style='Card.TFrame')
+        regen_frame.grid(row=9, column=0, columnspan=2, sticky='ew', padx=20, pady=(0, 12))
+        regen_frame.columnconfigure(0, weight=1)
+        self.section_var = tk.StringVar()
+        self.section_cb = ttk.Combobox(regen_frame, textvariable=self.section_var, state="readonly",
+                                       values=[], style='TCombobox')
+        self.section_cb.grid(row=0, column=0, sticky='ew', padx=(0, 12))
+        self.regenerate_btn = ttk.Button(regen_frame, text="Regenerate Section",
+                                         command=self.regenerate_section, style='Primary.TButton')
+        self.regenerate_btn.grid(row=0, column=1, sticky='e')
 
         # Export Button
         self.export_btn = ttk.Button(self.scrollable_frame, text="Export Lesson Note (DOCX)",
                                     command=self._export_docx, style='Primary.TButton')
-        self.export_btn.grid(row=8, column=0, columnspan=2, pady=(0, 20), sticky='ew', padx=20) # Added padx
+        self.export_btn.grid(row=10, column=0, columnspan=2, pady=(0, 20), sticky='ew', padx=20) # Added padx
 
         # Grid configuration
         self.scrollable_frame.columnconfigure(1, weight=1)
@@ -185,51 +314,412 @@ class LessonNoteGenerator:
     def is_stem_subject(self, subject):
         return subject.lower() in self.stem_subjects
 
-    def generate_note(self):
-        try:
-            inputs = {
-                'week': self.week_entry.get(),
-                'class': self.class_var.get(),
-                'subject': self.subject_entry.get(),
-                'topic': self.topic_entry.get(),
-                'objectives': [entry.get() for entry in self.objective_entries if entry.get()],
-            }
-
-            if len(inputs['objectives']) < 3:
-                messagebox.showerror("Error", "Please enter at least 3 objectives")
-                return
-
-            # Generate content with STEM-specific handling
-            generated_steps = []
-            for obj in inputs['objectives']:
-                step_content = self.clean_ai_response(self.call_ai_api(obj, inputs['subject']))
-                generated_steps.append(step_content)
-
-            evaluation_questions = self.generate_evaluation_questions(inputs['topic'], inputs['objectives'], inputs['subject'])
-            assignment_questions = self.generate_assignment_questions(inputs['topic'], inputs['objectives'], inputs['subject'])
-            image_notice = self.check_for_image_requirements(inputs['topic'], inputs['objectives'], inputs['subject'])
-            
-            # Generate key formulae/equations for STEM subjects
-            key_formulae = ""
-            if self.is_stem_subject(inputs['subject']):
-                key_formulae = self.generate_key_formulae(inputs['topic'], inputs['subject'])
-
-            complete_inputs = {
-                **inputs,
-                'generated_steps': generated_steps,
-                'evaluation_questions': evaluation_questions,
-                'assignment_questions': assignment_questions,
-                'image_notice': image_notice,
-                'is_stem': self.is_stem_subject(inputs['subject']),
-                'key_formulae': key_formulae
-            }
-
-            self.lesson_note = self.build_template(complete_inputs)
-            self.output_text.delete(1.0, tk.END)
-            self.output_text.insert(tk.END, self.lesson_note)
+    def get_form_inputs(self):
+        return {
+            'week': self.week_entry.get(),
+            'class': self.class_var.get(),
+            'subject': self.subject_entry.get(),
+            'topic': self.topic_entry.get(),
+            'objectives': [entry.get() for entry in self.objective_entries if entry.get()],
+        }
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Generation failed: {str(e)}")
+    def validate_inputs(self, inputs):
+        """Return an error message if the inputs cannot be used, otherwise None."""
+        if len(inputs['objectives']) < 3:
+            return "Please enter at least 3 objectives"
+        return None
+
+    def generate_note(self, job_id=None):
+        """Start generating the note from the form, checkpointing each finished section.
+
+        Generation runs on the provider loop so the window stays responsive
+        and Cancel can stop it. Pass `job_id` to resume an interrupted
+        generation from its checkpoints.
+        """
+        if self._generation is not None:
+            return
+        inputs = self.get_form_inputs()
+        error = self.validate_inputs(inputs)
+        if error:
+            messagebox.showerror("Error", error)
+            return
+        if job_id is not None and not self.services.claim_job(job_id):
+            messagebox.showinfo("Resume Lesson Note", "This lesson note is already being generated in another window.")
+            return
+
+        self.retry_stats.reset()
+        if job_id is None:
+            job_id = self.job_store.create_job('lesson', inputs, origin='gui')
+            self.services.claim_job(job_id)
+        self.job_store.set_status(job_id, 'running')
+        self._generation_profile = ActionProfile.start('generate_note')
+        # Progress events arrive on the provider loop's thread and are
+        # drained into the panel from the Tk thread
+        events = queue.Queue()
+        self.progress_panel.reset()
+        future = PROVIDER_LOOP.submit(run_as(self.client_id, self.compose_note_async(
+            inputs, job_id, deadline=self.JOB_DEADLINE, progress=events.put)))
+        self._generation = (job_id, inputs, future, events)
+        self.generate_btn.config(state='disabled')
+        self.cancel_btn.config(state='normal')
+        self.root.after(self.GENERATION_POLL_MS, self._check_generation)
+
+    def cancel_generation(self):
+        """Stop the running generation; its outstanding requests are cancelled at once."""
+        if self._generation is not None:
+            self._generation[2].cancel()
+
+    def close(self):
+        """Stop this window's generation and prefetch before the window is destroyed."""
+        if self._prefetch_after_id is not None:
+            self.root.after_cancel(self._prefetch_after_id)
+            self._prefetch_after_id = None
+        self._cancel_prefetch(set())
+        if self._generation is not None:
+            job_id, _, future, _ = self._generation
+            self._generation = None
+            future.cancel()
+            self.job_store.set_status(job_id, 'cancelled')
+            self.services.release_job(job_id)
+        if self._generation_profile is not None:
+            self._generation_profile.stop()
+            self._generation_profile = None
+        if self._regeneration is not None:
+            _, _, future, profile = self._regeneration
+            self._regeneration = None
+            future.cancel()
+            if profile is not None:
+                profile.stop()
+
+    def _check_generation(self):
+        """Show the note once generation has finished, failed or been cancelled."""
+        if self._generation is None:
+            # The window was closed
+            return
+        job_id, inputs, future, events = self._generation
+        self.progress_panel.drain(events)
+        if not future.done():
+            self.root.after(self.GENERATION_POLL_MS, self._check_generation)
+            return
+        self._generation = None
+        self.services.release_job(job_id)
+        self.generate_btn.config(state='normal')
+        self.cancel_btn.config(state='disabled')
+        if self._generation_profile is not None:
+            self._generation_profile.stop()
+            self._generation_profile = None
+
+        if future.cancelled():
+            self.job_store.set_status(job_id, 'cancelled')
+            self._show_partial_note(inputs, job_id)
+            return
+        error = future.exception()
+        if isinstance(error, TimeoutError):
+            # Left as failed so the note is offered for resuming next time
+            self.job_store.set_status(job_id, 'failed', error=f"Deadline of {self.JOB_DEADLINE}s reached")
+            self._show_partial_note(inputs, job_id)
+            messagebox.showwarning(
+                "Generation Timed Out",
+                f"The note was not finished within {self.JOB_DEADLINE} seconds. "
+                "The sections generated so far are shown."
+            )
+            return
+        if error is not None:
+            self.job_store.set_status(job_id, 'failed', error=str(error))
+            messagebox.showerror("Error", f"Generation failed: {str(error)}")
+            return
+
+        self.note_inputs = future.result()
+        self._render_note(self.note_inputs)
+        self.job_store.set_status(job_id, 'done', result={'text': self.lesson_note})
+        self.history.add('lesson', inputs, self.note_inputs)
+        print(f"API stats: {self.retry_stats.summary()}")
+
+    def _show_partial_note(self, inputs, job_id):
+        """Render whatever sections a stopped generation checkpointed."""
+        self.note_inputs = self.partial_note(inputs, job_id)
+        self._render_note(self.note_inputs)
+
+    def _offer_resume(self):
+        """Offer to finish the most recent lesson note that was cut short."""
+        jobs = self.services.resumable(self.job_store.unfinished_jobs('gui', 'lesson'))
+        if not jobs:
+            return
+        job = jobs[-1]
+        inputs = job['inputs']
+        done = len(self.job_store.load_sections(job['id']))
+        total = len(self._section_names(inputs))
+        if not messagebox.askyesno(
+            "Resume Lesson Note",
+            f"An interrupted lesson note on '{inputs['topic']}' was found with {done} of {total} "
+            f"sections already generated.\n\nResume it now?"
+        ):
+            self.job_store.set_status(job['id'], 'abandoned')
+            return
+        self._fill_form(inputs)
+        self.generate_note(job['id'])
+
+    def _fill_form(self, inputs):
+        """Put a stored inputs dict back into the form."""
+        self.class_var.set(inputs['class'])
+        for entry, value in [(self.week_entry, inputs['week']), (self.subject_entry, inputs['subject']),
+                             (self.topic_entry, inputs['topic'])]:
+            entry.delete(0, tk.END)
+            entry.insert(0, value)
+        for i, entry in enumerate(self.objective_entries):
+            entry.delete(0, tk.END)
+            if i < len(inputs['objectives']):
+                entry.insert(0, inputs['objectives'][i])
+
+    def show_history(self):
+        HistoryPanel(self.root, self.history, 'lesson', self._open_history_entry, title="Lesson Note History")
+
+    def _open_history_entry(self, entry):
+        """Show an earlier note exactly as it was generated, without calling a provider."""
+        self._fill_form(entry['inputs'])
+        self.note_inputs = entry['result']
+        self._render_note(self.note_inputs)
+
+    def compose_note(self, inputs, job_id=None, deadline=None, progress=None):
+        """Blocking compose_note_async, for the Tk code paths."""
+        return PROVIDER_LOOP.run(self.compose_note_async(inputs, job_id, deadline, progress))
+
+    async def compose_note_async(self, inputs, job_id=None, deadline=None, progress=None):
+        """Generate every section for `inputs` and return the inputs build_template needs.
+
+        Sections are generated concurrently. With a `job_id`, each finished
+        section is checkpointed in the job store and sections already
+        checkpointed for that job are reused. `deadline` (seconds) bounds
+        the whole note: when it passes, outstanding requests are cancelled
+        and TimeoutError is raised, leaving the checkpoints for partial_note.
+        `progress`, if given, receives a ProgressEvent for each step.
+        """
+        with reporting_to(progress):
+            async with job_deadline(deadline):
+                return await self._compose_sections(inputs, job_id)
+
+    async def _compose_sections(self, inputs, job_id):
+        checkpoints = self.job_store.load_sections(job_id) if job_id else {}
+        all_names = self._section_names(inputs)
+        names = [name for name in all_names if name not in checkpoints]
+        emit("plan", total=len(all_names))
+        for name in all_names:
+            if name in checkpoints:
+                emit("section_finished", section=self._section_label(name), message="from checkpoint")
+
+        async def generate(name):
+            with section(self._section_label(name)):
+                # Sections whose inputs are unchanged since a previous generation
+                # are served from the section cache instead of calling the API
+                content = await self._generate_section(name, inputs)
+                if content == self.STEP_ERROR_TEXT:
+                    emit("section_failed", message="no provider answered")
+            if job_id and content != self.STEP_ERROR_TEXT:
+                self.job_store.save_section(job_id, name, content)
+            return content
+
+        sections = dict(checkpoints)
+        sections.update(zip(names, await asyncio.gather(*(generate(name) for name in names))))
+        return self._complete_inputs(inputs, sections)
+
+    def partial_note(self, inputs, job_id):
+        """The inputs build_template needs, from whatever sections the job checkpointed.
+
+        Sections that were never generated show INCOMPLETE_TEXT.
+        """
+        sections = self.job_store.load_sections(job_id)
+        return self._complete_inputs(inputs, {
+            name: sections.get(name, self.INCOMPLETE_TEXT) for name in self._section_names(inputs)
+        })
+
+    def _complete_inputs(self, inputs, sections):
+        complete_inputs = {
+            **inputs,
+            'generated_steps': [sections[f'step_{i}'] for i in range(1, len(inputs['objectives']) + 1)],
+            'is_stem': self.is_stem_subject(inputs['subject']),
+        }
+        for name, (field, _) in self.SECTION_FIELDS.items():
+            complete_inputs[field] = sections.get(name, "")
+        return complete_inputs
+
+    def _section_names(self, inputs):
+        """List the generated sections a note with these inputs contains."""
+        names = [f'step_{i}' for i in range(1, len(inputs['objectives']) + 1)]
+        names += ['evaluation', 'assignment', 'image_check']
+        if self.is_stem_subject(inputs['subject']):
+            names.append('formulae')
+        return names
+
+    def _section_label(self, name):
+        if name.startswith('step_'):
+            return f"Step {name.split('_')[1]}"
+        return self.SECTION_FIELDS[name][1]
+
+    async def _generate_section(self, name, inputs, force=False):
+        """Return one section's content, memoized on a fingerprint of its inputs.
+
+        `force` bypasses the cache and replaces the stored result.
+        """
+        topic, subject, objectives = inputs['topic'], inputs['subject'], inputs['objectives']
+        if name.startswith('step_'):
+            objective = objectives[int(name.split('_')[1]) - 1]
+            key = fingerprint('step', subject, objective)
+
+            async def compute():
+                return self.clean_ai_response(await self.call_ai_api(objective, subject))
+
+            if not force:
+                # Wait for a speculative request already working on this step
+                with self._prefetch_lock:
+                    pending = self._prefetch_futures.pop(key, None)
+                if pending is not None:
+                    content = await asyncio.wrap_future(pending)
+                    if content != self.STEP_ERROR_TEXT:
+                        self.section_cache.put(key, content)
+                        return content
+        elif name == 'formulae':
+            key = fingerprint(name, topic, subject)
+            compute = lambda: self.generate_key_formulae(topic, subject)
+        else:
+            key = fingerprint(name, topic, objectives, subject)
+            compute = {
+                'evaluation': lambda: self.generate_evaluation_questions(topic, objectives, subject),
+                'assignment': lambda: self.generate_assignment_questions(topic, objectives, subject),
+                'image_check': lambda: self.check_for_image_requirements(topic, objectives, subject),
+            }[name]
+
+        if not force:
+            cached = self.section_cache.get(key)
+            if cached is not None:
+                return cached
+        content = await compute()
+        # Don't memoize failures, so the next generation tries again
+        if content != self.STEP_ERROR_TEXT:
+            self.section_cache.put(key, content)
+        return content
+
+    def _schedule_prefetch(self):
+        """Restart the debounce timer after any change to the form."""
+        if self._prefetch_after_id is not None:
+            self.root.after_cancel(self._prefetch_after_id)
+            self._prefetch_after_id = None
+        if self.prefetch_var.get():
+            self._prefetch_after_id = self.root.after(self.PREFETCH_DEBOUNCE_MS, self._start_prefetch)
+        else:
+            self._cancel_prefetch(set())
+
+    def _start_prefetch(self):
+        """Start background step generation for objectives not yet cached."""
+        self._prefetch_after_id = None
+        # Same unstripped values generate_note uses, so the fingerprints match
+        subject = self.subject_entry.get()
+        if not subject.strip() or not self.topic_entry.get().strip():
+            return
+
+        wanted = {}
+        for entry in self.objective_entries:
+            objective = entry.get()
+            key = fingerprint('step', subject, objective)
+            if objective and key not in self.section_cache:
+                wanted[key] = objective
+
+        self._cancel_prefetch(set(wanted))
+        with self._prefetch_lock:
+            for key, objective in wanted.items():
+                if key not in self._prefetch_futures:
+                    self._prefetch_futures[key] = PROVIDER_LOOP.submit(
+                        run_as(self.client_id, self._prefetch_step(key, objective, subject)))
+
+    async def _prefetch_step(self, key, objective, subject):
+        """Generate one step and store it unless it went stale meanwhile."""
+        async with self._prefetch_slots:
+            content = self.clean_ai_response(await self.call_ai_api(objective, subject))
+        with self._prefetch_lock:
+            still_wanted = key in self._prefetch_futures
+            if still_wanted:
+                del self._prefetch_futures[key]
+        if still_wanted and content != self.STEP_ERROR_TEXT:
+            self.section_cache.put(key, content)
+        return content
+
+    def _cancel_prefetch(self, keep):
+        """Cancel speculative work for inputs that are no longer on the form.
+
+        Requests already in flight cannot be interrupted; their results are
+        simply discarded instead of being cached.
+        """
+        with self._prefetch_lock:
+            for key in [k for k in self._prefetch_futures if k not in keep]:
+                self._prefetch_futures.pop(key).cancel()
+
+    def _render_note(self, inputs):
+        """Show the note in the preview, tagging each generated section's region."""
+        self.output_view.set_content([
+            (f"section:{name}" if name else None, text)
+            for name, text in self.build_template_segments(inputs)
+        ])
+        self.lesson_note = self.build_template(inputs)
+        self.section_cb['values'] = [self._section_label(name) for name in self._section_names(inputs)]
+
+    def regenerate_section(self):
+        """Regenerate the selected section on the provider loop, then patch just its region of the preview."""
+        if self._regeneration is not None:
+            return
+        label = self.section_var.get()
+        if not self.note_inputs or not label:
+            messagebox.showerror("Error", "Generate a lesson note and choose a section first")
+            return
+
+        name = next(n for n in self._section_names(self.note_inputs) if self._section_label(n) == label)
+        profile = ActionProfile.start('regenerate_section')
+        future = PROVIDER_LOOP.submit(run_as(self.client_id, self._regenerate_section_async(name, self.note_inputs)))
+        self._regeneration = (name, self.note_inputs, future, profile)
+        self.regenerate_btn.config(state='disabled')
+        self.root.after(self.GENERATION_POLL_MS, self._check_regeneration)
+
+    async def _regenerate_section_async(self, name, inputs):
+        async with job_deadline(self.SECTION_DEADLINE):
+            return await self._generate_section(name, inputs, force=True)
+
+    def _check_regeneration(self):
+        """Patch the regenerated section into the preview once it has arrived."""
+        if self._regeneration is None:
+            # The window was closed
+            return
+        name, inputs, future, profile = self._regeneration
+        if not future.done():
+            self.root.after(self.GENERATION_POLL_MS, self._check_regeneration)
+            return
+        self._regeneration = None
+        self.regenerate_btn.config(state='normal')
+        if profile is not None:
+            profile.stop()
+
+        if future.cancelled():
+            return
+        error = future.exception()
+        if isinstance(error, TimeoutError):
+            messagebox.showerror("Error", f"Regeneration did not finish within {self.SECTION_DEADLINE} seconds")
+            return
+        if error is not None:
+            messagebox.showerror("Error", f"Regeneration failed: {str(error)}")
+            return
+        if inputs is not self.note_inputs:
+            # A new note replaced the one this section belonged to
+            return
+
+        content = future.result()
+        if name.startswith('step_'):
+            self.note_inputs['generated_steps'][int(name.split('_')[1]) - 1] = content
+        else:
+            self.note_inputs[self.SECTION_FIELDS[name][0]] = content
+
+        new_text = dict(self.build_template_segments(self.note_inputs)).get(name)
+        if new_text and self.output_view.patch(f"section:{name}", new_text):
+            self.lesson_note = self.build_template(self.note_inputs)
+        else:
+            # The section appeared or disappeared (e.g. image notice), so redraw
+            self._render_note(self.note_inputs)
 
     def clean_ai_response(self, text):
         lines = text.split('\n')
@@ -249,7 +739,7 @@ class LessonNoteGenerator:
         return '\n'.join(cleaned_lines).strip()
 
 
-    def call_ai_api(self, objective, subject):
+    async def call_ai_api(self, objective, subject):
         if self.is_stem_subject(subject):
             prompt = self.get_stem_prompt(objective, subject)
         else:
@@ -265,23 +755,16 @@ class LessonNoteGenerator:
             """
             
         try:
-            client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-            response = client.chat.completions.create(
-                model="llama3-70b-8192",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.7,
-                max_tokens=4000
-            )
-            content = response.choices[0].message.content
+            content = await self.call_provider(prompt, task='step')
             
             # Post-process STEM content
             if self.is_stem_subject(subject):
                 content = self.format_stem_content(content, subject)
                 
             return self.clean_ai_response(content)
-        except Exception as e:
-            print(f"Error calling Groq API: {e}")
-            return self.call_together_ai_api(objective, subject)
+        except ProviderError as e:
+            print(f"Error generating step content: {e}")
+            return self.STEP_ERROR_TEXT
 
     def get_stem_prompt(self, objective, subject):
         """Generate specialized prompt for STEM subjects"""
@@ -389,37 +872,7 @@ class LessonNoteGenerator:
             
         return text
 
-    def call_together_ai_api(self, objective, subject):
-        prompt = self.get_stem_prompt(objective, subject) if self.is_stem_subject(subject) else f"""
-        Generate concise content directly addressing this objective: {objective}
-        - Include recommended visual aids within the step content as: [Insert image showing...].
-        - Be direct and factual.
-        - Remove all introductory phrases and concluding remarks.
-        - Ensure proper spacing and line breaks for readability.
-        - If defining, provide exactly 2 definitions.
-        - If explaining, provide clear steps or points.
-        - Format as plain text with no markdown (e.g., no asterisks for bolding).
-        """
-        try:
-            client = Together(api_key=os.getenv("TOGETHER_AI_API_KEY"))
-            response = client.chat.completions.create(
-                model="together-model",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.7,
-                max_tokens=4000
-            )
-            content = response.choices[0].message.content
-            
-            # Post-process STEM content
-            if self.is_stem_subject(subject):
-                content = self.format_stem_content(content, subject)
-                
-            return self.clean_ai_response(content)
-        except Exception as e:
-            print(f"Error calling Together API: {e}")
-            return "[Error generating lesson step]"
-
-    def generate_evaluation_questions(self, topic, objectives, subject):
+    async def generate_evaluation_questions(self, topic, objectives, subject):
         num_questions = len(objectives)
         prompt = f"""
         Generate {num_questions} evaluation questions for topic '{topic}' based on these objectives: {', '.join(objectives)}.
@@ -428,9 +881,9 @@ class LessonNoteGenerator:
         - No introductory or concluding phrases.
         - Ensure proper spacing and line breaks.
         """
-        return self.clean_ai_response(self.call_groq_api(prompt))
+        return self.clean_ai_response(await self.call_provider(prompt, task='evaluation'))
 
-    def generate_assignment_questions(self, topic, objectives, subject):
+    async def generate_assignment_questions(self, topic, objectives, subject):
         prompt = f"""
         Generate 2-3 relevant assignment questions or tasks for topic '{topic}' based on these objectives: {', '.join(objectives)}.
         - The questions/tasks should encourage deeper understanding and application of the lesson.
@@ -438,12 +891,20 @@ class LessonNoteGenerator:
         - No introductory or concluding phrases.
         - Ensure proper spacing and line breaks.
         """
-        return self.clean_ai_response(self.call_groq_api(prompt))
+        return self.clean_ai_response(await self.call_provider(prompt, task='assignment'))
 
-    def generate_key_formulae(self, topic, subject):
-        """Generates key formulae/equations for STEM subjects."""
+    async def generate_key_formulae(self, topic, subject):
+        """Generates key formulae/equations for STEM subjects.
+
+        Known topics are answered from the local formula library; only
+        unknown ones go to the AI, and its answer is added to the library.
+        """
         subject_lower = subject.lower()
         if subject_lower in ["mathematics", "physics", "chemistry"]:
+            formulae = self.formula_library.lookup(subject, topic)
+            if formulae is not None:
+                return formulae
+
             prompt = f"""
             Generate 3-5 key formulae or equations relevant to the {subject} topic '{topic}'.
             - Use proper Unicode mathematical/chemical notation.
@@ -451,13 +912,25 @@ class LessonNoteGenerator:
             - Do not include any introductory or concluding phrases.
             - Ensure proper spacing and line breaks.
             """
-            return self.clean_ai_response(self.call_groq_api(prompt))
+            formulae = self.clean_ai_response(await self.call_provider(prompt, task='formulae'))
+            if formulae:
+                self.formula_library.add(subject, topic, formulae)
+            return formulae
         return ""
 
-    def check_for_image_requirements(self, topic, objectives, subject):
+    async def check_for_image_requirements(self, topic, objectives, subject):
+        """Visual-aid notice for a STEM lesson, from the local index when it is confident.
+
+        Only topics the index cannot match are sent to the AI, and those
+        answers are added to the index.
+        """
         if not self.is_stem_subject(subject):
             return ""
-            
+
+        notice = self.visual_aids.lookup(subject, topic, objectives)
+        if notice is not None:
+            return notice
+
         prompt = f"""
         Analyze if teaching this {subject} topic '{topic}' with these objectives {', '.join(objectives)} would require visual aids/images.
         If images are needed, list specific image types that would be helpful for teaching this lesson.
@@ -466,77 +939,89 @@ class LessonNoteGenerator:
         - If no images are needed, respond with "No specific visual aids recommended for this topic."
         - Do not include any introductory or concluding phrases.
         """
-        response = self.call_groq_api(prompt).strip()
+        response = (await self.call_provider(prompt, task='image_check')).strip()
         # Ensure the response is clean and doesn't contain unwanted phrases
         cleaned_response = self.clean_ai_response(response)
         if cleaned_response and "no specific visual aids" not in cleaned_response.lower():
-            return f"Recommended visual aids:\n{cleaned_response}"
-        return "" # Return empty string if no specific aids or if the AI explicitly says none
-
-    def call_groq_api(self, prompt):
-        client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-        response = client.chat.completions.create(
-            model="llama3-70b-8192",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.7,
-            max_tokens=4000
+            notice = f"Recommended visual aids:\n{cleaned_response}"
+        else:
+            notice = "" # Empty if no specific aids or if the AI explicitly says none
+        self.visual_aids.add(subject, topic, objectives, notice)
+        return notice
+
+    async def call_provider(self, prompt, task='step'):
+        """Generate with the best available provider for `task`, falling back in turn.
+
+        Each provider retries transient failures under the task's policy, and
+        identical prompts already in flight (from any generator in the
+        process) share one request.
+        """
+        return await self.providers.acomplete(
+            prompt, task, lambda provider: self.RETRY_POLICIES[task], self.retry_stats
         )
-        return response.choices[0].message.content
 
     def build_template(self, inputs):
+        return ''.join(text for _, text in self.build_template_segments(inputs))
+
+    def build_template_segments(self, inputs):
+        """Build the note as (section, text) pieces; section is None for fixed text."""
+        segments = []
         if inputs['is_stem']:
-            lesson_note = f"STEM LESSON NOTE\n\n"
-            lesson_note += f"Class: {inputs['class']}\n"
-            lesson_note += f"Week: {inputs['week']}\n"
-            lesson_note += f"Subject: {inputs['subject']}\n"
-            lesson_note += f"Topic: {inputs['topic']}\n\n"
+            header = f"STEM LESSON NOTE\n\n"
+            header += f"Class: {inputs['class']}\n"
+            header += f"Week: {inputs['week']}\n"
+            header += f"Subject: {inputs['subject']}\n"
+            header += f"Topic: {inputs['topic']}\n\n"
+            header += "KEY FORMULAE/EQUATIONS:\n"
+            segments.append((None, header))
             
             if inputs['key_formulae']:
-                lesson_note += "KEY FORMULAE/EQUATIONS:\n"
-                lesson_note += f"{inputs['key_formulae']}\n\n"
+                segments.append(('formulae', f"{inputs['key_formulae']}\n\n"))
             else:
-                lesson_note += "KEY FORMULAE/EQUATIONS:\n"
-                lesson_note += "[No specific key formulae for this subject/topic]\n\n"
+                segments.append(('formulae', "[No specific key formulae for this subject/topic]\n\n"))
         else:
-            lesson_note = f"LESSON NOTE\n\n"
-            lesson_note += f"Class: {inputs['class']}\n"
-            lesson_note += f"Week: {inputs['week']}\n"
-            lesson_note += f"Subject: {inputs['subject']}\n"
-            lesson_note += f"Topic: {inputs['topic']}\n\n"
-
-        lesson_note += "BEHAVIORAL OBJECTIVES:\n"
+            header = f"LESSON NOTE\n\n"
+            header += f"Class: {inputs['class']}\n"
+            header += f"Week: {inputs['week']}\n"
+            header += f"Subject: {inputs['subject']}\n"
+            header += f"Topic: {inputs['topic']}\n\n"
+            segments.append((None, header))
+
+        objectives_text = "BEHAVIORAL OBJECTIVES:\n"
         for i, obj in enumerate(inputs['objectives'], 1):
-            lesson_note += f"{i}. {obj}\n"
+            objectives_text += f"{i}. {obj}\n"
+        objectives_text += "\nPRESENTATION STEPS:\n"
+        segments.append((None, objectives_text))
 
-        lesson_note += "\nPRESENTATION STEPS:\n"
         for i, step in enumerate(inputs['generated_steps'], 1):
-            lesson_note += f"Step {i}: {step}\n"
-
-        lesson_note += "\nSTUDENTS ACTIVITIES:\n"
-        lesson_note += "Students listen attentively, participate in discussions, ask questions, and take notes.\n"
-
-        lesson_note += "\nEVALUATION:\n"
-        lesson_note += f"{inputs['evaluation_questions']}\n"
-
-        lesson_note += "\nSUMMARY:\n"
-        lesson_note += "The teacher summarizes the key points of the lesson.\n"
-
-        lesson_note += "\nCONCLUSION:\n"
-        lesson_note += "The teacher concludes the lesson and reinforces the main concepts.\n"
-
-        lesson_note += "\nASSIGNMENT/CLASS ACTIVITY:\n"
-        lesson_note += f"{inputs['assignment_questions']}\n"
+            segments.append((f'step_{i}', f"Step {i}: {step}\n"))
+
+        activities_text = "\nSTUDENTS ACTIVITIES:\n"
+        activities_text += "Students listen attentively, participate in discussions, ask questions, and take notes.\n"
+        activities_text += "\nEVALUATION:\n"
+        segments.append((None, activities_text))
+        segments.append(('evaluation', f"{inputs['evaluation_questions']}\n"))
+
+        closing_text = "\nSUMMARY:\n"
+        closing_text += "The teacher summarizes the key points of the lesson.\n"
+        closing_text += "\nCONCLUSION:\n"
+        closing_text += "The teacher concludes the lesson and reinforces the main concepts.\n"
+        closing_text += "\nASSIGNMENT/CLASS ACTIVITY:\n"
+        segments.append((None, closing_text))
+        segments.append(('assignment', f"{inputs['assignment_questions']}\n"))
 
         if inputs['image_notice']:
-            lesson_note += f"\nIMAGE NOTICE:\n{inputs['image_notice']}\n"
+            segments.append(('image_check', f"\nIMAGE NOTICE:\n{inputs['image_notice']}\n"))
 
-        return lesson_note
+        return segments
 
-    def _get_base_filename(self, extension):
+    def _get_base_filename(self, extension, inputs=None):
         """Helper to generate a clean base filename."""
-        class_name = self.class_var.get()
-        subject = self.subject_entry.get().strip()
-        topic = self.topic_entry.get().strip()
+        if inputs is None:
+            inputs = self.get_form_inputs()
+        class_name = inputs['class']
+        subject = inputs['subject'].strip()
+        topic = inputs['topic'].strip()
         
         def clean_text_for_filename(text):
             if not text:
@@ -565,15 +1050,19 @@ class LessonNoteGenerator:
 
     def _create_docx_document_object(self):
         """Helper function to create and populate a docx Document object."""
+        return self.build_docx_document(self.output_view.get_content(), self.get_form_inputs())
+
+    def build_docx_document(self, lesson_text, inputs):
+        """Build the lesson note DOCX from the note text and the form inputs."""
         doc = Document()
         style = doc.styles['Normal']
         font = style.font
         font.name = 'Arial Unicode MS'
         font.size = Pt(11)
 
-        topic = self.topic_entry.get().strip()
-        class_name = self.class_var.get()
-        subject = self.subject_entry.get().strip()
+        topic = inputs['topic'].strip()
+        class_name = inputs['class']
+        subject = inputs['subject'].strip()
 
         # Title
         title = doc.add_paragraph()
@@ -590,7 +1079,7 @@ class LessonNoteGenerator:
 
         # Standard fields
         fields = [
-            ("Week", self.week_entry.get()),
+            ("Week", inputs['week']),
             ("Date", ""),
             ("Class", class_name),
             ("Subject", subject),
@@ -609,8 +1098,6 @@ class LessonNoteGenerator:
             row_cells[0].text = field
             row_cells[1].text = value
 
-        lesson_text = self.output_text.get("1.0", tk.END)
-        
         # Extract Key Formulae
         if self.is_stem_subject(subject):
             key_formulae_text = ""
@@ -629,7 +1116,7 @@ class LessonNoteGenerator:
         # Behavioral Objectives
         row_cells = table.add_row().cells
         row_cells[0].text = "Behavioral Objectives"
-        objs = [entry.get() for entry in self.objective_entries if entry.get()]
+        objs = inputs['objectives']
         row_cells[1].text = "\n".join(f"{i + 1}. {obj}" for i, obj in enumerate(objs))
 
         # Helper to extract sections
@@ -711,6 +1198,7 @@ class LessonNoteGenerator:
 
         return doc
 
+    @profiled_action('export_docx')
     def _export_docx(self):
         """Exports the lesson note as a DOCX file."""
         default_filename = self._get_base_filename("docx")
@@ -730,7 +1218,11 @@ class LessonNoteGenerator:
         except Exception as e:
             messagebox.showerror("Error", f"DOCX Export failed: {str(e)}")
 
-if __name__ == "__main__":
+def main():
+    profiling.configure_from_args(sys.argv[1:])
     root = tk.Tk()
     app = LessonNoteGenerator(root)
     root.mainloop()
+
+if __name__ == "__main__":
+    main()
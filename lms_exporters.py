@@ -0,0 +1,184 @@
+import re
+from typing import Dict, Iterable, TextIO, Type
+from xml.sax.saxutils import escape, quoteattr
+
+from question_parser import ParsedQuestion
+
+
+class QuestionExporter:
+    """Streams parsed questions to an LMS import file.
+
+    Subclasses write a header, one fragment per question and a footer, so
+    memory use stays constant however many questions are exported.
+    """
+
+    name = ""
+    extension = ""
+    filetypes = []
+
+    def __init__(self, title: str = "Exam Questions", category: str = "") -> None:
+        self.title = title
+        self.category = category
+        self.unanswered = 0
+
+    def export(self, questions: Iterable[ParsedQuestion], path: str) -> int:
+        """Write every question to `path` and return how many were written."""
+        count = 0
+        self.unanswered = 0
+        with open(path, "w", encoding="utf-8", newline="\n", buffering=1 << 16) as f:
+            self.write_header(f)
+            for question in questions:
+                if question.kind == "mc" and question.answer is None:
+                    self.unanswered += 1
+                self.write_question(f, question)
+                count += 1
+            self.write_footer(f)
+        return count
+
+    def write_header(self, f: TextIO) -> None:
+        pass
+
+    def write_question(self, f: TextIO, question: ParsedQuestion) -> None:
+        raise NotImplementedError
+
+    def write_footer(self, f: TextIO) -> None:
+        pass
+
+
+EXPORTERS: Dict[str, Type[QuestionExporter]] = {}
+
+
+def register_exporter(cls: Type[QuestionExporter]) -> Type[QuestionExporter]:
+    """Class decorator adding an exporter to EXPORTERS under its name."""
+    EXPORTERS[cls.name] = cls
+    return cls
+
+
+@register_exporter
+class MoodleXMLExporter(QuestionExporter):
+    name = "Moodle XML"
+    extension = ".xml"
+    filetypes = [("Moodle XML", "*.xml")]
+
+    def write_header(self, f: TextIO) -> None:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<quiz>\n')
+        if self.category:
+            f.write(
+                '  <question type="category">\n'
+                f"    <category><text>$course$/{escape(self.category)}</text></category>\n"
+                "  </question>\n"
+            )
+
+    def write_question(self, f: TextIO, q: ParsedQuestion) -> None:
+        qtype = "multichoice" if q.kind == "mc" else "essay"
+        f.write(
+            f'  <question type="{qtype}">\n'
+            f"    <name><text>Question {q.number}</text></name>\n"
+            f'    <questiontext format="plain_text"><text>{escape(q.text)}</text></questiontext>\n'
+            "    <defaultgrade>1</defaultgrade>\n"
+        )
+        if q.kind == "mc":
+            f.write(
+                "    <single>true</single>\n"
+                "    <shuffleanswers>true</shuffleanswers>\n"
+                "    <answernumbering>abc</answernumbering>\n"
+            )
+            for label, text in q.options:
+                fraction = 100 if label == q.answer else 0
+                f.write(
+                    f'    <answer fraction="{fraction}" format="plain_text">'
+                    f"<text>{escape(text)}</text></answer>\n"
+                )
+        else:
+            lines = 15 if q.kind == "essay" else 5
+            f.write(
+                "    <responseformat>editor</responseformat>\n"
+                f"    <responsefieldlines>{lines}</responsefieldlines>\n"
+            )
+        f.write("  </question>\n")
+
+    def write_footer(self, f: TextIO) -> None:
+        f.write("</quiz>\n")
+
+
+@register_exporter
+class GIFTExporter(QuestionExporter):
+    name = "GIFT"
+    extension = ".txt"
+    filetypes = [("GIFT text", "*.txt *.gift")]
+
+    SPECIAL_CHARS = re.compile(r"([~=#{}:\\])")
+
+    def _escape(self, text: str) -> str:
+        return self.SPECIAL_CHARS.sub(r"\\\1", text.replace("\n", " "))
+
+    def write_header(self, f: TextIO) -> None:
+        if self.category:
+            f.write(f"$CATEGORY: {self.category}\n\n")
+
+    def write_question(self, f: TextIO, q: ParsedQuestion) -> None:
+        f.write(f"::Question {q.number}:: {self._escape(q.text)} {{")
+        if q.kind == "mc":
+            for label, text in q.options:
+                marker = "=" if label == q.answer else "~"
+                f.write(f"\n\t{marker}{self._escape(text)}")
+            f.write("\n}\n\n")
+        else:
+            f.write("}\n\n")
+
+
+@register_exporter
+class QTIExporter(QuestionExporter):
+    """IMS QTI 1.2 assessment, as imported by Canvas, Blackboard and others."""
+
+    name = "QTI 1.2"
+    extension = ".xml"
+    filetypes = [("QTI 1.2 XML", "*.xml")]
+
+    def write_header(self, f: TextIO) -> None:
+        f.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<questestinterop xmlns="http://www.imsglobal.org/xsd/ims_qtiasiv1p2">\n'
+            f'  <assessment ident="assessment" title={quoteattr(self.title)}>\n'
+            '    <section ident="root_section">\n'
+        )
+
+    def write_question(self, f: TextIO, q: ParsedQuestion) -> None:
+        qtype = "multiple_choice_question" if q.kind == "mc" else "essay_question"
+        f.write(
+            f'      <item ident="q{q.number}" title="Question {q.number}">\n'
+            "        <itemmetadata><qtimetadata><qtimetadatafield>"
+            f"<fieldlabel>question_type</fieldlabel><fieldentry>{qtype}</fieldentry>"
+            "</qtimetadatafield></qtimetadata></itemmetadata>\n"
+            "        <presentation>\n"
+            f'          <material><mattext texttype="text/plain">{escape(q.text)}</mattext></material>\n'
+        )
+        if q.kind == "mc":
+            f.write('          <response_lid ident="response1" rcardinality="Single"><render_choice>\n')
+            for label, text in q.options:
+                f.write(
+                    f'            <response_label ident="{label}"><material>'
+                    f'<mattext texttype="text/plain">{escape(text)}</mattext></material></response_label>\n'
+                )
+            f.write("          </render_choice></response_lid>\n        </presentation>\n")
+            f.write(
+                "        <resprocessing>\n"
+                '          <outcomes><decvar maxvalue="100" minvalue="0" varname="SCORE" vartype="Decimal"/></outcomes>\n'
+            )
+            if q.answer:
+                f.write(
+                    '          <respcondition continue="No"><conditionvar>'
+                    f'<varequal respident="response1">{q.answer}</varequal></conditionvar>'
+                    '<setvar action="Set" varname="SCORE">100</setvar></respcondition>\n'
+                )
+            f.write("        </resprocessing>\n")
+        else:
+            f.write(
+                '          <response_str ident="response1" rcardinality="Single">'
+                '<render_fib><response_label ident="answer1" rshuffle="No"/></render_fib></response_str>\n'
+                "        </presentation>\n"
+            )
+        f.write("      </item>\n")
+
+    def write_footer(self, f: TextIO) -> None:
+        f.write("    </section>\n  </assessment>\n</questestinterop>\n")
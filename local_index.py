@@ -0,0 +1,101 @@
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from objective_coverage import TfidfIndex
+
+
+# Subject spellings that share one index
+SUBJECT_ALIASES = {
+    "maths": "mathematics",
+    "further mathematics": "mathematics",
+    "further maths": "mathematics",
+}
+
+
+def normalise_subject(subject: str) -> str:
+    subject = " ".join(subject.lower().split())
+    return SUBJECT_ALIASES.get(subject, subject)
+
+
+class TopicAnswerIndex:
+    """Locally stored AI answers, keyed by subject and a topic description.
+
+    A query is matched to the closest stored description for the same
+    subject by TF-IDF similarity; a match at or above MIN_CONFIDENCE is
+    answered locally, anything weaker returns None so the caller can ask
+    the AI and `store` its answer for next time. Subclasses name the
+    TABLE and provide `seed_rows` to start from.
+    """
+
+    TABLE = ""
+    MIN_CONFIDENCE = 0.45
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._indexes: Dict[str, TfidfIndex] = {}
+        self._answers: Dict[str, List[str]] = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                f"""CREATE TABLE IF NOT EXISTS {self.TABLE} (
+                    subject TEXT NOT NULL,
+                    description TEXT NOT NULL,
+                    answer TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    PRIMARY KEY (subject, description)
+                )"""
+            )
+            if not self._conn.execute(f"SELECT 1 FROM {self.TABLE} WHERE source = 'seed' LIMIT 1").fetchone():
+                now = time.time()
+                self._conn.executemany(
+                    f"INSERT OR IGNORE INTO {self.TABLE} VALUES (?, ?, ?, 'seed', ?)",
+                    [(subject, description, answer, now) for subject, description, answer in self.seed_rows()]
+                )
+
+    def seed_rows(self) -> List[Tuple[str, str, str]]:
+        """(subject, description, answer) rows written into a new index."""
+        return []
+
+    def _index_for(self, subject: str) -> TfidfIndex:
+        """The subject's in-memory index, built from the database on first use."""
+        if subject not in self._indexes:
+            rows = self._conn.execute(
+                f"SELECT description, answer FROM {self.TABLE} WHERE subject = ?", (subject,)
+            ).fetchall()
+            self._indexes[subject] = TfidfIndex([description for description, _ in rows])
+            self._answers[subject] = [answer for _, answer in rows]
+        return self._indexes[subject]
+
+    def match(self, subject: str, description: str) -> Optional[str]:
+        """The stored answer for the closest known description, or None if not confident."""
+        subject = normalise_subject(subject)
+        with self._lock:
+            position, score = self._index_for(subject).best(description)
+            if position < 0 or score < self.MIN_CONFIDENCE:
+                return None
+            return self._answers[subject][position]
+
+    def store(self, subject: str, description: str, answer: str, source: str = "ai") -> None:
+        """Store an answer; the subject's in-memory index is rebuilt on next lookup."""
+        subject = normalise_subject(subject)
+        description = description.strip()
+        if not description:
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.TABLE} VALUES (?, ?, ?, ?, ?)",
+                (subject, description, answer, source, time.time())
+            )
+            self._indexes.pop(subject, None)
+
+    def is_trained(self) -> bool:
+        """True once anything beyond the seed entries has been stored."""
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT 1 FROM {self.TABLE} WHERE source != 'seed' LIMIT 1"
+            ).fetchone() is not None
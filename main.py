@@ -1,12 +1,24 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
+from diagnostics import StallPanel
 from lessonnotegeneratorupdated import LessonNoteGenerator
 from examgeneratorupdated import ExamQuestionGenerator
 import os
+import sys
+
+import profiling
+from shared_services import get_shared_services
+from stall_monitor import StallMonitor
 
 
 class ApplicationLauncher:
-    """Main application launcher that provides access to both tools."""
+    """Main application launcher that provides access to both tools.
+
+    Any number of lesson and exam windows can be open at once. They share
+    the provider loop, connection pool, request scheduler, stores and
+    response cache, so generations in different windows run side by side
+    and get their turn at the providers evenly.
+    """
     
     # Modern color scheme
     PRIMARY_COLOR = "#4a6da7"
@@ -23,7 +35,13 @@ class ApplicationLauncher:
         self.root.title("Avalon Educational Tools")
         self.root.geometry("600x400")
         self.root.configure(bg=self.BG_COLOR)
-        
+        self.services = get_shared_services()
+        # Open tool windows and their generators, in opening order
+        self.windows = {}
+
+        # Watches every window's event loop (they all share this root's) for freezes
+        self.stall_monitor = StallMonitor(self.root)
+        self.stall_monitor.start()
                 
         self._setup_ui()
     
@@ -99,29 +117,61 @@ class ApplicationLauncher:
             fg="#718096",
         )
         footer_label.pack()
+
+        diagnostics_btn = tk.Button(
+            footer_frame,
+            text="Diagnostics",
+            font=("Segoe UI", 9),
+            bg=self.BG_COLOR,
+            fg="#718096",
+            relief="flat",
+            command=self.show_diagnostics,
+        )
+        diagnostics_btn.pack(pady=(5, 0))
     
     def launch_lesson_note_generator(self):
-        """Launch the Lesson Note Generator application."""
-        self.root.withdraw()  # Hide the launcher window
-        lesson_window = tk.Toplevel()
-        LessonNoteGenerator(lesson_window)
-        lesson_window.protocol("WM_DELETE_WINDOW", lambda: self.on_child_close(lesson_window))
+        """Open another Lesson Note Generator window."""
+        lesson_window = tk.Toplevel(self.root)
+        app = LessonNoteGenerator(lesson_window, services=self.services)
+        self._track(lesson_window, app, LessonNoteGenerator)
     
     def launch_exam_generator(self):
-        """Launch the Exam Question Generator application."""
-        self.root.withdraw()  # Hide the launcher window
-        exam_window = tk.Toplevel()
-        ExamQuestionGenerator(exam_window)
-        exam_window.protocol("WM_DELETE_WINDOW", lambda: self.on_child_close(exam_window))
+        """Open another Exam Question Generator window."""
+        exam_window = tk.Toplevel(self.root)
+        app = ExamQuestionGenerator(exam_window, services=self.services)
+        self._track(exam_window, app, ExamQuestionGenerator)
+
+    def _track(self, window, app, kind):
+        """Number the window among its kind and stop its generation when it closes."""
+        same_kind = sum(1 for other in self.windows.values() if isinstance(other, kind))
+        if same_kind:
+            window.title(f"{window.title()} ({same_kind + 1})")
+        self.windows[window] = app
+        window.protocol("WM_DELETE_WINDOW", lambda: self.on_child_close(window))
     
+    def show_diagnostics(self):
+        """Show the UI stalls caught so far and where the event loop was blocked."""
+        StallPanel.show(self.root, self.stall_monitor)
+
     def on_child_close(self, window):
-        """Handle child window closing."""
+        """Stop the window's running generation, then close it."""
+        app = self.windows.pop(window, None)
+        if app is not None:
+            app.close()
         window.destroy()
-        self.root.deiconify()  # Show the launcher window again
 
 
 def main():
     """Entry point for the application."""
+    # --profile[=DIR] (or GENERATOR_PROFILE_DIR) profiles every generate and export action
+    argv = profiling.configure_from_args(sys.argv[1:])
+
+    # Headless service mode: python main.py --serve [--host H --port P --workers N]
+    if "--serve" in argv:
+        from server import main as serve_main
+        serve_main([arg for arg in argv if arg != "--serve"])
+        return
+
     root = tk.Tk()
     
     # Set Windows 10/11 theme if available
@@ -0,0 +1,150 @@
+import re
+from typing import Dict, List, Tuple
+
+import numpy as np
+from scipy import sparse
+
+
+# Words that appear in almost every objective or question and carry no topic
+# information ("Students should be able to explain...").
+STOPWORDS = {
+    "the", "and", "for", "with", "that", "this", "from", "into", "are", "was",
+    "were", "its", "their", "them", "they", "which", "what", "when", "where",
+    "why", "how", "who", "will", "would", "should", "could", "can", "able",
+    "students", "student", "pupils", "learners", "lesson", "end", "following",
+    "question", "questions", "answer", "correct", "give", "list", "state",
+    "define", "explain", "describe", "identify", "discuss", "mention", "write",
+    "each", "any", "two", "three", "four", "five", "one", "all", "not", "has",
+    "have", "been", "being", "also", "than", "then", "there", "these", "those",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case word tokens of three or more letters, minus stopwords."""
+    words = re.findall(r"[a-z][a-z0-9]{2,}", text.lower())
+    tokens = []
+    for word in words:
+        if word in STOPWORDS:
+            continue
+        # Crude plural folding so "equations" matches "equation"
+        if word.endswith("s") and not word.endswith("ss") and len(word) > 4:
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+def _count_matrix(documents: List[str], vocabulary: Dict[str, int], grow: bool = True) -> sparse.csr_matrix:
+    """Term counts per document; unknown terms are added to `vocabulary` if `grow`."""
+    rows, cols = [], []
+    for row, doc in enumerate(documents):
+        for token in tokenize(doc):
+            col = vocabulary.setdefault(token, len(vocabulary)) if grow else vocabulary.get(token)
+            if col is not None:
+                rows.append(row)
+                cols.append(col)
+
+    shape = (len(documents), max(len(vocabulary), 1))
+    counts = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float64), (rows, cols)), shape=shape
+    )
+    counts.sum_duplicates()
+    return counts
+
+
+def _normalise_rows(matrix: sparse.csr_matrix) -> sparse.csr_matrix:
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.diags(1.0 / norms) @ matrix
+
+
+def tfidf_matrix(documents: List[str]) -> Tuple[sparse.csr_matrix, Dict[str, int]]:
+    """Build an L2-normalised TF-IDF matrix (one row per document)."""
+    vocabulary: Dict[str, int] = {}
+    counts = _count_matrix(documents, vocabulary)
+    shape = counts.shape
+
+    doc_freq = np.bincount(counts.indices, minlength=shape[1])
+    idf = np.log((1 + shape[0]) / (1 + doc_freq)) + 1.0
+    weighted = counts.multiply(idf).tocsr()
+    return _normalise_rows(weighted), vocabulary
+
+
+class TfidfIndex:
+    """A fixed set of documents that short queries are scored against.
+
+    The document matrix and IDF weights are computed once; scoring a query
+    is then a tokenize and one sparse product, so a lookup against a few
+    thousand short documents takes microseconds instead of rebuilding the
+    matrix per query.
+    """
+
+    def __init__(self, documents: List[str]) -> None:
+        self.vocabulary: Dict[str, int] = {}
+        counts = _count_matrix(documents, self.vocabulary)
+        doc_freq = np.bincount(counts.indices, minlength=counts.shape[1])
+        self.idf = np.log((1 + counts.shape[0]) / (1 + doc_freq)) + 1.0
+        # Column-major, so each query term reads one contiguous posting list
+        self.postings = _normalise_rows(counts.multiply(self.idf).tocsr()).tocsc()
+        self.size = len(documents)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def scores(self, query: str) -> np.ndarray:
+        """Cosine similarity of `query` to every document.
+
+        Query terms the index has never seen count towards the query's norm
+        at the highest IDF, so a query that only partly matches a document
+        scores lower than one that matches it fully.
+        """
+        terms: Dict[int, float] = {}
+        unknown: Dict[str, float] = {}
+        unseen_idf = np.log(1 + self.size) + 1.0
+        for token in tokenize(query):
+            col = self.vocabulary.get(token)
+            if col is not None:
+                terms[col] = terms.get(col, 0.0) + self.idf[col]
+            else:
+                unknown[token] = unknown.get(token, 0.0) + unseen_idf
+        scores = np.zeros(self.size)
+        if not terms:
+            return scores
+        norm = np.sqrt(sum(w * w for w in terms.values()) + sum(w * w for w in unknown.values()))
+        indptr, indices, data = self.postings.indptr, self.postings.indices, self.postings.data
+        for col, weight in terms.items():
+            start, end = indptr[col], indptr[col + 1]
+            scores[indices[start:end]] += data[start:end] * (weight / norm)
+        return scores
+
+    def best(self, query: str) -> Tuple[int, float]:
+        """Index of the most similar document and its similarity (-1, 0.0 if empty)."""
+        if not len(self):
+            return -1, 0.0
+        scores = self.scores(query)
+        index = int(scores.argmax())
+        return index, float(scores[index])
+
+
+def similarity_matrix(questions: List[str], objectives: List[str]) -> np.ndarray:
+    """Cosine similarity between every question (rows) and objective (columns)."""
+    if not questions or not objectives:
+        return np.zeros((len(questions), len(objectives)))
+    matrix, _ = tfidf_matrix(list(questions) + list(objectives))
+    question_rows = matrix[: len(questions)]
+    objective_rows = matrix[len(questions):]
+    return (question_rows @ objective_rows.T).toarray()
+
+
+def objective_coverage(questions: List[str], objectives: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Return (best similarity, number of questions assigned) per objective.
+
+    Each question is assigned to the objective it is most similar to; a
+    question with no overlapping terms is not assigned to any objective.
+    """
+    similarity = similarity_matrix(questions, objectives)
+    if similarity.size == 0:
+        return np.zeros(len(objectives)), np.zeros(len(objectives), dtype=int)
+    best_score = similarity.max(axis=0)
+    assigned = similarity.argmax(axis=1)[similarity.max(axis=1) > 0]
+    counts = np.bincount(assigned, minlength=len(objectives))
+    return best_score, counts
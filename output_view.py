@@ -0,0 +1,164 @@
+import tkinter as tk
+from tkinter import ttk
+from typing import List, Optional, Sequence, Tuple, Union
+
+
+Segment = Tuple[Optional[str], str]
+
+
+class ChunkedOutputView:
+    """Incremental, paged front end for a read-mostly Text widget.
+
+    Content is kept here as (tag, text) segments and inserted into the
+    widget a chunk at a time from the event loop, so a large result never
+    blocks the UI in a single insert. Results longer than PAGE_CHARS are
+    split into pages and only the current page lives in the widget.
+    Export and copy should use get_content(), never the widget text.
+    """
+
+    CHUNK_CHARS = 8000
+    PAGE_CHARS = 60000
+
+    def __init__(self, text_widget: tk.Text, nav_parent: Optional[tk.Misc] = None,
+                 read_only: bool = False) -> None:
+        self.text = text_widget
+        self.read_only = read_only
+        self.segments: List[Segment] = []
+        self.pages: List[List[Segment]] = [[]]
+        self.page = 0
+        self._pending_after_id = None
+        self._fully_loaded = True
+        self.page_label = None
+        if nav_parent is not None:
+            self._create_nav(nav_parent)
+
+    def _create_nav(self, parent: tk.Misc) -> None:
+        self.prev_btn = ttk.Button(parent, text="◀ Previous", command=lambda: self.show_page(self.page - 1))
+        self.prev_btn.pack(side="left")
+        self.page_label = ttk.Label(parent, text="")
+        self.page_label.pack(side="left", padx=10)
+        self.next_btn = ttk.Button(parent, text="Next ▶", command=lambda: self.show_page(self.page + 1))
+        self.next_btn.pack(side="left")
+        ttk.Button(parent, text="Copy All", command=self.copy_all).pack(side="right")
+        self._update_nav()
+
+    @property
+    def is_paged(self) -> bool:
+        return len(self.pages) > 1
+
+    def set_content(self, content: Union[str, Sequence[Segment]]) -> None:
+        """Replace the content; a plain string is a single untagged segment."""
+        self.segments = [(None, content)] if isinstance(content, str) else list(content)
+        self.pages = self._paginate(self.segments)
+        self.show_page(0)
+
+    def get_content(self) -> str:
+        """The full underlying content.
+
+        When everything fits on one page and has been inserted, the widget
+        text is returned instead so manual edits in the preview are kept.
+        """
+        if not self.is_paged and self._fully_loaded:
+            return self.text.get("1.0", "end-1c")
+        return "".join(text for _, text in self.segments)
+
+    def patch(self, tag: str, new_text: str) -> bool:
+        """Replace the text of the segment tagged `tag`; False if there is none."""
+        index = next((i for i, (t, _) in enumerate(self.segments) if t == tag), None)
+        if index is None:
+            return False
+        self.segments[index] = (tag, new_text)
+
+        ranges = self.text.tag_ranges(tag)
+        if self.is_paged or not self._fully_loaded or not ranges:
+            page = self.page
+            self.pages = self._paginate(self.segments)
+            self.show_page(min(page, len(self.pages) - 1))
+            return True
+
+        start, end = ranges[0], ranges[-1]
+        self._set_writable(True)
+        self.text.delete(start, end)
+        self.text.insert(start, new_text, (tag,))
+        self._set_writable(False)
+        return True
+
+    def copy_all(self) -> None:
+        self.text.clipboard_clear()
+        self.text.clipboard_append(self.get_content())
+
+    def show_page(self, page: int) -> None:
+        """Clear the widget and start inserting `page` chunk by chunk."""
+        if not 0 <= page < len(self.pages):
+            return
+        if self._pending_after_id is not None:
+            self.text.after_cancel(self._pending_after_id)
+            self._pending_after_id = None
+
+        self.page = page
+        pieces = []
+        for tag, text in self.pages[page]:
+            for start in range(0, len(text), self.CHUNK_CHARS):
+                pieces.append((tag, text[start:start + self.CHUNK_CHARS]))
+        pieces.reverse()
+
+        self._set_writable(True)
+        self.text.delete("1.0", tk.END)
+        self._set_writable(False)
+        self._fully_loaded = False
+        self._update_nav()
+        # The first chunk goes in straight away so short content shows at once
+        self._insert_next_chunk(pieces)
+
+    def _insert_next_chunk(self, pieces: List[Segment]) -> None:
+        self._pending_after_id = None
+        inserted = 0
+        self._set_writable(True)
+        while pieces and inserted < self.CHUNK_CHARS:
+            tag, text = pieces.pop()
+            self.text.insert(tk.END, text, (tag,) if tag else ())
+            inserted += len(text)
+        self._set_writable(False)
+
+        if pieces:
+            self._pending_after_id = self.text.after(1, self._insert_next_chunk, pieces)
+        else:
+            self._fully_loaded = True
+
+    def _paginate(self, segments: List[Segment]) -> List[List[Segment]]:
+        """Split segments into pages of at most PAGE_CHARS, breaking at line ends."""
+        pages: List[List[Segment]] = []
+        current: List[Segment] = []
+        size = 0
+        for tag, text in segments:
+            while size + len(text) > self.PAGE_CHARS:
+                room = self.PAGE_CHARS - size
+                cut = text.rfind("\n", 0, room) + 1
+                if cut <= 0:
+                    if current:
+                        pages.append(current)
+                        current, size = [], 0
+                        continue
+                    cut = room  # a single line longer than a page
+                current.append((tag, text[:cut]))
+                pages.append(current)
+                current, size = [], 0
+                text = text[cut:]
+            if text:
+                current.append((tag, text))
+                size += len(text)
+        if current or not pages:
+            pages.append(current)
+        return pages
+
+    def _set_writable(self, writable: bool) -> None:
+        if self.read_only:
+            self.text.config(state="normal" if writable else "disabled")
+
+    def _update_nav(self) -> None:
+        if self.page_label is None:
+            return
+        paged = self.is_paged
+        self.page_label.config(text=f"Page {self.page + 1} of {len(self.pages)}" if paged else "")
+        self.prev_btn.config(state="normal" if paged and self.page > 0 else "disabled")
+        self.next_btn.config(state="normal" if paged and self.page < len(self.pages) - 1 else "disabled")
@@ -0,0 +1,183 @@
+import cProfile
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Deque, Dict, Iterator, List, Optional
+
+from providers import PROVIDER_LOOP
+
+
+PROFILE_ENV = "GENERATOR_PROFILE_DIR"
+DEFAULT_PROFILE_DIR = "profiles"
+TOP_FUNCTIONS = 10
+TOP_ALLOCATIONS = 25
+TRACEMALLOC_FRAMES = 10
+
+# Where idle threads wait (the Tk mainloop, the event loop's selector, a
+# blocking PROVIDER_LOOP.run); left out of the summary's hottest functions
+IDLE_FUNCTIONS = (
+    "'acquire' of '_thread.lock' objects", "'poll' of 'select.", "'select' of 'select.",
+    "'control' of 'select.kqueue'", "select.select", "time.sleep",
+    "'mainloop' of '_tkinter.tkapp'", "'dooneevent' of '_tkinter.tkapp'",
+)
+
+_directory: Optional[str] = os.getenv(PROFILE_ENV) or None
+_active_lock = threading.Lock()
+# Summaries of the latest profiled actions, newest last, for the in-app panel
+RECENT: Deque[Dict] = deque(maxlen=20)
+
+
+def enable(directory: str = DEFAULT_PROFILE_DIR) -> None:
+    """Profile every generate and export action from now on, writing reports to `directory`."""
+    global _directory
+    _directory = directory
+    os.makedirs(directory, exist_ok=True)
+
+
+def enabled() -> bool:
+    return _directory is not None
+
+
+def configure_from_args(argv: List[str]) -> List[str]:
+    """Handle --profile / --profile=DIR (or GENERATOR_PROFILE_DIR); returns the other arguments."""
+    rest = []
+    for arg in argv:
+        if arg == "--profile":
+            enable(_directory or DEFAULT_PROFILE_DIR)
+        elif arg.startswith("--profile="):
+            enable(arg.split("=", 1)[1])
+        else:
+            rest.append(arg)
+    if _directory is not None:
+        enable(_directory)
+        print(f"Profiling generate and export actions into {os.path.abspath(_directory)}")
+    return rest
+
+
+async def _enable_on_loop(profile: cProfile.Profile) -> bool:
+    try:
+        profile.enable()
+    except ValueError:
+        # Python 3.12+ allows one profiler per process, and it already sees every thread
+        return False
+    return True
+
+
+async def _disable_on_loop(profile: cProfile.Profile) -> None:
+    profile.disable()
+
+
+class ActionProfile:
+    """cProfile and tracemalloc around one action, from `start` to `stop`.
+
+    Generation runs on the provider loop, so the loop's thread is profiled
+    alongside the calling (Tk) thread and the two are reported together.
+    Only one action is profiled at a time; `start` returns None while
+    another is running.
+    """
+
+    def __init__(self, action: str) -> None:
+        self.action = action
+        self._profile = cProfile.Profile()
+        self._loop_profile: Optional[cProfile.Profile] = None
+        self._started_tracing = False
+        self._started = 0.0
+
+    @classmethod
+    def start(cls, action: str) -> Optional["ActionProfile"]:
+        if not enabled() or not _active_lock.acquire(blocking=False):
+            return None
+        self = cls(action)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self._started_tracing = True
+        tracemalloc.reset_peak()
+        self._started = time.perf_counter()
+        self._profile.enable()
+        loop_profile = cProfile.Profile()
+        if PROVIDER_LOOP.run(_enable_on_loop(loop_profile)):
+            self._loop_profile = loop_profile
+        return self
+
+    def stop(self) -> Dict:
+        """Stop profiling, write the reports and return the summary shown in the app."""
+        try:
+            if self._loop_profile is not None:
+                PROVIDER_LOOP.run(_disable_on_loop(self._loop_profile))
+            self._profile.disable()
+            seconds = time.perf_counter() - self._started
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            if self._started_tracing:
+                tracemalloc.stop()
+            return self._report(seconds, peak, snapshot)
+        finally:
+            _active_lock.release()
+
+    def _report(self, seconds: float, peak: int, snapshot: tracemalloc.Snapshot) -> Dict:
+        stats = pstats.Stats(self._profile)
+        if self._loop_profile is not None:
+            stats.add(self._loop_profile)
+        base = os.path.join(_directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{self.action}")
+        stats.dump_stats(base + ".prof")
+
+        allocations = snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ]).statistics("lineno")
+        with open(base + "-alloc.txt", "w", encoding="utf-8") as f:
+            f.write(f"{self.action}: {seconds:.2f}s, peak traced memory {peak / 1048576:.1f} MB\n\n")
+            f.write(f"Top {TOP_ALLOCATIONS} allocation sites still held at the end:\n")
+            for stat in allocations[:TOP_ALLOCATIONS]:
+                f.write(f"{stat}\n")
+
+        busy = [
+            (func, row) for func, row in stats.stats.items()
+            if not any(idle in pstats.func_std_string(func) for idle in IDLE_FUNCTIONS)
+        ]
+        hottest = sorted(busy, key=lambda item: item[1][2], reverse=True)[:TOP_FUNCTIONS]
+        summary = {
+            "action": self.action,
+            "seconds": round(seconds, 3),
+            "peak_mb": round(peak / 1048576, 2),
+            "profile": base + ".prof",
+            "functions": [
+                {
+                    "function": pstats.func_std_string(func),
+                    "calls": calls,
+                    "own_seconds": round(own, 4),
+                    "total_seconds": round(total, 4),
+                }
+                for func, (_, calls, own, total, _) in hottest
+            ],
+        }
+        RECENT.append(summary)
+        print(f"Profiled {self.action} in {seconds:.2f}s (peak {summary['peak_mb']} MB): {base}.prof")
+        return summary
+
+
+@contextmanager
+def profiled(action: str) -> Iterator[None]:
+    """Profile the block as `action` when profiling is enabled."""
+    profile = ActionProfile.start(action)
+    try:
+        yield
+    finally:
+        if profile is not None:
+            profile.stop()
+
+
+def profiled_action(action: str) -> Callable:
+    """Decorator form of `profiled` for generate and export handlers."""
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with profiled(action):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,131 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional
+
+
+# plan: `total` more sections are expected; section_*: one section's
+# lifecycle; provider: a request succeeded; fallback: a provider failed and
+# the next is tried; tokens: completion tokens received; retry: a request
+# is being retried; message: free-form status text
+EVENT_KINDS = (
+    "plan", "section_started", "section_finished", "section_failed",
+    "provider", "fallback", "tokens", "retry", "message",
+)
+
+
+class ProgressEvent:
+    """One step of a generation, as reported to a window or a headless client."""
+
+    __slots__ = ("kind", "section", "provider", "tokens", "total", "message", "time")
+
+    def __init__(self, kind: str, section: Optional[str] = None, provider: Optional[str] = None,
+                 tokens: Optional[int] = None, total: Optional[int] = None, message: str = "") -> None:
+        self.kind = kind
+        self.section = section
+        self.provider = provider
+        self.tokens = tokens
+        self.total = total
+        self.message = message
+        self.time = time.time()
+
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self) -> str:
+        return f"ProgressEvent({self.kind!r}, {self.section!r}, {self.message[:40]!r})"
+
+
+ProgressSink = Callable[[ProgressEvent], None]
+
+
+class _Section:
+    __slots__ = ("name", "failed")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.failed = False
+
+
+# The current generation's listener and section. Context variables are
+# inherited by every task a generation starts, so events from deep in the
+# provider layer reach the right listener without passing it around.
+_sink: ContextVar[Optional[ProgressSink]] = ContextVar("progress_sink", default=None)
+_section: ContextVar[Optional[_Section]] = ContextVar("progress_section", default=None)
+
+
+def emit(kind: str, **fields) -> None:
+    """Report an event to the current generation's listener, if it has one.
+
+    `section` defaults to the section being generated. A listener that
+    raises is reported and ignored; progress never fails a generation.
+    """
+    sink = _sink.get()
+    if sink is None:
+        return
+    current = _section.get()
+    if current is not None:
+        fields.setdefault("section", current.name)
+        if kind == "section_failed" and fields["section"] == current.name:
+            current.failed = True
+    try:
+        sink(ProgressEvent(kind, **fields))
+    except Exception as e:
+        print(f"Progress listener failed: {e}")
+
+
+@contextmanager
+def reporting_to(sink: Optional[ProgressSink]) -> Iterator[None]:
+    """Send events emitted inside the block to `sink`; None keeps the current listener."""
+    if sink is None:
+        yield
+        return
+    token = _sink.set(sink)
+    try:
+        yield
+    finally:
+        _sink.reset(token)
+
+
+@contextmanager
+def collecting(events: List[ProgressEvent]) -> Iterator[None]:
+    """Append events emitted inside the block to `events`, outside any section, for `replay`."""
+    sink_token = _sink.set(events.append)
+    section_token = _section.set(None)
+    try:
+        yield
+    finally:
+        _section.reset(section_token)
+        _sink.reset(sink_token)
+
+
+def replay(events: List[ProgressEvent]) -> None:
+    """Emit collected events again to the current listener, in the current section."""
+    for event in events:
+        emit(event.kind, provider=event.provider, tokens=event.tokens, total=event.total, message=event.message)
+
+
+@contextmanager
+def section(name: str) -> Iterator[None]:
+    """Bracket one section with started and finished/failed events.
+
+    Code inside may emit section_failed itself for failures it handles
+    (e.g. a placeholder result); the section then does not report finished.
+    """
+    current = _Section(name)
+    token = _section.set(current)
+    emit("section_started")
+    try:
+        yield
+    except asyncio.CancelledError:
+        emit("section_failed", message="cancelled")
+        raise
+    except BaseException as e:
+        emit("section_failed", message=str(e) or type(e).__name__)
+        raise
+    else:
+        if not current.failed:
+            emit("section_finished")
+    finally:
+        _section.reset(token)
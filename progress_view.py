@@ -0,0 +1,97 @@
+import queue
+import tkinter as tk
+from tkinter import ttk
+from typing import Dict
+
+from progress import ProgressEvent
+
+
+class ProgressPanel:
+    """Progress bar, status line and per-section status list for one generation.
+
+    Events are produced on the provider loop's thread and put on a
+    queue.Queue; the window drains it from `root.after`, so only the Tk
+    thread ever touches these widgets.
+    """
+
+    COLUMNS = (
+        ("section", "Section", 260),
+        ("status", "Status", 90),
+        ("provider", "Provider", 90),
+        ("tokens", "Tokens", 70),
+        ("retries", "Retries", 60),
+    )
+
+    def __init__(self, parent: tk.Misc, rows: int = 5) -> None:
+        self.frame = ttk.Frame(parent)
+        self.bar = ttk.Progressbar(self.frame, mode="determinate", maximum=1)
+        self.bar.pack(fill="x")
+        self.status_label = ttk.Label(self.frame, text="")
+        self.status_label.pack(anchor="w", pady=(4, 4))
+        self.tree = ttk.Treeview(self.frame, columns=[c[0] for c in self.COLUMNS], show="headings", height=rows)
+        for key, heading, width in self.COLUMNS:
+            self.tree.heading(key, text=heading)
+            self.tree.column(key, width=width, anchor="w" if key in ("section", "status", "provider") else "e")
+        self.tree.pack(fill="x")
+        self.reset()
+
+    def reset(self) -> None:
+        self.tree.delete(*self.tree.get_children())
+        self._rows: Dict[str, Dict] = {}
+        self.total = 0
+        self.finished = 0
+        self.bar.config(value=0, maximum=1)
+        self.status_label.config(text="")
+
+    def drain(self, events: "queue.Queue[ProgressEvent]") -> None:
+        """Apply every event waiting on the queue."""
+        while True:
+            try:
+                event = events.get_nowait()
+            except queue.Empty:
+                break
+            self.handle(event)
+
+    def handle(self, event: ProgressEvent) -> None:
+        if event.kind == "plan":
+            self.total += event.total or 0
+        elif event.kind == "message":
+            self.status_label.config(text=event.message)
+        elif event.section is not None:
+            self._update_row(event)
+        elif event.message:
+            self.status_label.config(text=event.message)
+        self._update_bar()
+
+    def _update_row(self, event: ProgressEvent) -> None:
+        row = self._rows.get(event.section)
+        if row is None:
+            row = self._rows[event.section] = {
+                "id": self.tree.insert("", tk.END), "section": event.section, "status": "waiting",
+                "provider": "", "tokens": 0, "retries": 0, "closed": False,
+            }
+        if event.kind == "section_started":
+            row["status"] = "running"
+            self.status_label.config(text=f"Generating {event.section}...")
+        elif event.kind in ("section_finished", "section_failed"):
+            if not row["closed"]:
+                row["closed"] = True
+                self.finished += 1
+            row["status"] = "done" if event.kind == "section_finished" else "failed"
+            if event.message:
+                self.status_label.config(text=f"{event.section}: {event.message}")
+        elif event.kind == "provider":
+            row["provider"] = event.provider
+        elif event.kind == "fallback":
+            self.status_label.config(text=f"{event.section}: {event.provider} failed, trying the next provider")
+        elif event.kind == "tokens":
+            row["tokens"] += event.tokens or 0
+        elif event.kind == "retry":
+            row["retries"] += 1
+            self.status_label.config(text=event.message)
+        self.tree.item(row["id"], values=[row[key] for key, _, _ in self.COLUMNS])
+        self.tree.see(row["id"])
+
+    def _update_bar(self) -> None:
+        total = max(self.total, len(self._rows), 1)
+        self.bar.config(maximum=total, value=self.finished)
@@ -0,0 +1,664 @@
+import asyncio
+import concurrent.futures
+import importlib.util
+import os
+import queue
+import threading
+import time
+import weakref
+from collections import deque
+from typing import Any, Callable, Coroutine, Deque, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+import numpy as np
+from groq import AsyncGroq
+from together import AsyncTogether
+
+from cassette import active_cassette
+from progress import ProgressEvent, collecting, emit, replay
+from request_scheduler import REQUEST_SCHEDULER
+from retry_policy import (
+    RETRYABLE_EXCEPTION_NAMES, RetryPolicy, RetryStats, get_status_code, time_left, without_deadline
+)
+from section_cache import fingerprint
+from single_flight import PROVIDER_CALLS
+
+
+# HTTP/2 lets many concurrent requests to one provider share a single
+# connection; httpx needs the optional h2 package for it
+HTTP2 = importlib.util.find_spec("h2") is not None
+HTTP_LIMITS = httpx.Limits(
+    max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "100")),
+    max_keepalive_connections=20
+)
+REQUEST_TIMEOUT = 60.0
+HTTP_TIMEOUT = httpx.Timeout(REQUEST_TIMEOUT, connect=10.0)
+
+
+class ProviderError(Exception):
+    """Every provider in a route failed for one request."""
+
+
+_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """The connection pool shared by every provider on the running event loop.
+
+    httpx clients are bound to the loop they were first used on, so each
+    loop (the provider loop, or the service's own loop) gets one client.
+    """
+    loop = asyncio.get_running_loop()
+    client = _http_clients.get(loop)
+    if client is None:
+        client = _http_clients[loop] = httpx.AsyncClient(http2=HTTP2, limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+    return client
+
+
+def request_timeout(limit: float = REQUEST_TIMEOUT) -> float:
+    """Timeout for one request: `limit`, cut to what is left of the job's deadline."""
+    left = time_left()
+    return limit if left is None else max(0.1, min(limit, left))
+
+
+async def close_http_client() -> None:
+    """Close the running loop's shared client, e.g. when a service shuts down."""
+    client = _http_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+class ProviderLoop:
+    """A background event loop that runs provider coroutines for blocking callers.
+
+    Tk callbacks, prefetch and other threads hand their coroutines to this
+    one loop, so every window shares one HTTP connection pool and one set
+    of in-flight requests. The loop thread starts on first use.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="provider-loop", daemon=True).start()
+            return self._loop
+
+    def submit(self, coro: Coroutine) -> concurrent.futures.Future:
+        """Schedule `coro` on the loop; cancelling the future cancels the coroutine."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Coroutine, poll: Optional[Callable[[], None]] = None,
+            interval: float = 0.05) -> Any:
+        """Run `coro` on the loop and block until it finishes.
+
+        `poll`, if given, is called in the waiting thread every `interval`
+        seconds, e.g. to keep a Tk window responsive.
+        """
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is not None and running is self._loop:
+            coro.close()
+            raise RuntimeError("ProviderLoop.run() called from the provider loop; await the coroutine instead")
+        future = self.submit(coro)
+        try:
+            while poll is not None and not future.done():
+                concurrent.futures.wait([future], timeout=interval)
+                poll()
+            return future.result()
+        except BaseException:
+            future.cancel()
+            raise
+
+
+# The single loop behind the synchronous wrappers
+PROVIDER_LOOP = ProviderLoop()
+
+
+class Provider:
+    """One text-generation backend.
+
+    Subclasses implement `_acreate` (a single attempt returning the reply
+    text), or `_create` for blocking backends, which then runs in a worker
+    thread. `acomplete` adds the shared behaviour: the provider's own
+    concurrency limit and a slot from the process-wide REQUEST_SCHEDULER,
+    retries under the caller's policy, coalescing of identical in-flight
+    prompts and recording or replay through the active cassette.
+    A coalesced request runs free of any caller's deadline and progress
+    listener: each caller stops waiting at its own deadline and receives
+    the request's token and retry events once it resolves;
+    `complete` is its blocking wrapper. `load`/`unload`
+    bracket any expensive setup; remote providers have none.
+
+    `cost` (relative price per request) and `quality` (0-1) feed the
+    router's weighted score; `expected_latency` is the latency assumed in
+    seconds until real measurements exist.
+    """
+
+    name = "provider"
+    local = False
+    cost = 1.0
+    quality = 0.8
+    expected_latency = 5.0
+
+    def __init__(self, model: str, max_concurrency: Optional[int] = None) -> None:
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self._slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+    def is_available(self) -> bool:
+        return True
+
+    def load(self) -> None:
+        pass
+
+    def unload(self) -> None:
+        pass
+
+    async def acomplete(self, prompt: str, policy: RetryPolicy, task: str,
+                        stats: Optional[RetryStats] = None, temperature: float = 0.7,
+                        max_tokens: int = 4000) -> str:
+        async def attempt() -> str:
+            if not self.max_concurrency:
+                return await self._attempt(prompt, temperature, max_tokens)
+            loop = asyncio.get_running_loop()
+            slots = self._slots.get(loop)
+            if slots is None:
+                slots = self._slots[loop] = asyncio.Semaphore(self.max_concurrency)
+            async with slots:
+                return await self._attempt(prompt, temperature, max_tokens)
+
+        cassette = active_cassette()
+        # Replayed retries back off at the replay speed
+        sleep = cassette.sleep if cassette is not None else asyncio.sleep
+
+        async def shared() -> Tuple[Optional[str], Optional[Exception], List[ProgressEvent]]:
+            events: List[ProgressEvent] = []
+            with without_deadline(), collecting(events):
+                try:
+                    return await policy.acall(attempt, task=task, stats=stats, sleep=sleep), None, events
+                except Exception as e:
+                    return None, e, events
+
+        content, error, events = await PROVIDER_CALLS.do(
+            fingerprint(self.name, self.model, prompt, temperature, max_tokens), shared
+        )
+        replay(events)
+        if error is not None:
+            raise error
+        return content
+
+    def complete(self, prompt: str, policy: RetryPolicy, task: str,
+                 stats: Optional[RetryStats] = None, temperature: float = 0.7,
+                 max_tokens: int = 4000) -> str:
+        return PROVIDER_LOOP.run(self.acomplete(prompt, policy, task, stats, temperature, max_tokens))
+
+    async def _attempt(self, prompt: str, temperature: float, max_tokens: int) -> str:
+        async with REQUEST_SCHEDULER.slot():
+            cassette = active_cassette()
+            if cassette is None:
+                return await self._acreate(prompt, temperature, max_tokens)
+            return await cassette.play(self, prompt, temperature, max_tokens)
+
+    async def _acreate(self, prompt: str, temperature: float, max_tokens: int) -> str:
+        return await asyncio.to_thread(self._create, prompt, temperature, max_tokens)
+
+    def _create(self, prompt: str, temperature: float, max_tokens: int) -> str:
+        raise NotImplementedError
+
+    def _report_tokens(self, usage) -> None:
+        """Emit a progress event for the completion tokens in a reply's usage, if reported."""
+        if isinstance(usage, dict):
+            tokens = usage.get("completion_tokens")
+        else:
+            tokens = getattr(usage, "completion_tokens", None)
+        if tokens:
+            emit("tokens", provider=self.name, tokens=int(tokens))
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.name!r}, {self.model!r})"
+
+
+class GroqProvider(Provider):
+    name = "groq"
+    quality = 0.9
+    expected_latency = 3.0
+
+    def __init__(self, model: str = "llama3-70b-8192") -> None:
+        super().__init__(model)
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncGroq]" = weakref.WeakKeyDictionary()
+
+    def is_available(self) -> bool:
+        return bool(os.getenv("GROQ_API_KEY"))
+
+    async def _acreate(self, prompt: str, temperature: float, max_tokens: int) -> str:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = self._clients[loop] = AsyncGroq(api_key=os.getenv("GROQ_API_KEY"), http_client=get_http_client())
+        reply = await client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=temperature,
+            max_tokens=max_tokens,
+            timeout=request_timeout()
+        )
+        self._report_tokens(reply.usage)
+        return reply.choices[0].message.content
+
+
+class TogetherProvider(Provider):
+    name = "together"
+
+    def __init__(self, model: str = "together-model") -> None:
+        super().__init__(model)
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncTogether]" = weakref.WeakKeyDictionary()
+
+    def is_available(self) -> bool:
+        return bool(os.getenv("TOGETHER_AI_API_KEY"))
+
+    async def _acreate(self, prompt: str, temperature: float, max_tokens: int) -> str:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = self._clients[loop] = AsyncTogether(
+                api_key=os.getenv("TOGETHER_AI_API_KEY"), http_client=get_http_client()
+            )
+        reply = await client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=temperature,
+            max_tokens=max_tokens,
+            timeout=request_timeout()
+        )
+        self._report_tokens(reply.usage)
+        return reply.choices[0].message.content
+
+
+class OpenAICompatibleProvider(Provider):
+    """Any /v1/chat/completions endpoint: Together's REST API or a local server.
+
+    Local servers (llama.cpp's llama-server, Ollama, LM Studio, vLLM) need
+    no key; `load` checks the process is up so an absent server is skipped.
+    The check runs in a worker thread, never on the event loop: until it
+    has answered the server is tried, and a refused connection falls back
+    at once.
+    """
+
+    def __init__(self, name: str, base_url: str, model: str,
+                 api_key_env: Optional[str] = None, local: bool = False,
+                 max_concurrency: Optional[int] = None, timeout: float = 30) -> None:
+        super().__init__(model, max_concurrency)
+        self.name = name
+        self.local = local
+        if local:
+            self.cost, self.quality, self.expected_latency = 0.0, 0.6, 10.0
+        self.base_url = base_url.rstrip("/")
+        self.api_key_env = api_key_env
+        self.timeout = timeout
+        self._healthy: Optional[bool] = None
+        self._probe_lock = threading.Lock()
+        self._probing = False
+
+    def is_available(self) -> bool:
+        if self.api_key_env and not os.getenv(self.api_key_env):
+            return False
+        if self.local and self._healthy is None and not self._probing:
+            threading.Thread(target=self.load, name=f"{self.name}-health-check", daemon=True).start()
+        return self._healthy is not False
+
+    def load(self) -> None:
+        """Check that a local server is up and record whether it answered; blocks for up to 2s."""
+        if not self.local:
+            return
+        with self._probe_lock:
+            if self._probing:
+                return
+            self._probing = True
+        try:
+            httpx.get(f"{self.base_url}/models", timeout=2).raise_for_status()
+            self._healthy = True
+        except httpx.HTTPError as e:
+            print(f"Local model server at {self.base_url} is not reachable: {e}")
+            self._healthy = False
+        finally:
+            self._probing = False
+
+    def unload(self) -> None:
+        self._healthy = None
+
+    async def _acreate(self, prompt: str, temperature: float, max_tokens: int) -> str:
+        headers = {"Content-Type": "application/json"}
+        if self.api_key_env:
+            headers["Authorization"] = f"Bearer {os.getenv(self.api_key_env)}"
+        response = await get_http_client().post(
+            f"{self.base_url}/chat/completions",
+            headers=headers,
+            json={
+                "model": self.model,
+                "messages": [{"role": "user", "content": prompt}],
+                "temperature": temperature,
+                "max_tokens": max_tokens
+            },
+            timeout=request_timeout(self.timeout)
+        )
+        response.raise_for_status()
+        reply = response.json()
+        self._report_tokens(reply.get("usage"))
+        return reply["choices"][0]["message"]["content"]
+
+
+class LlamaCppProvider(Provider):
+    """An in-process GGUF model on the CPU through llama-cpp-python.
+
+    `instances` copies of the model are loaded into a warm pool on first
+    use (or by `load`, e.g. from a background thread at start-up). A Llama
+    object is not thread-safe, so each request borrows one instance in a
+    worker thread and the pool size is the concurrency limit. A cancelled
+    request stops waiting at once, but its worker finishes the completion
+    before the instance returns to the pool.
+    """
+
+    name = "local"
+    local = True
+    cost = 0.0
+    quality = 0.6
+    expected_latency = 10.0
+
+    def __init__(self, model_path: str, instances: int = 1, n_ctx: int = 4096,
+                 n_threads: Optional[int] = None) -> None:
+        super().__init__(os.path.basename(model_path))
+        self.model_path = model_path
+        self.instances = max(1, instances)
+        self.n_ctx = n_ctx
+        self.n_threads = n_threads
+        self._pool: "queue.Queue" = queue.Queue()
+        self._load_lock = threading.Lock()
+        self._loaded = False
+        self._load_failed = False
+
+    def is_available(self) -> bool:
+        return not self._load_failed and os.path.exists(self.model_path)
+
+    def load(self) -> None:
+        with self._load_lock:
+            if self._loaded or self._load_failed:
+                return
+            try:
+                from llama_cpp import Llama
+            except ImportError:
+                print("llama-cpp-python is not installed; the local model is disabled")
+                self._load_failed = True
+                return
+            started = time.monotonic()
+            for _ in range(self.instances):
+                self._pool.put(Llama(
+                    model_path=self.model_path, n_ctx=self.n_ctx,
+                    n_threads=self.n_threads, verbose=False
+                ))
+            self._loaded = True
+            print(f"Loaded {self.instances} x {self.model} in {time.monotonic() - started:.1f}s")
+
+    def unload(self) -> None:
+        with self._load_lock:
+            while not self._pool.empty():
+                self._pool.get_nowait()
+            self._loaded = False
+
+    def _create(self, prompt: str, temperature: float, max_tokens: int) -> str:
+        self.load()
+        if not self._loaded:
+            raise ProviderError("Local model is not available")
+        llm = self._pool.get()
+        try:
+            reply = llm.create_chat_completion(
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature,
+                max_tokens=min(max_tokens, self.n_ctx // 2)
+            )
+        finally:
+            self._pool.put(llm)
+        self._report_tokens(reply.get("usage"))
+        return reply["choices"][0]["message"]["content"]
+
+
+_local_provider: Optional[Provider] = None
+_local_provider_lock = threading.Lock()
+
+
+def get_local_provider() -> Optional[Provider]:
+    """The process-wide local backend configured in the environment, if any.
+
+    LOCAL_MODEL_PATH selects an in-process llama.cpp model (LOCAL_MODEL_INSTANCES
+    copies, LOCAL_MODEL_THREADS CPU threads each); otherwise LOCAL_MODEL_URL
+    points at a local OpenAI-compatible server serving LOCAL_MODEL_NAME
+    (LOCAL_MODEL_CONCURRENCY requests at a time). The model is loaded in the
+    background as soon as the provider is first requested.
+    """
+    global _local_provider
+    with _local_provider_lock:
+        if _local_provider is not None:
+            return _local_provider
+        path = os.getenv("LOCAL_MODEL_PATH")
+        url = os.getenv("LOCAL_MODEL_URL")
+        if path:
+            threads = os.getenv("LOCAL_MODEL_THREADS")
+            _local_provider = LlamaCppProvider(
+                path,
+                instances=int(os.getenv("LOCAL_MODEL_INSTANCES", "1")),
+                n_threads=int(threads) if threads else None
+            )
+        elif url:
+            _local_provider = OpenAICompatibleProvider(
+                "local", url, os.getenv("LOCAL_MODEL_NAME", "local-model"), local=True,
+                max_concurrency=int(os.getenv("LOCAL_MODEL_CONCURRENCY", "2")), timeout=120
+            )
+        else:
+            return None
+        threading.Thread(target=_local_provider.load, name="local-model-load", daemon=True).start()
+        return _local_provider
+
+
+def is_network_error(exc: BaseException) -> bool:
+    """True when a request never reached the provider (offline, DNS, refused)."""
+    if get_status_code(exc) is not None:
+        return False
+    return any(cls.__name__ in RETRYABLE_EXCEPTION_NAMES for cls in type(exc).__mro__)
+
+
+class ProviderStats:
+    """Rolling latency and error statistics per (provider, model, task).
+
+    Latency is tracked as an exponentially weighted moving average (used
+    for routing) and a window of recent samples (for percentiles in the
+    diagnostics panel). Error rate is an EWMA of 0/1 outcomes, so a
+    provider recovers its standing once it starts succeeding again.
+    """
+
+    ALPHA = 0.2
+    WINDOW = 100
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, str, str], Dict] = {}
+
+    def record(self, provider: Provider, task: str, seconds: float, ok: bool) -> None:
+        key = (provider.name, provider.model, task)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = {
+                    "calls": 0, "errors": 0, "latency": None, "error_rate": 0.0,
+                    "samples": deque(maxlen=self.WINDOW),
+                }
+            entry["calls"] += 1
+            entry["error_rate"] += self.ALPHA * ((0.0 if ok else 1.0) - entry["error_rate"])
+            if ok:
+                samples: Deque[float] = entry["samples"]
+                samples.append(seconds)
+                latency = entry["latency"]
+                entry["latency"] = seconds if latency is None else latency + self.ALPHA * (seconds - latency)
+            else:
+                entry["errors"] += 1
+
+    def estimate(self, provider: Provider, task: str) -> Tuple[float, float]:
+        """Expected (latency seconds, error rate) for a provider on a task.
+
+        Falls back to the provider's average over other tasks, then to its
+        `expected_latency`, when the task has no successful samples yet.
+        """
+        with self._lock:
+            entry = self._entries.get((provider.name, provider.model, task))
+            if entry is not None and entry["latency"] is not None:
+                return entry["latency"], entry["error_rate"]
+            others = [
+                e["latency"] for (name, model, _), e in self._entries.items()
+                if name == provider.name and model == provider.model and e["latency"] is not None
+            ]
+            error_rate = entry["error_rate"] if entry is not None else 0.0
+        if others:
+            return float(np.mean(others)), error_rate
+        return provider.expected_latency, error_rate
+
+    def snapshot(self) -> List[Dict]:
+        """One row per (provider, model, task), for display or JSON."""
+        with self._lock:
+            items = [(key, dict(entry, samples=list(entry["samples"]))) for key, entry in self._entries.items()]
+        rows = []
+        for (name, model, task), entry in sorted(items):
+            samples = np.array(entry["samples"]) if entry["samples"] else None
+            latency = entry["latency"]
+            rows.append({
+                "provider": name,
+                "model": model,
+                "task": task,
+                "calls": entry["calls"],
+                "errors": entry["errors"],
+                "error_rate": round(entry["error_rate"], 3),
+                "ewma_seconds": round(latency, 2) if latency is not None else None,
+                "p50_seconds": round(float(np.percentile(samples, 50)), 2) if samples is not None else None,
+                "p95_seconds": round(float(np.percentile(samples, 95)), 2) if samples is not None else None,
+            })
+        return rows
+
+
+# Shared by every router in the process so all windows and service workers
+# learn from each other's calls
+PROVIDER_STATS = ProviderStats()
+
+
+def _env_weight(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+class ProviderRouter:
+    """Orders providers for each request and falls through them on failure.
+
+    Providers are ranked per task by a weighted score, lower being better:
+    expected latency in seconds plus penalties for recent error rate, cost
+    and missing quality. The weights come from ROUTING_ERROR_WEIGHT,
+    ROUTING_COST_WEIGHT and ROUTING_QUALITY_WEIGHT so a school can trade
+    speed for price or output quality. Tasks in `local_first_tasks` (short
+    prompts where network latency dominates) always try the local backend
+    first. While a cassette is replayed, the providers it recorded count
+    as available whether or not they are configured here.
+
+    A provider that fails with a network error is skipped for
+    OFFLINE_COOLDOWN seconds so an offline machine goes straight to the
+    local model instead of waiting out every retry. Failures caused by the
+    job's deadline running out count against neither.
+    """
+
+    OFFLINE_COOLDOWN = 30.0
+
+    def __init__(self, remote: Sequence[Provider], local: Optional[Provider] = None,
+                 local_first_tasks: Sequence[str] = (), stats: ProviderStats = PROVIDER_STATS,
+                 weights: Optional[Dict[str, float]] = None) -> None:
+        self.remote = list(remote)
+        self.local = local
+        self.local_first_tasks = set(local_first_tasks)
+        self.stats = stats
+        # Each weight is the number of seconds of latency that an error rate
+        # of 1.0, a cost of 1.0 or one full point of quality is worth
+        self.weights = weights or {
+            "errors": _env_weight("ROUTING_ERROR_WEIGHT", 20.0),
+            "cost": _env_weight("ROUTING_COST_WEIGHT", 0.0),
+            "quality": _env_weight("ROUTING_QUALITY_WEIGHT", 20.0),
+        }
+        self._offline_until: Dict[str, float] = {}
+
+    @property
+    def providers(self) -> List[Provider]:
+        return self.remote + ([self.local] if self.local else [])
+
+    def score(self, provider: Provider, task: str) -> float:
+        latency, error_rate = self.stats.estimate(provider, task)
+        return (
+            latency
+            + self.weights["errors"] * error_rate
+            + self.weights["cost"] * provider.cost
+            + self.weights["quality"] * (1.0 - provider.quality)
+        )
+
+    def order(self, task: str) -> List[Provider]:
+        """Providers to try for `task`, best first."""
+        cassette = active_cassette()
+        replaying = cassette is not None and cassette.replaying
+        providers = sorted(
+            (p for p in self.providers if (cassette.knows(p) if replaying else p.is_available())),
+            key=lambda p: self.score(p, task)
+        )
+        if self.local in providers and task in self.local_first_tasks:
+            providers.remove(self.local)
+            providers.insert(0, self.local)
+        now = time.monotonic()
+        online = [p for p in providers if self._offline_until.get(p.name, 0) <= now]
+        return online or providers
+
+    def complete(self, prompt: str, task: str, retry_policy: Callable[[Provider], RetryPolicy],
+                 stats: Optional[RetryStats] = None, **params) -> str:
+        """Blocking `acomplete`, run on the shared provider loop."""
+        return PROVIDER_LOOP.run(self.acomplete(prompt, task, retry_policy, stats, **params))
+
+    async def acomplete(self, prompt: str, task: str, retry_policy: Callable[[Provider], RetryPolicy],
+                        stats: Optional[RetryStats] = None, **params) -> str:
+        """Generate with the first provider that succeeds; ProviderError if none do."""
+        providers = self.order(task)
+        if not providers:
+            raise ProviderError("No AI provider is configured; add an API key or a local model to .env")
+        last_error: Optional[BaseException] = None
+        for provider in providers:
+            left = time_left()
+            if left is not None and left <= 0:
+                raise ProviderError(f"Deadline reached before {task} finished") from last_error
+            started = time.monotonic()
+            try:
+                content = await provider.acomplete(
+                    prompt, retry_policy(provider), f"{task} ({provider.name})", stats, **params
+                )
+            except Exception as e:
+                print(f"{provider.name} failed for {task}: {e}")
+                emit("fallback", provider=provider.name, message=str(e))
+                last_error = e
+                left = time_left()
+                if left is not None and left <= 0.1:
+                    continue
+                self.stats.record(provider, task, time.monotonic() - started, ok=False)
+                if is_network_error(e):
+                    self._offline_until[provider.name] = time.monotonic() + self.OFFLINE_COOLDOWN
+                continue
+            seconds = time.monotonic() - started
+            self.stats.record(provider, task, seconds, ok=True)
+            self._offline_until.pop(provider.name, None)
+            emit("provider", provider=provider.name, message=f"{seconds:.1f}s")
+            return content
+        raise ProviderError(f"All providers failed for {task}: {last_error}") from last_error
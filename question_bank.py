@@ -0,0 +1,181 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from objective_coverage import tfidf_matrix
+from question_parser import ParsedQuestion, QUESTION_KINDS, parse_questions
+
+
+DEFAULT_BANK_PATH = os.getenv(
+    "QUESTION_BANK_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "question_bank.db")
+)
+
+# Question kinds back to the question types shown in the exam form
+KIND_LABELS = {kind: label for label, kind in QUESTION_KINDS.items()}
+
+
+def question_key(text: str) -> str:
+    """Normalise a question stem so reworded punctuation or case still match."""
+    return " ".join(re.sub(r"[^\w\s]", "", text.lower()).split())
+
+
+class QuestionBank:
+    """Every parsed question generated so far, indexed by class, subject and kind.
+
+    Questions are stored once per class and subject (keyed by normalised
+    stem), so papers can later be assembled from the bank without calling
+    a provider.
+    """
+
+    def __init__(self, path: str = DEFAULT_BANK_PATH) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS questions (
+                    id INTEGER PRIMARY KEY,
+                    class TEXT NOT NULL,
+                    subject TEXT NOT NULL,
+                    topic TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    options TEXT NOT NULL,
+                    answer TEXT,
+                    key TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    UNIQUE (class, subject, key)
+                )"""
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS questions_lookup ON questions(class, subject, kind)"
+            )
+
+    def add_paper(self, inputs: Dict, questions_text: str) -> int:
+        """Parse a generated paper into the bank; returns how many questions were new."""
+        now = time.time()
+        rows = [
+            (inputs["class"].lower(), inputs["subject"].lower(), inputs["topic"], q.kind, q.text,
+             json.dumps(q.options, ensure_ascii=False), q.answer, question_key(q.text), now)
+            for q in parse_questions(questions_text.splitlines(), inputs["question_type"])
+            if q.text
+        ]
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO questions"
+                " (class, subject, topic, kind, text, options, answer, key, created)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            return self._conn.total_changes - before
+
+    def candidates(self, cls: str, subject: str, kinds: Optional[List[str]] = None) -> List[ParsedQuestion]:
+        """Stored questions for a class and subject, optionally of the given kinds."""
+        query = "SELECT * FROM questions WHERE class = ? AND subject = ?"
+        params = [cls.lower(), subject.lower()]
+        if kinds:
+            query += f" AND kind IN ({','.join('?' * len(kinds))})"
+            params.extend(kinds)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY id", params).fetchall()
+        return [
+            ParsedQuestion(row["id"], row["text"], row["kind"],
+                           [tuple(option) for option in json.loads(row["options"])], row["answer"])
+            for row in rows
+        ]
+
+
+def even_quotas(total: int, n: int) -> List[int]:
+    """Share `total` as evenly as possible over `n` slots, earlier slots first."""
+    base, extra = divmod(total, n)
+    return [base + (1 if i < extra else 0) for i in range(n)]
+
+
+def assemble_paper(
+    candidates: List[ParsedQuestion],
+    objectives: List[str],
+    type_mix: Dict[str, int],
+    objective_quotas: Optional[List[int]] = None,
+    max_similarity: float = 0.6,
+    min_relevance: float = 0.15
+) -> Tuple[List[ParsedQuestion], Dict[str, int]]:
+    """Pick a paper from stored questions under objective, type and duplicate constraints.
+
+    Each candidate is assigned to the requested objective it is most similar
+    to (TF-IDF cosine); candidates below `min_relevance` to every objective
+    are ignored. Questions are then chosen greedily, most relevant first,
+    while their objective quota (an even split by default) and type quota
+    are both open and they are less than `max_similarity` similar to every
+    question already chosen. If quotas cannot all be met, a second pass
+    fills the remaining type quotas from any objective.
+
+    Returns the chosen questions and the shortfall per kind (empty when the
+    paper is complete).
+    """
+    num_questions = sum(type_mix.values())
+    if objective_quotas is None:
+        objective_quotas = even_quotas(num_questions, len(objectives))
+    kinds = list(type_mix)
+    pool = [q for q in candidates if q.kind in type_mix]
+    if not pool or not objectives:
+        return [], {kind: count for kind, count in type_mix.items() if count}
+
+    # One TF-IDF space for questions and objectives serves both relevance and duplicates
+    matrix, _ = tfidf_matrix([q.text for q in pool] + list(objectives))
+    vectors = matrix[:len(pool)]
+    relevance_matrix = (vectors @ matrix[len(pool):].T).toarray()
+    objective_of = relevance_matrix.argmax(axis=1)
+    relevance = relevance_matrix.max(axis=1)
+    kind_of = np.array([kinds.index(q.kind) for q in pool])
+
+    objective_left = np.array(objective_quotas, dtype=int)
+    kind_left = np.array([type_mix[kind] for kind in kinds], dtype=int)
+    available = relevance >= min_relevance
+    nearest = np.zeros(len(pool))  # highest similarity to any chosen question
+    chosen: List[int] = []
+
+    def pick(respect_objectives: bool) -> None:
+        while kind_left.sum() > 0:
+            mask = available & (kind_left[kind_of] > 0) & (nearest < max_similarity)
+            if respect_objectives:
+                mask &= objective_left[objective_of] > 0
+            if not mask.any():
+                return
+            best = int(np.argmax(np.where(mask, relevance, -1.0)))
+            chosen.append(best)
+            available[best] = False
+            kind_left[kind_of[best]] -= 1
+            objective_left[objective_of[best]] -= 1
+            np.maximum(nearest, vectors @ vectors[best].toarray().ravel(), out=nearest)
+
+    pick(respect_objectives=True)
+    pick(respect_objectives=False)
+
+    # Keep the paper in objective order, as a generated paper would be
+    chosen.sort(key=lambda i: (objective_of[i], -relevance[i]))
+    shortfall = {kind: int(left) for kind, left in zip(kinds, kind_left) if left > 0}
+    return [pool[i] for i in chosen], shortfall
+
+
+def format_paper(questions: List[ParsedQuestion]) -> str:
+    """Render chosen questions as numbered exam text, matching generated output."""
+    blocks = []
+    for number, q in enumerate(questions, 1):
+        line = f"{number}. {q.text}"
+        if q.options:
+            line += " " + " ".join(f"({label}) {text}" for label, text in q.options)
+        if q.answer:
+            line += f"\nAnswer: ({q.answer})"
+        blocks.append(line)
+    return "\n\n".join(blocks)
@@ -0,0 +1,108 @@
+import re
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+
+QUESTION_START = re.compile(r"^\s*(\d+)\.\s*")
+# An option label preceded by whitespace, so "f(a)" in a stem is left alone
+OPTION_MARKER = re.compile(r"(?<!\S)\(([a-e])\)\s*", re.IGNORECASE)
+ANSWER_PATTERN = re.compile(
+    r"\b(?:answer|correct(?:\s+(?:option|answer|choice))?)\b\s*(?:is)?\s*[:\-=]?\s*\(?([a-e])\)?(?![a-z])",
+    re.IGNORECASE
+)
+
+# Map the generator's question types to parser kinds
+QUESTION_KINDS = {"Multiple Choice": "mc", "Theory": "theory", "Essay": "essay"}
+
+MC_LABELS = ["a", "b", "c", "d"]
+
+
+class ParsedQuestion:
+    """One question from generated exam text."""
+
+    __slots__ = ("number", "text", "kind", "options", "answer")
+
+    def __init__(self, number: int, text: str, kind: str,
+                 options: Optional[List[Tuple[str, str]]] = None,
+                 answer: Optional[str] = None) -> None:
+        self.number = number
+        self.text = text
+        self.kind = kind
+        self.options = options or []
+        self.answer = answer
+
+    def __repr__(self) -> str:
+        return f"ParsedQuestion({self.number}, {self.kind!r}, {self.text[:40]!r})"
+
+
+def iter_question_blocks(lines: Iterable[str]) -> Iterator[List[str]]:
+    """Group lines into per-question blocks without holding the whole text."""
+    block: List[str] = []
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if QUESTION_START.match(line):
+            if block:
+                yield block
+            block = [line]
+        elif block and line.strip():
+            block.append(line)
+    if block:
+        yield block
+
+
+def parse_block(block: List[str], default_kind: str = "theory") -> ParsedQuestion:
+    """Parse one question block into stem, options and answer."""
+    match = QUESTION_START.match(block[0])
+    number = int(match.group(1))
+    body = [block[0][match.end():].strip()]
+    answer = None
+    for line in block[1:]:
+        found = ANSWER_PATTERN.search(line)
+        if found and not OPTION_MARKER.match(line.strip()):
+            answer = found.group(1).lower()
+        else:
+            body.append(line.strip())
+
+    text = " ".join(part for part in body if part)
+    pieces = OPTION_MARKER.split(text)
+    # split() alternates text and captured labels: stem, label, option, label, option...
+    stem = pieces[0].strip()
+    options = [
+        (pieces[i].lower(), pieces[i + 1].strip())
+        for i in range(1, len(pieces) - 1, 2)
+    ]
+
+    if len(options) >= 2:
+        # A trailing "Answer: (b)" on the option line lands in the last option
+        last_label, last_text = options[-1]
+        found = ANSWER_PATTERN.search(last_text)
+        if found:
+            answer = answer or found.group(1).lower()
+            options[-1] = (last_label, last_text[:found.start()].strip(" .;-"))
+        return ParsedQuestion(number, stem, "mc", options, answer)
+    return ParsedQuestion(number, text, "essay" if default_kind == "essay" else "theory")
+
+
+def mc_defects(question: ParsedQuestion) -> List[str]:
+    """Reasons a parsed question is not a usable four-option MC question (empty if none)."""
+    defects = []
+    if not question.text:
+        defects.append("the question text is missing")
+    labels = [label for label, _ in question.options]
+    if len(labels) != len(MC_LABELS):
+        defects.append(f"it has {len(labels)} options instead of {len(MC_LABELS)}")
+    elif labels != MC_LABELS:
+        defects.append("its options are not labelled (a) to (d) in order")
+    empty = [f"({label})" for label, text in question.options if not text]
+    if empty:
+        defects.append(f"option {', '.join(empty)} is empty")
+    texts = [text.lower() for _, text in question.options if text]
+    if len(set(texts)) < len(texts):
+        defects.append("two options are identical")
+    return defects
+
+
+def parse_questions(lines: Iterable[str], question_type: str = "Theory") -> Iterator[ParsedQuestion]:
+    """Lazily parse generated exam text (any iterable of lines) into questions."""
+    default_kind = QUESTION_KINDS.get(question_type, "theory")
+    for block in iter_question_blocks(lines):
+        yield parse_block(block, default_kind)
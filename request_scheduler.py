@@ -0,0 +1,145 @@
+import asyncio
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Deque, Iterator, Optional
+
+
+# Who the current provider request is for: a window, or a service job.
+# Context variables are inherited by every task a generation starts.
+_client: ContextVar[str] = ContextVar("scheduler_client", default="default")
+
+
+@contextmanager
+def scheduling_as(client: str) -> Iterator[None]:
+    """Schedule the provider requests made inside the block as `client`'s."""
+    token = _client.set(client)
+    try:
+        yield
+    finally:
+        _client.reset(token)
+
+
+async def run_as(client: str, coro):
+    """Await `coro` with its provider requests scheduled as `client`'s."""
+    with scheduling_as(client):
+        return await coro
+
+
+class _LoopState:
+    def __init__(self) -> None:
+        self.active = 0
+        # client -> its waiting requests, in the order clients are served
+        self.waiters: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self.started: Deque[float] = deque()
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class FairScheduler:
+    """Process-wide cap on provider requests, shared round-robin between clients.
+
+    At most `max_concurrent` requests run at once and, if `per_minute` is
+    set, no more than that many start in any 60 seconds. When requests
+    have to wait, freed slots go to each waiting client in turn, so a
+    40-question exam in one window cannot starve a lesson note started in
+    another. State is kept per event loop, like the other asyncio
+    primitives here.
+    """
+
+    def __init__(self, max_concurrent: int = 8, per_minute: Optional[int] = None) -> None:
+        self.max_concurrent = max(1, max_concurrent)
+        self.per_minute = per_minute or None
+        self._lock = threading.Lock()
+        self._states: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState]" = weakref.WeakKeyDictionary()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one request slot for the current client for the duration of the block."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            state = self._states.get(loop)
+            if state is None:
+                state = self._states[loop] = _LoopState()
+        if not state.waiters and self._can_start(state):
+            self._start(state)
+        else:
+            waiter = loop.create_future()
+            state.waiters.setdefault(_client.get(), deque()).append(waiter)
+            self._grant(state)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # Granted just as it was cancelled; pass the slot on
+                    self._release(state)
+                raise
+        try:
+            yield
+        finally:
+            self._release(state)
+
+    def waiting(self) -> int:
+        """Requests waiting for a slot on the running loop."""
+        state = self._states.get(asyncio.get_running_loop())
+        return sum(len(queue) for queue in state.waiters.values()) if state else 0
+
+    def _can_start(self, state: _LoopState) -> bool:
+        if state.active >= self.max_concurrent:
+            return False
+        if self.per_minute is None:
+            return True
+        now = time.monotonic()
+        while state.started and state.started[0] <= now - 60:
+            state.started.popleft()
+        return len(state.started) < self.per_minute
+
+    def _start(self, state: _LoopState) -> None:
+        state.active += 1
+        if self.per_minute is not None:
+            state.started.append(time.monotonic())
+
+    def _release(self, state: _LoopState) -> None:
+        state.active -= 1
+        self._grant(state)
+
+    def _grant(self, state: _LoopState) -> None:
+        """Hand free slots to waiting clients in turn."""
+        while state.waiters and self._can_start(state):
+            client, queue = next(iter(state.waiters.items()))
+            waiter = queue.popleft()
+            if queue:
+                state.waiters.move_to_end(client)
+            else:
+                del state.waiters[client]
+            if waiter.done():
+                continue
+            self._start(state)
+            waiter.set_result(None)
+        if state.waiters and state.active < self.max_concurrent and state.timer is None:
+            # Only the per-minute rate is holding them; retry once the oldest start ages out
+            delay = state.started[0] + 60 - time.monotonic()
+            state.timer = asyncio.get_running_loop().call_later(max(0.0, delay), self._on_timer, state)
+
+    def _on_timer(self, state: _LoopState) -> None:
+        state.timer = None
+        self._grant(state)
+
+
+def _env_int(name: str, default: Optional[int]) -> Optional[int]:
+    value = os.getenv(name)
+    try:
+        return int(value) if value else default
+    except ValueError:
+        return default
+
+
+# Every provider request in the process goes through this, whichever
+# window or service job it is for
+REQUEST_SCHEDULER = FairScheduler(
+    max_concurrent=_env_int("MAX_CONCURRENT_REQUESTS", 8),
+    per_minute=_env_int("MAX_REQUESTS_PER_MINUTE", None),
+)
@@ -0,0 +1,222 @@
+import asyncio
+import random
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, Optional
+
+from progress import emit
+
+
+# HTTP status codes worth another attempt: timeouts, conflicts, rate limits and
+# transient server-side failures. Anything else in the 4xx range (bad key,
+# bad request, unknown model) will fail the same way every time.
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+
+# Exception class names (anywhere in the MRO) that indicate a network-level
+# problem rather than a rejected request. Matching on names keeps this module
+# independent of the Groq, Together, requests and httpx packages.
+RETRYABLE_EXCEPTION_NAMES = {
+    "APIConnectionError", "APITimeoutError", "RateLimitError",
+    "InternalServerError", "ServiceUnavailableError",
+    "ConnectionError", "ConnectTimeout", "ReadTimeout", "Timeout",
+    "TimeoutError", "ChunkedEncodingError",
+    "ConnectError", "RemoteProtocolError", "TimeoutException",
+}
+
+
+# time.monotonic() by which the current job must finish, if it has a
+# deadline. Set by `job_deadline`; tasks the job starts inherit it.
+_job_deadline: ContextVar[Optional[float]] = ContextVar("job_deadline", default=None)
+
+
+def time_left() -> Optional[float]:
+    """Seconds left before the current job's deadline, or None without one."""
+    deadline = _job_deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+@asynccontextmanager
+async def job_deadline(seconds: Optional[float]) -> AsyncIterator[None]:
+    """Give everything awaited inside the block `seconds` to finish.
+
+    When time runs out every outstanding request, retry and fallback is
+    cancelled and TimeoutError is raised. Retries and per-request timeouts
+    inside the block are cut to the time left. A nested deadline never
+    extends an outer one; None sets no deadline of its own.
+    """
+    deadline = _job_deadline.get()
+    if seconds is not None:
+        own = time.monotonic() + seconds
+        deadline = own if deadline is None else min(deadline, own)
+    token = _job_deadline.set(deadline)
+    try:
+        if deadline is None:
+            yield
+        else:
+            loop = asyncio.get_running_loop()
+            async with asyncio.timeout_at(loop.time() + deadline - time.monotonic()):
+                yield
+    finally:
+        _job_deadline.reset(token)
+
+
+@contextmanager
+def without_deadline() -> Iterator[None]:
+    """Run the block free of the current job's deadline; the caller enforces its own."""
+    token = _job_deadline.set(None)
+    try:
+        yield
+    finally:
+        _job_deadline.reset(token)
+
+
+def get_status_code(exc: BaseException) -> Optional[int]:
+    """Return the HTTP status code carried by an SDK or requests exception."""
+    status = getattr(exc, "status_code", None)
+    if isinstance(status, int):
+        return status
+    response = getattr(exc, "response", None)
+    status = getattr(response, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def get_retry_after(exc: BaseException) -> Optional[float]:
+    """Return the server's Retry-After hint in seconds, if one was sent."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Classify an exception as transient (retry) or fatal (give up now)."""
+    status = get_status_code(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    return any(cls.__name__ in RETRYABLE_EXCEPTION_NAMES for cls in type(exc).__mro__)
+
+
+class RetryStats:
+    """Thread-safe per-task counters of calls, retries and failures."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.counts: Dict[str, Dict[str, int]] = {}
+
+    def record(self, task: str, field: str, amount: int = 1) -> None:
+        with self._lock:
+            task_counts = self.counts.setdefault(
+                task, {"calls": 0, "retries": 0, "failures": 0}
+            )
+            task_counts[field] = task_counts.get(field, 0) + amount
+
+    def summary(self) -> str:
+        with self._lock:
+            parts = [
+                f"{task}: {c['calls']} calls, {c['retries']} retries, {c['failures']} failures"
+                for task, c in sorted(self.counts.items())
+            ]
+        return "; ".join(parts) if parts else "no API calls"
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counts.clear()
+
+
+class RetryPolicy:
+    """Capped exponential backoff with full jitter and an overall deadline."""
+
+    def __init__(
+        self,
+        max_attempts: int = 4,
+        base_delay: float = 1.0,
+        max_delay: float = 20.0,
+        deadline: float = 90.0,
+        jitter: bool = True,
+    ) -> None:
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.jitter = jitter
+
+    def backoff(self, attempt: int) -> float:
+        """Return the delay before retry number `attempt` (1-based)."""
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return random.uniform(0, delay) if self.jitter else delay
+
+    async def acall(
+        self,
+        func: Callable[[], Awaitable[Any]],
+        task: str = "api",
+        stats: Optional[RetryStats] = None,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ) -> Any:
+        """Await `func()`, retrying transient failures until attempts or time run out.
+
+        Backoff waits with `sleep` without blocking the loop. Fatal errors
+        and the last transient error are re-raised unchanged so callers can
+        keep their existing fallback handling.
+        """
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            if stats:
+                stats.record(task, "calls")
+            try:
+                return await func()
+            except Exception as e:
+                delay = self._retry_delay(e, attempt, start, task, stats)
+                if delay is None:
+                    raise
+                await sleep(delay)
+
+    def _retry_delay(
+        self,
+        exc: Exception,
+        attempt: int,
+        start: float,
+        task: str,
+        stats: Optional[RetryStats],
+    ) -> Optional[float]:
+        """Seconds to wait before retrying after `exc`, or None to give up."""
+        if not is_retryable(exc) or attempt >= self.max_attempts:
+            if stats:
+                stats.record(task, "failures")
+            return None
+
+        delay = self.backoff(attempt)
+        retry_after = get_retry_after(exc)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+
+        remaining = self.deadline - (time.monotonic() - start)
+        job_remaining = time_left()
+        if job_remaining is not None:
+            remaining = min(remaining, job_remaining)
+        if delay >= remaining:
+            if stats:
+                stats.record(task, "failures")
+            return None
+
+        if stats:
+            stats.record(task, "retries")
+        print(f"{task}: attempt {attempt} failed ({exc}); retrying in {delay:.1f}s")
+        emit("retry", message=f"{task}: attempt {attempt} failed; retrying in {delay:.1f}s")
+        return delay
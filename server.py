@@ -0,0 +1,527 @@
+import argparse
+import asyncio
+import io
+import itertools
+import json
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, quote, urlsplit
+
+from examgeneratorupdated import ExamQuestionGenerator
+from job_store import JobStore
+from progress import ProgressEvent
+from lessonnotegeneratorupdated import LessonNoteGenerator
+from providers import PROVIDER_STATS, close_http_client
+from question_bank import KIND_LABELS
+from request_scheduler import REQUEST_SCHEDULER, scheduling_as
+from shared_services import SharedServices
+from single_flight import PROVIDER_CALLS
+
+
+PRIORITIES = {"high": 0, "normal": 5, "low": 9}
+DOCX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+STATUS_TEXT = {
+    200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found",
+    405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large",
+    500: "Internal Server Error", 503: "Service Unavailable",
+}
+
+
+class Job:
+    """One queued lesson-note or exam generation."""
+
+    def __init__(self, kind: str, inputs: Dict, priority: int, job_id: Optional[str] = None,
+                 deadline: Optional[float] = None) -> None:
+        self.id = job_id or uuid.uuid4().hex
+        self.kind = kind
+        self.inputs = inputs
+        self.priority = priority
+        self.deadline = deadline
+        self.task: Optional[asyncio.Task] = None
+        # Progress events as dicts, for GET /jobs/<id>/events
+        self.events: List[Dict] = []
+        self.status = "queued"
+        self.result: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.finished: Optional[float] = None
+        self.done = asyncio.Event()
+
+    @classmethod
+    def from_record(cls, record: Dict, default_deadline: float) -> "Job":
+        """Rebuild a job from its job-store record; `default_deadline` covers records without one."""
+        job = cls(record["kind"], record["inputs"], record["priority"], record["id"],
+                  deadline=record["deadline"] or default_deadline)
+        job.status = record["status"]
+        job.result = record["result"]
+        job.error = record["error"]
+        job.created = record["created"]
+        if job.status in ("done", "failed", "cancelled", "abandoned"):
+            job.finished = record["updated"]
+            job.done.set()
+        return job
+
+    def record_event(self, event: ProgressEvent) -> None:
+        self.events.append(event.to_dict())
+
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "priority": self.priority,
+            "deadline": self.deadline,
+            "inputs": self.inputs,
+            "result": self.result,
+            "error": self.error,
+            "created": self.created,
+            "finished": self.finished,
+        }
+
+
+class GenerationService:
+    """Local HTTP API over the lesson-note and exam pipelines.
+
+    Requests are accepted on an asyncio front end and queued by priority;
+    a fixed number of dispatchers run the pipelines as coroutines on the
+    same event loop, so every client on the machine shares one set of
+    generators, caches, HTTP connections and provider rate budget. The
+    thread pool is only used for CPU-bound work such as building DOCX
+    files. Jobs and their finished sections are recorded in
+    the job store, so a restarted service resumes interrupted jobs from
+    their last checkpoint.
+
+    Endpoints:
+        POST /lesson-notes      queue a lesson note (JSON inputs)
+        POST /exams             queue an exam paper (JSON inputs)
+        GET  /jobs/<id>         job status and result
+        GET  /jobs/<id>/events  progress events; ?since=N returns those after the first N
+        GET  /jobs/<id>/docx    download the finished document
+        POST /jobs/<id>/cancel  stop a queued or running job, keeping its partial result
+        POST /jobs/<id>/retry   resume a failed or cancelled job from its checkpoints
+        POST /papers            assemble an exam from the question bank (no provider calls)
+        GET  /health            queue, worker, request-slot and per-provider latency status
+
+    POST bodies may include "priority" ("high", "normal", "low" or 0-9),
+    "deadline" (seconds the job may run once started; when it passes the
+    job fails with whatever it finished as a partial result) and "wait":
+    true to hold the response until the job finishes.
+    """
+
+    MAX_BODY_BYTES = 64 * 1024
+    MAX_FINISHED_JOBS = 500
+    DEFAULT_DEADLINE = 600.0
+    MAX_DEADLINE = 3600.0
+
+    def __init__(self, workers: int = 4, max_queue: int = 100) -> None:
+        self.workers = workers
+        self.max_queue = max_queue
+        self.job_store = JobStore()
+        services = SharedServices(self.job_store)
+        self.lesson_generator = LessonNoteGenerator(services=services)
+        self.exam_generator = ExamQuestionGenerator(services=services)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="generation")
+        self.queue: Optional[asyncio.PriorityQueue] = None
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._sequence = itertools.count()
+
+    async def serve(self, host: str, port: int) -> None:
+        self.queue = asyncio.PriorityQueue(maxsize=self.max_queue)
+        self._resume_unfinished_jobs()
+        dispatchers = [asyncio.create_task(self._dispatch()) for _ in range(self.workers)]
+        server = await asyncio.start_server(self._handle_connection, host, port)
+        print(f"Serving lesson notes and exams on http://{host}:{port} with {self.workers} workers")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for task in dispatchers:
+                task.cancel()
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            await close_http_client()
+
+    # Job handling
+
+    def submit(self, kind: str, inputs: Dict, priority: int, deadline: Optional[float] = None) -> Job:
+        job = Job(kind, inputs, priority, deadline=deadline or self.DEFAULT_DEADLINE)
+        # put_nowait raises QueueFull, reported to the client as 503
+        self.queue.put_nowait((priority, next(self._sequence), job))
+        self.job_store.create_job(
+            kind, inputs, origin="service", priority=priority, job_id=job.id, deadline=job.deadline
+        )
+        self.jobs[job.id] = job
+        self._evict_finished_jobs()
+        return job
+
+    async def _dispatch(self) -> None:
+        while True:
+            _, _, job = await self.queue.get()
+            # Skip entries for jobs cancelled while queued (or already run
+            # through a second entry after a retry)
+            if job.status != "queued":
+                self.queue.task_done()
+                continue
+            job.status = "running"
+            self.job_store.set_status(job.id, "running")
+            job.task = asyncio.create_task(self._run_job(job))
+            try:
+                job.result = await job.task
+                job.status = "done"
+                self.job_store.set_status(job.id, "done", result=job.result)
+            except asyncio.CancelledError:
+                if asyncio.current_task().cancelling():
+                    # The service is shutting down; the job resumes on restart
+                    raise
+                job.result = self._partial_result(job)
+                job.status = "cancelled"
+                self.job_store.set_status(job.id, "cancelled", result=job.result)
+            except TimeoutError:
+                job.error = f"Deadline of {job.deadline:g}s reached"
+                job.result = self._partial_result(job)
+                job.status = "failed"
+                self.job_store.set_status(job.id, "failed", result=job.result, error=job.error)
+            except Exception as e:
+                print(f"Job {job.id} failed: {e}")
+                job.error = str(e)
+                job.status = "failed"
+                self.job_store.set_status(job.id, "failed", error=job.error)
+            finally:
+                job.task = None
+                job.finished = time.time()
+                job.done.set()
+                self.queue.task_done()
+
+    async def _run_job(self, job: Job) -> Dict:
+        """Run the pipeline for a job within its deadline.
+
+        Each job is its own scheduler client, so concurrent jobs share the
+        provider request slots evenly.
+        """
+        with scheduling_as(job.id):
+            return await self._run_pipeline(job)
+
+    async def _run_pipeline(self, job: Job) -> Dict:
+        if job.kind == "lesson":
+            note_inputs = await self.lesson_generator.compose_note_async(
+                job.inputs, job.id, job.deadline, progress=job.record_event
+            )
+            return {"text": self.lesson_generator.build_template(note_inputs)}
+
+        text, coverage, answers = await self.exam_generator.run_pipeline_async(
+            job.inputs, progress=job.record_event, job_id=job.id, deadline=job.deadline
+        )
+        return {
+            "text": text,
+            "answers": answers,
+            "coverage": [
+                {"objective": objective, "similarity": round(score, 3), "questions": count}
+                for objective, score, count in coverage
+            ],
+        }
+
+    def _partial_result(self, job: Job) -> Dict:
+        """What a stopped job had finished, from its checkpoints."""
+        if job.kind == "lesson":
+            note_inputs = self.lesson_generator.partial_note(job.inputs, job.id)
+            return {"text": self.lesson_generator.build_template(note_inputs), "partial": True}
+        text, answers = self.exam_generator.partial_paper(job.inputs, job.id)
+        return {"text": text, "answers": answers, "partial": True}
+
+    def _build_docx(self, job: Job) -> Tuple[bytes, str]:
+        """Worker thread: render a finished job as DOCX bytes and a filename."""
+        if job.kind == "lesson":
+            doc = self.lesson_generator.build_docx_document(job.result["text"], job.inputs)
+            filename = self.lesson_generator._get_base_filename("docx", job.inputs)
+        else:
+            doc = self.exam_generator.build_docx_document(job.result["text"], job.inputs)
+            inputs = job.inputs
+            filename = f"{inputs['class']}_{inputs['subject']}_{inputs['topic']}_questions.docx"
+        buffer = io.BytesIO()
+        doc.save(buffer)
+        return buffer.getvalue(), filename
+
+    def _resume_unfinished_jobs(self) -> None:
+        """Re-queue jobs a previous run of the service did not finish."""
+        for record in self.job_store.unfinished_jobs("service"):
+            if record["status"] == "failed":
+                continue
+            job = Job.from_record(record, self.DEFAULT_DEADLINE)
+            job.status = "queued"
+            try:
+                self.queue.put_nowait((job.priority, next(self._sequence), job))
+            except asyncio.QueueFull:
+                break
+            self.jobs[job.id] = job
+            print(f"Resuming interrupted {job.kind} job {job.id}")
+
+    def _get_job(self, job_id: str) -> Optional[Job]:
+        """Look a job up in memory, falling back to the job store."""
+        job = self.jobs.get(job_id)
+        if job is None:
+            record = self.job_store.get_job(job_id)
+            if record and record["origin"] == "service":
+                job = Job.from_record(record, self.DEFAULT_DEADLINE)
+        return job
+
+    def _evict_finished_jobs(self) -> None:
+        finished = [job_id for job_id, job in self.jobs.items() if job.done.is_set()]
+        for job_id in finished[: max(0, len(finished) - self.MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+    # Input parsing
+
+    def _parse_priority(self, body: Dict) -> int:
+        priority = body.get("priority", "normal")
+        if isinstance(priority, str):
+            if priority not in PRIORITIES:
+                raise ValueError(f"priority must be one of {', '.join(PRIORITIES)} or 0-9")
+            return PRIORITIES[priority]
+        if not isinstance(priority, int) or not 0 <= priority <= 9:
+            raise ValueError("priority must be between 0 and 9")
+        return priority
+
+    def _parse_deadline(self, body: Dict) -> float:
+        deadline = body.get("deadline", self.DEFAULT_DEADLINE)
+        if isinstance(deadline, bool) or not isinstance(deadline, (int, float)) \
+                or not 0 < deadline <= self.MAX_DEADLINE:
+            raise ValueError(f"deadline must be a number of seconds up to {self.MAX_DEADLINE:g}")
+        return float(deadline)
+
+    def _parse_objectives(self, body: Dict) -> List[str]:
+        objectives = body.get("objectives", [])
+        if not isinstance(objectives, list) or not all(isinstance(o, str) for o in objectives):
+            raise ValueError("objectives must be a list of strings")
+        return [o.strip() for o in objectives if o.strip()]
+
+    def _lesson_inputs(self, body: Dict) -> Dict:
+        inputs = {
+            "week": str(body.get("week", "")),
+            "class": str(body.get("class", "")),
+            "subject": str(body.get("subject", "")),
+            "topic": str(body.get("topic", "")),
+            "objectives": self._parse_objectives(body),
+        }
+        error = self.lesson_generator.validate_inputs(inputs)
+        if error:
+            raise ValueError(error)
+        return inputs
+
+    def _exam_inputs(self, body: Dict) -> Dict:
+        inputs = {
+            "class": str(body.get("class", "")).strip(),
+            "subject": str(body.get("subject", "")).strip(),
+            "topic": str(body.get("topic", "")).strip(),
+            "question_type": str(body.get("question_type", "Multiple Choice")).strip(),
+            "num_questions": int(body.get("num_questions", 5)),
+            "objectives": self._parse_objectives(body),
+        }
+        error = self.exam_generator.validate_inputs(inputs)
+        if error:
+            raise ValueError(error)
+        return inputs
+
+    def _paper_request(self, body: Dict) -> Tuple[Dict, Optional[Dict[str, int]]]:
+        """Exam inputs plus an optional "type_mix" such as {"mc": 40, "theory": 20}."""
+        type_mix = body.get("type_mix")
+        if type_mix is None:
+            return self._exam_inputs(body), None
+        if not isinstance(type_mix, dict) or not type_mix:
+            raise ValueError("type_mix must be an object mapping question kinds to counts")
+        unknown = set(type_mix) - set(KIND_LABELS)
+        if unknown:
+            raise ValueError(f"Unknown question kinds: {', '.join(sorted(unknown))}")
+        type_mix = {kind: int(count) for kind, count in type_mix.items()}
+        if any(count < 1 for count in type_mix.values()):
+            raise ValueError("type_mix counts must be at least 1")
+        body = dict(body, num_questions=sum(type_mix.values()),
+                    question_type=KIND_LABELS[max(type_mix, key=type_mix.get)])
+        return self._exam_inputs(body), type_mix
+
+    # HTTP
+
+    async def _route(self, method: str, target: str, body: bytes) -> Tuple[int, str, bytes, Dict]:
+        url = urlsplit(target)
+        parts = [p for p in url.path.split("/") if p]
+        query = parse_qs(url.query)
+
+        if parts == ["health"] and method == "GET":
+            return self._json(200, {
+                "status": "ok",
+                "queued": self.queue.qsize(),
+                "running": sum(1 for job in self.jobs.values() if job.status == "running"),
+                "workers": self.workers,
+                "waiting_requests": REQUEST_SCHEDULER.waiting(),
+                "provider_calls": PROVIDER_CALLS.executed,
+                "coalesced_calls": PROVIDER_CALLS.coalesced,
+                "providers": PROVIDER_STATS.snapshot(),
+            })
+
+        if parts in (["lesson-notes"], ["exams"]):
+            if method != "POST":
+                return self._json(405, {"error": "Use POST"})
+            try:
+                payload = json.loads(body or b"{}")
+                if not isinstance(payload, dict):
+                    raise ValueError("Request body must be a JSON object")
+                if parts == ["lesson-notes"]:
+                    kind, inputs = "lesson", self._lesson_inputs(payload)
+                else:
+                    kind, inputs = "exam", self._exam_inputs(payload)
+                priority = self._parse_priority(payload)
+                deadline = self._parse_deadline(payload)
+            except (ValueError, TypeError) as e:
+                return self._json(400, {"error": str(e)})
+
+            try:
+                job = self.submit(kind, inputs, priority, deadline)
+            except asyncio.QueueFull:
+                return self._json(503, {"error": "Queue is full, try again later"})
+
+            if payload.get("wait") or query.get("wait") == ["1"]:
+                await job.done.wait()
+                return self._json(200, job.to_dict())
+            return self._json(202, job.to_dict(), {"Location": f"/jobs/{job.id}"})
+
+        if parts == ["papers"]:
+            if method != "POST":
+                return self._json(405, {"error": "Use POST"})
+            try:
+                payload = json.loads(body or b"{}")
+                if not isinstance(payload, dict):
+                    raise ValueError("Request body must be a JSON object")
+                inputs, type_mix = self._paper_request(payload)
+            except (ValueError, TypeError) as e:
+                return self._json(400, {"error": str(e)})
+            loop = asyncio.get_running_loop()
+            text, shortfall = await loop.run_in_executor(
+                self.executor, self.exam_generator.build_paper_from_bank, inputs, type_mix
+            )
+            text, answers = self.exam_generator._split_answers(text)
+            return self._json(200, {"inputs": inputs, "text": text, "answers": answers, "shortfall": shortfall})
+
+        if len(parts) == 3 and parts[0] == "jobs" and parts[2] == "retry" and method == "POST":
+            job = self._get_job(parts[1])
+            if job is None:
+                return self._json(404, {"error": "Unknown job"})
+            if job.status not in ("failed", "cancelled"):
+                return self._json(409, {"error": f"Job is {job.status}"})
+            try:
+                self.queue.put_nowait((job.priority, next(self._sequence), job))
+            except asyncio.QueueFull:
+                return self._json(503, {"error": "Queue is full, try again later"})
+            job.status, job.result, job.error, job.finished = "queued", None, None, None
+            job.done.clear()
+            self.jobs[job.id] = job
+            self.job_store.set_status(job.id, "queued")
+            return self._json(202, job.to_dict(), {"Location": f"/jobs/{job.id}"})
+
+        if len(parts) == 3 and parts[0] == "jobs" and parts[2] == "cancel" and method == "POST":
+            job = self.jobs.get(parts[1])
+            if job is None:
+                return self._json(404, {"error": "Unknown or finished job"})
+            if job.status == "queued":
+                job.result = self._partial_result(job)
+                job.status, job.finished = "cancelled", time.time()
+                job.done.set()
+                self.job_store.set_status(job.id, "cancelled", result=job.result)
+            elif job.status == "running" and job.task is not None:
+                # Cancelling the task cancels every request it has in flight
+                job.task.cancel()
+                await job.done.wait()
+            else:
+                return self._json(409, {"error": f"Job is {job.status}"})
+            return self._json(200, job.to_dict())
+
+        if len(parts) in (2, 3) and parts[0] == "jobs" and method == "GET":
+            job = self._get_job(parts[1])
+            if job is None:
+                return self._json(404, {"error": "Unknown job"})
+            if len(parts) == 2:
+                return self._json(200, job.to_dict())
+            if parts[2] == "events":
+                try:
+                    since = max(0, int(query.get("since", ["0"])[0]))
+                except ValueError:
+                    return self._json(400, {"error": "since must be an integer"})
+                return self._json(200, {
+                    "status": job.status, "events": job.events[since:], "next": len(job.events),
+                })
+            if parts[2] != "docx":
+                return self._json(404, {"error": "Not found"})
+            if job.status != "done":
+                return self._json(409, {"error": f"Job is {job.status}"})
+            loop = asyncio.get_running_loop()
+            data, filename = await loop.run_in_executor(self.executor, self._build_docx, job)
+            return 200, DOCX_CONTENT_TYPE, data, {
+                "Content-Disposition": f"attachment; filename*=UTF-8''{quote(filename)}"
+            }
+
+        return self._json(404, {"error": "Not found"})
+
+    def _json(self, status: int, payload: Dict, headers: Optional[Dict] = None) -> Tuple[int, str, bytes, Dict]:
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        return status, "application/json; charset=utf-8", data, headers or {}
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            try:
+                request_line = await reader.readline()
+                if not request_line:
+                    # Connected and closed without a request, e.g. a port probe
+                    return
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length", 0) or 0)
+                if length > self.MAX_BODY_BYTES:
+                    response = self._json(413, {"error": "Request body too large"})
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    response = await self._route(method.upper(), target, body)
+            except (ValueError, asyncio.IncompleteReadError):
+                response = self._json(400, {"error": "Malformed request"})
+            except Exception as e:
+                print(f"Request failed: {e}")
+                response = self._json(500, {"error": "Internal server error"})
+
+            status, content_type, data, extra_headers = response
+            head = [
+                f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+                f"Content-Type: {content_type}",
+                f"Content-Length: {len(data)}",
+                "Connection: close",
+            ]
+            head += [f"{name}: {value}" for name, value in extra_headers.items()]
+            writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + data)
+            await writer.drain()
+        finally:
+            writer.close()
+
+
+def main(argv=None) -> None:
+    """Run the generation service from the command line."""
+    parser = argparse.ArgumentParser(description="Serve lesson-note and exam generation over local HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=4, help="concurrent generations")
+    parser.add_argument("--max-queue", type=int, default=100, help="queued jobs before rejecting")
+    args = parser.parse_args(argv)
+
+    service = GenerationService(workers=args.workers, max_queue=args.max_queue)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
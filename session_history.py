@@ -0,0 +1,229 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional
+
+try:
+    import zstandard
+except ImportError:
+    # Without the optional zstandard package results are stored with zlib
+    zstandard = None
+
+
+DEFAULT_HISTORY_PATH = os.getenv(
+    "SESSION_HISTORY_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "session_history.db")
+)
+DEFAULT_MAX_MB = float(os.getenv("SESSION_HISTORY_MAX_MB", "64"))
+
+ZSTD_LEVEL = 19
+ZLIB_LEVEL = 9
+
+# A shared dictionary is trained once this many results are stored, and
+# retrained after as many again, so the boilerplate every note and paper
+# repeats (headings, instructions, option letters) costs almost nothing
+DICT_SIZE = 64 * 1024
+DICT_TRAINING_SAMPLES = 32
+DICT_MAX_SAMPLES = 500
+
+
+class SessionHistory:
+    """Every generated note and exam with its inputs, compressed on disk.
+
+    Results are kept in SQLite with the inputs in plain columns for
+    searching and the full result as a compressed blob: zstd with a
+    dictionary trained on earlier results when zstandard is installed,
+    zlib otherwise. The file is kept under `max_mb` by evicting the oldest
+    results.
+    """
+
+    def __init__(self, path: str = DEFAULT_HISTORY_PATH, max_mb: float = DEFAULT_MAX_MB) -> None:
+        self.path = path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._compressors: Dict[int, "zstandard.ZstdCompressor"] = {}
+        self._decompressors: Dict[int, "zstandard.ZstdDecompressor"] = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            # Only takes effect on a new file; lets eviction give space back
+            self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS history (
+                    id INTEGER PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    class TEXT NOT NULL,
+                    subject TEXT NOT NULL,
+                    topic TEXT NOT NULL,
+                    search TEXT NOT NULL,
+                    codec TEXT NOT NULL,
+                    dict_id INTEGER,
+                    size INTEGER NOT NULL,
+                    payload BLOB NOT NULL,
+                    created REAL NOT NULL
+                )"""
+            )
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS dictionaries (
+                    id INTEGER PRIMARY KEY,
+                    data BLOB NOT NULL,
+                    samples INTEGER NOT NULL,
+                    created REAL NOT NULL
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS history_created ON history(kind, created)")
+
+    def add(self, kind: str, inputs: Dict, result: Dict) -> int:
+        """Store one finished result; returns its id."""
+        raw = json.dumps({"inputs": inputs, "result": result}, ensure_ascii=False).encode("utf-8")
+        search = " ".join([
+            inputs.get("class", ""), inputs.get("subject", ""), inputs.get("topic", ""),
+            inputs.get("question_type", ""), *inputs.get("objectives", []),
+        ]).lower()
+        with self._lock:
+            self._maybe_train()
+            codec, dict_id, payload = self._compress(raw)
+            with self._conn:
+                cursor = self._conn.execute(
+                    "INSERT INTO history (kind, class, subject, topic, search, codec, dict_id, size, payload, created)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (kind, inputs.get("class", ""), inputs.get("subject", ""), inputs.get("topic", ""),
+                     search, codec, dict_id, len(raw), payload, time.time())
+                )
+            self._evict()
+        return cursor.lastrowid
+
+    def search(self, query: str = "", kind: Optional[str] = None, limit: int = 200) -> List[Dict]:
+        """Newest results whose inputs contain every word of `query` (without the results themselves)."""
+        clauses, params = [], []
+        for term in query.lower().split():
+            clauses.append("search LIKE ?")
+            params.append(f"%{term}%")
+        if kind:
+            clauses.append("kind = ?")
+            params.append(kind)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, kind, class, subject, topic, size, LENGTH(payload) AS stored, created"
+                f" FROM history{where} ORDER BY created DESC LIMIT ?",
+                [*params, limit]
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def load(self, entry_id: int) -> Optional[Dict]:
+        """The stored {"inputs", "result"} of one entry, or None if it was evicted."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT codec, dict_id, payload FROM history WHERE id = ?", (entry_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            raw = self._decompress(row["codec"], row["dict_id"], row["payload"])
+        return json.loads(raw)
+
+    def delete(self, entry_id: int) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM history WHERE id = ?", (entry_id,))
+
+    def footprint(self) -> Dict:
+        """Entry count, stored and uncompressed bytes, and the size limit."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) AS entries, COALESCE(SUM(LENGTH(payload)), 0) AS stored,"
+                " COALESCE(SUM(size), 0) AS size FROM history"
+            ).fetchone()
+            dictionaries = self._conn.execute(
+                "SELECT COALESCE(SUM(LENGTH(data)), 0) FROM dictionaries"
+            ).fetchone()[0]
+        return {"entries": row["entries"], "stored": row["stored"] + dictionaries,
+                "size": row["size"], "max_bytes": self.max_bytes}
+
+    def _compress(self, raw: bytes):
+        if zstandard is None:
+            return "zlib", None, zlib.compress(raw, ZLIB_LEVEL)
+        dict_id = self._current_dict_id()
+        compressor = self._compressors.get(dict_id)
+        if compressor is None:
+            dictionary = self._dictionary(dict_id)
+            compressor = self._compressors[dict_id] = zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=dictionary)
+        return "zstd", dict_id, compressor.compress(raw)
+
+    def _decompress(self, codec: str, dict_id: Optional[int], payload: bytes) -> bytes:
+        if codec == "zlib":
+            return zlib.decompress(payload)
+        if zstandard is None:
+            raise RuntimeError("This result was stored with zstd; install zstandard to read it")
+        decompressor = self._decompressors.get(dict_id)
+        if decompressor is None:
+            decompressor = self._decompressors[dict_id] = zstandard.ZstdDecompressor(
+                dict_data=self._dictionary(dict_id)
+            )
+        return decompressor.decompress(payload)
+
+    def _current_dict_id(self) -> Optional[int]:
+        row = self._conn.execute("SELECT MAX(id) FROM dictionaries").fetchone()
+        return row[0]
+
+    def _dictionary(self, dict_id: Optional[int]) -> Optional["zstandard.ZstdCompressionDict"]:
+        if dict_id is None:
+            return None
+        row = self._conn.execute("SELECT data FROM dictionaries WHERE id = ?", (dict_id,)).fetchone()
+        return zstandard.ZstdCompressionDict(row["data"])
+
+    def _maybe_train(self) -> None:
+        """Train a new dictionary once enough results arrived since the last one."""
+        if zstandard is None:
+            return
+        dict_id = self._current_dict_id()
+        trained_on = 0
+        if dict_id is not None:
+            trained_on = self._conn.execute(
+                "SELECT samples FROM dictionaries WHERE id = ?", (dict_id,)
+            ).fetchone()[0]
+        count = self._conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+        if count < max(DICT_TRAINING_SAMPLES, 2 * trained_on):
+            return
+        rows = self._conn.execute(
+            "SELECT codec, dict_id, payload FROM history ORDER BY created DESC LIMIT ?", (DICT_MAX_SAMPLES,)
+        ).fetchall()
+        samples = [self._decompress(row["codec"], row["dict_id"], row["payload"]) for row in rows]
+        try:
+            dictionary = zstandard.train_dictionary(DICT_SIZE, samples)
+        except zstandard.ZstdError as e:
+            # Too little distinct material yet; try again with the next result
+            print(f"History dictionary training skipped: {e}")
+            return
+        with self._conn:
+            self._conn.execute(
+                "INSERT INTO dictionaries (data, samples, created) VALUES (?, ?, ?)",
+                (dictionary.as_bytes(), count, time.time())
+            )
+
+    def _evict(self) -> None:
+        """Drop the oldest results until the stored bytes fit under max_bytes."""
+        stored = self._conn.execute(
+            "SELECT (SELECT COALESCE(SUM(LENGTH(payload)), 0) FROM history)"
+            " + (SELECT COALESCE(SUM(LENGTH(data)), 0) FROM dictionaries)"
+        ).fetchone()[0]
+        if stored <= self.max_bytes:
+            return
+        evict = []
+        for row in self._conn.execute("SELECT id, LENGTH(payload) AS stored FROM history ORDER BY created"):
+            if stored <= self.max_bytes:
+                break
+            evict.append((row["id"],))
+            stored -= row["stored"]
+        with self._conn:
+            self._conn.executemany("DELETE FROM history WHERE id = ?", evict)
+            # Dictionaries no result uses any more, except the current one
+            self._conn.execute(
+                "DELETE FROM dictionaries WHERE id != (SELECT MAX(id) FROM dictionaries)"
+                " AND id NOT IN (SELECT dict_id FROM history WHERE dict_id IS NOT NULL)"
+            )
+        self._conn.execute("PRAGMA incremental_vacuum")
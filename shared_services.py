@@ -0,0 +1,125 @@
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set
+
+from formula_library import FormulaLibrary
+from job_store import JobStore
+from providers import ProviderRouter
+from question_bank import QuestionBank
+from section_cache import SectionCache
+from session_history import SessionHistory
+from visual_aids import VisualAidIndex
+
+
+class SharedServices:
+    """The stores, response cache and provider routes generator windows share.
+
+    Windows opened from the launcher all get the process-wide instance
+    (`get_shared_services`): one job store, history and question bank, one
+    section cache so a note one window generated is reused by another,
+    and one router per generator kind, so its provider clients, offline
+    state and latency figures are common. Provider requests are capped and
+    shared fairly through REQUEST_SCHEDULER on the one provider loop. A
+    generator created without services gets a private set. Windows claim
+    the jobs they generate, so no other window offers to resume them.
+    """
+
+    SECTION_CACHE_ENTRIES = 1024
+
+    def __init__(self, job_store: Optional[JobStore] = None, history: Optional[SessionHistory] = None,
+                 question_bank: Optional[QuestionBank] = None, visual_aids: Optional[VisualAidIndex] = None,
+                 formula_library: Optional[FormulaLibrary] = None) -> None:
+        """Stores not given are opened at their default paths on first use."""
+        self._lock = threading.Lock()
+        self._job_store = job_store
+        self._history = history
+        self._question_bank = question_bank
+        self._visual_aids = visual_aids
+        self._formula_library = formula_library
+        self.section_cache = SectionCache(self.SECTION_CACHE_ENTRIES)
+        self._routers: Dict[str, ProviderRouter] = {}
+        self._active_jobs: Set[str] = set()
+        self.started = time.time()
+
+    @property
+    def job_store(self) -> JobStore:
+        with self._lock:
+            if self._job_store is None:
+                self._job_store = JobStore()
+            return self._job_store
+
+    @property
+    def history(self) -> SessionHistory:
+        with self._lock:
+            if self._history is None:
+                self._history = SessionHistory()
+            return self._history
+
+    @property
+    def question_bank(self) -> QuestionBank:
+        with self._lock:
+            if self._question_bank is None:
+                self._question_bank = QuestionBank()
+            return self._question_bank
+
+    @property
+    def visual_aids(self) -> VisualAidIndex:
+        with self._lock:
+            if self._visual_aids is None:
+                self._visual_aids = VisualAidIndex()
+            return self._visual_aids
+
+    @property
+    def formula_library(self) -> FormulaLibrary:
+        with self._lock:
+            if self._formula_library is None:
+                self._formula_library = FormulaLibrary()
+            return self._formula_library
+
+    def claim_job(self, job_id: str) -> bool:
+        """Mark a job as being generated in this process; False if it already is."""
+        with self._lock:
+            if job_id in self._active_jobs:
+                return False
+            self._active_jobs.add(job_id)
+            return True
+
+    def release_job(self, job_id: str) -> None:
+        with self._lock:
+            self._active_jobs.discard(job_id)
+
+    def resumable(self, jobs: List[Dict]) -> List[Dict]:
+        """The unfinished jobs that are safe to offer for resuming.
+
+        Jobs generating in this process are left out. A job still marked
+        running is only offered if it was last updated before these
+        services started, i.e. the session running it ended without
+        finishing it.
+        """
+        with self._lock:
+            active = set(self._active_jobs)
+        return [
+            job for job in jobs
+            if job["id"] not in active and (job["status"] != "running" or job["updated"] < self.started)
+        ]
+
+    def router(self, kind: str, build: Callable[[], ProviderRouter]) -> ProviderRouter:
+        """The router for one generator kind, built by `build` the first time."""
+        with self._lock:
+            router = self._routers.get(kind)
+            if router is None:
+                router = self._routers[kind] = build()
+            return router
+
+
+_services: Optional[SharedServices] = None
+_services_lock = threading.Lock()
+
+
+def get_shared_services() -> SharedServices:
+    """The services every launcher window in this process shares."""
+    global _services
+    with _services_lock:
+        if _services is None:
+            _services = SharedServices()
+        return _services
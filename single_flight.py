@@ -0,0 +1,64 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+class _AsyncCall:
+    """A shared in-flight task and how many callers are still waiting on it."""
+
+    def __init__(self, task: "asyncio.Task") -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class AsyncSingleFlight:
+    """Coalesce concurrent coroutine calls that share a key into one execution.
+
+    The first caller for a key starts the call; callers arriving while it
+    is still running receive the same result (or exception). Once the call
+    finishes the key is forgotten, so this never serves stale results - it
+    only removes duplicate work that overlaps in time.
+
+    The leader's call runs as a task on the caller's event loop; every
+    caller awaits it through `asyncio.shield`, so one caller being
+    cancelled does not cancel the request the others are waiting for.
+    When the last waiting caller is cancelled the task is cancelled too,
+    which frees its connection at once. Calls on different loops never
+    share a task.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[Tuple[int, str], _AsyncCall] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        loop_key = (id(asyncio.get_running_loop()), key)
+        with self._lock:
+            call = self._calls.get(loop_key)
+            if call is None:
+                call = self._calls[loop_key] = _AsyncCall(asyncio.ensure_future(func()))
+                call.task.add_done_callback(lambda _: self._forget(loop_key, call))
+                self.executed += 1
+            else:
+                self.coalesced += 1
+            call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            with self._lock:
+                call.waiters -= 1
+                abandoned = call.waiters == 0 and not call.task.done()
+            if abandoned:
+                call.task.cancel()
+
+    def _forget(self, loop_key: Tuple[int, str], call: _AsyncCall) -> None:
+        with self._lock:
+            if self._calls.get(loop_key) is call:
+                del self._calls[loop_key]
+
+
+# Shared by every generator in the process so identical prompts from the
+# lesson tool, the exam tool and service workers collapse into one request.
+PROVIDER_CALLS = AsyncSingleFlight()
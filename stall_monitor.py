@@ -0,0 +1,119 @@
+import os
+import sys
+import threading
+import time
+import tkinter as tk
+import traceback
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+
+DEFAULT_LOG_PATH = os.getenv(
+    "STALL_LOG_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "ui_stalls.log")
+)
+DEFAULT_THRESHOLD_MS = int(os.getenv("STALL_THRESHOLD_MS", "250"))
+
+_THIS_FILE = os.path.abspath(__file__)
+_PACKAGE_DIR = os.path.dirname(_THIS_FILE)
+
+
+class StallMonitor:
+    """Detects and attributes freezes of the Tk event loop.
+
+    A heartbeat rescheduled with `root.after` every `interval_ms` notes
+    when it last ran. A helper thread watches it; once the heartbeat is
+    `threshold_ms` late it samples the Tk thread's stack (and again each
+    further threshold, up to MAX_SAMPLES). When the heartbeat finally runs,
+    the stall's length and the samples are logged to `log_path` and kept
+    in `stalls` for the diagnostics view.
+    """
+
+    MAX_SAMPLES = 5
+    MAX_STALLS = 100
+
+    def __init__(self, root: tk.Misc, threshold_ms: int = DEFAULT_THRESHOLD_MS, interval_ms: int = 100,
+                 log_path: Optional[str] = DEFAULT_LOG_PATH) -> None:
+        self.root = root
+        self.threshold = threshold_ms / 1000
+        self.interval_ms = interval_ms
+        self.log_path = log_path
+        self.stalls: Deque[Dict] = deque(maxlen=self.MAX_STALLS)
+        self._lock = threading.Lock()
+        self._samples: List[traceback.StackSummary] = []
+        self._last_tick = time.perf_counter()
+        self._tk_thread: Optional[int] = None
+        self._stop = threading.Event()
+        self._after_id = None
+
+    def start(self) -> None:
+        """Start watching; call from the thread running the Tk mainloop."""
+        self._tk_thread = threading.get_ident()
+        self._last_tick = time.perf_counter()
+        self._after_id = self.root.after(self.interval_ms, self._tick)
+        threading.Thread(target=self._watch, name="stall-monitor", daemon=True).start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except tk.TclError:
+                pass
+            self._after_id = None
+
+    def _tick(self) -> None:
+        now = time.perf_counter()
+        with self._lock:
+            late = now - self._last_tick - self.interval_ms / 1000
+            samples, self._samples = self._samples, []
+            self._last_tick = now
+        if late >= self.threshold:
+            self._record(late, samples)
+        try:
+            self._after_id = self.root.after(self.interval_ms, self._tick)
+        except tk.TclError:
+            # The window was destroyed
+            self._stop.set()
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval_ms / 2000):
+            with self._lock:
+                late = time.perf_counter() - self._last_tick - self.interval_ms / 1000
+                if late < self.threshold * (len(self._samples) + 1) or len(self._samples) >= self.MAX_SAMPLES:
+                    continue
+                frame = sys._current_frames().get(self._tk_thread)
+                if frame is not None:
+                    self._samples.append(traceback.extract_stack(frame))
+
+    def _record(self, seconds: float, samples: List[traceback.StackSummary]) -> None:
+        stall = {
+            "time": time.time(),
+            "duration_ms": round(seconds * 1000),
+            "where": self._where(samples[0]) if samples else "unknown (not sampled)",
+            "samples": len(samples),
+            "stack": "".join(samples[0].format()) if samples else "",
+        }
+        self.stalls.append(stall)
+        print(f"UI stalled for {stall['duration_ms']} ms in {stall['where']}")
+        if not self.log_path:
+            return
+        try:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(stall['time']))}"
+                        f"  stalled {stall['duration_ms']} ms in {stall['where']}\n")
+                for i, sample in enumerate(samples, 1):
+                    f.write(f"  sample {i} of {len(samples)}:\n")
+                    f.writelines(f"    {line}\n" for line in "".join(sample.format()).rstrip().splitlines())
+                f.write("\n")
+        except OSError as e:
+            print(f"Could not write the stall log: {e}")
+
+    def _where(self, stack: traceback.StackSummary) -> str:
+        """The innermost frame in this application's own code, else the innermost frame."""
+        for frame in reversed(stack):
+            path = os.path.abspath(frame.filename)
+            if path.startswith(_PACKAGE_DIR) and "site-packages" not in path and path != _THIS_FILE:
+                return f"{os.path.basename(frame.filename)}:{frame.lineno} {frame.name}"
+        frame = stack[-1]
+        return f"{os.path.basename(frame.filename)}:{frame.lineno} {frame.name}"
@@ -0,0 +1,187 @@
+import os
+from typing import List, Optional, Tuple
+
+from local_index import TopicAnswerIndex
+
+
+DEFAULT_INDEX_PATH = os.getenv(
+    "VISUAL_AIDS_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "visual_aids.db")
+)
+
+# Starting knowledge: (subject, topic keywords, recommended visual aids).
+# Answers logged from the AI are added alongside and take over as they
+# accumulate.
+SEED_ENTRIES = [
+    ("mathematics", "geometry angle triangle polygon circle shape construction", [
+        "Labelled diagrams of the shapes and their angles",
+        "Step-by-step construction drawings",
+        "Protractor and compass demonstration chart",
+    ]),
+    ("mathematics", "graph coordinate function plot linear quadratic gradient axis", [
+        "Cartesian plane with plotted example graphs",
+        "Table of values beside the matching graph",
+        "Graph showing gradient and intercepts",
+    ]),
+    ("mathematics", "statistics data chart frequency mean median mode histogram probability", [
+        "Bar chart and histogram of sample data",
+        "Pie chart with labelled sectors",
+        "Frequency table with worked example",
+    ]),
+    ("mathematics", "fraction decimal percentage ratio number line place value", [
+        "Fraction bars or pie fraction models",
+        "Number line showing equivalent values",
+    ]),
+    ("mathematics", "mensuration area volume perimeter surface solid cylinder cone prism", [
+        "Nets of 3D solids",
+        "Labelled diagrams of solids with dimensions",
+    ]),
+    ("physics", "electric circuit current voltage resistance ohm series parallel", [
+        "Circuit diagrams with standard symbols",
+        "Series and parallel circuit comparison chart",
+        "Graph of current against voltage",
+    ]),
+    ("physics", "motion velocity acceleration speed distance displacement time graph", [
+        "Distance-time and velocity-time graphs",
+        "Diagram of a moving object with labelled vectors",
+    ]),
+    ("physics", "force newton law friction pressure moment lever equilibrium", [
+        "Free-body force diagrams",
+        "Lever and pivot diagrams showing moments",
+    ]),
+    ("physics", "light reflection refraction lens mirror wave sound spectrum", [
+        "Ray diagrams for mirrors and lenses",
+        "Diagram of a transverse and longitudinal wave",
+        "Electromagnetic spectrum chart",
+    ]),
+    ("physics", "heat temperature thermometer expansion conduction convection radiation energy", [
+        "Diagram of heat transfer by conduction, convection and radiation",
+        "Labelled thermometer diagram",
+    ]),
+    ("chemistry", "atom atomic structure electron proton neutron shell periodic table element", [
+        "Atomic structure model with electron shells",
+        "Periodic table chart",
+    ]),
+    ("chemistry", "bond bonding ionic covalent molecule compound formula", [
+        "Dot-and-cross bonding diagrams",
+        "Molecular models of simple compounds",
+    ]),
+    ("chemistry", "acid base salt indicator titration neutralisation", [
+        "pH scale colour chart",
+        "Titration apparatus diagram",
+    ]),
+    ("chemistry", "separation mixture filtration distillation chromatography evaporation", [
+        "Labelled laboratory apparatus for each separation method",
+        "Chromatography paper result diagram",
+    ]),
+    ("chemistry", "reaction rate equilibrium catalyst electrolysis redox", [
+        "Graph of rate of reaction against time",
+        "Electrolysis cell diagram",
+    ]),
+    ("biology", "cell structure organelle nucleus membrane plant animal microscope", [
+        "Labelled plant and animal cell diagrams",
+        "Microscope diagram",
+    ]),
+    ("biology", "digestion digestive system enzyme food nutrition", [
+        "Diagram of the human digestive system",
+        "Chart of food classes and sources",
+    ]),
+    ("biology", "circulation heart blood vessel respiration breathing lung", [
+        "Labelled diagram of the heart",
+        "Diagram of the respiratory system",
+    ]),
+    ("biology", "photosynthesis leaf plant chlorophyll transpiration root", [
+        "Labelled diagram of a leaf cross-section",
+        "Photosynthesis process diagram",
+    ]),
+    ("biology", "ecology ecosystem food chain web habitat population", [
+        "Food chain and food web diagrams",
+        "Ecosystem illustration",
+    ]),
+    ("biology", "reproduction genetics inheritance chromosome dna flower", [
+        "Punnett square chart",
+        "Labelled diagram of a flower",
+    ]),
+    ("agricultural science", "soil type profile texture fertility erosion", [
+        "Soil profile diagram",
+        "Samples or pictures of soil types",
+    ]),
+    ("agricultural science", "crop farm tool implement machinery planting", [
+        "Pictures of farm tools and implements",
+        "Crop life-cycle chart",
+    ]),
+    ("agricultural science", "livestock animal poultry cattle goat breed disease", [
+        "Pictures of livestock breeds",
+        "Diagram of a livestock housing system",
+    ]),
+    ("computer science", "computer hardware component input output device storage", [
+        "Pictures of input, output and storage devices",
+        "Block diagram of a computer system",
+    ]),
+    ("computer science", "algorithm flowchart program programming loop variable", [
+        "Flowchart of a worked algorithm",
+        "Annotated code example",
+    ]),
+    ("computer science", "network internet topology protocol", [
+        "Network topology diagrams",
+        "Diagram of data travelling across the internet",
+    ]),
+    ("geography", "map scale direction latitude longitude contour", [
+        "Topographic map with contour lines",
+        "Globe or map showing latitude and longitude",
+    ]),
+    ("geography", "weather climate rainfall temperature season vegetation", [
+        "Climate graphs of rainfall and temperature",
+        "Vegetation belt map",
+    ]),
+    ("geography", "rock landform mountain river erosion earth structure volcano", [
+        "Cross-section of the earth's structure",
+        "Diagrams of landforms and river features",
+    ]),
+]
+
+
+def format_recommendation(aids: List[str]) -> str:
+    """The visual-aid notice in the form the lesson note uses."""
+    if not aids:
+        return ""
+    return "Recommended visual aids:\n" + "\n".join(f"{i}. {aid}" for i, aid in enumerate(aids, 1))
+
+
+class VisualAidIndex(TopicAnswerIndex):
+    """Subject/topic index answering "which visual aids does this lesson need?".
+
+    Descriptions are the topic plus its objectives; answers are the
+    visual-aid notice exactly as it appears in the note ("" for none).
+    """
+
+    TABLE = "visual_aids"
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH) -> None:
+        super().__init__(path)
+
+    def seed_rows(self) -> List[Tuple[str, str, str]]:
+        return [(subject, keywords, format_recommendation(aids)) for subject, keywords, aids in SEED_ENTRIES]
+
+    def _describe(self, topic: str, objectives: List[str]) -> str:
+        return " ".join([topic] + list(objectives))
+
+    def lookup(self, subject: str, topic: str, objectives: List[str]) -> Optional[str]:
+        return self.match(subject, self._describe(topic, objectives))
+
+    def add(self, subject: str, topic: str, objectives: List[str], notice: str, source: str = "ai") -> None:
+        self.store(subject, self._describe(topic, objectives), notice, source)
+
+    def train_from_jobs(self, job_store, only_if_untrained: bool = True) -> int:
+        """Import every visual-aid check logged in the job store; returns how many.
+
+        Answers are added as they are made, so by default this only runs
+        while the index holds nothing but the seed entries.
+        """
+        if only_if_untrained and self.is_trained():
+            return 0
+        count = 0
+        for inputs, notice in job_store.sections_named("image_check", kind="lesson"):
+            self.add(inputs["subject"], inputs["topic"], inputs["objectives"], notice, source="log")
+            count += 1
+        return count